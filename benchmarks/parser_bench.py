@@ -0,0 +1,167 @@
+"""Benchmark and regression harness for the LoM page parsers.
+
+Runs every recorded page in benchmarks/corpus through both the extracted-text
+parsers and the structured section parsers, then reports parse throughput and
+field-level accuracy against the expected fields stored with each recording.
+
+Expected fields are written or checked by hand, never copied from parser
+output, so accuracy measures the parsers against what the page says.
+--check fails on any mismatch, so a parser change that breaks a field
+fails the gate until the parser or, if the page changed, the expected
+field is fixed.
+
+    python -m benchmarks.parser_bench [--repeat N] [--check] [--verbose]
+    python benchmarks/parser_bench.py [...]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+if __package__ in (None, ''):
+    # Run as a script: make the repository root importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.lom_parser import (
+    build_character_page, build_pathway_page, paragraphs,
+    parse_character_text, parse_pathway_text, parse_general_text
+)
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'corpus')
+
+# Fields each page kind renders, and so the fields we score
+FIELDS = {
+    'character': ('description', 'physical_description', 'pathways_authorities'),
+    'pathway': ('general_information', 'sequence_levels'),
+    'general': ('description',),
+}
+
+PARSERS = {
+    'character': lambda record: parse_character_text(record['content'], record['title']),
+    'pathway': lambda record: parse_pathway_text(record['content'], record['title'].removesuffix(' Pathway')),
+    'general': lambda record: parse_general_text(record['content'], record['title']),
+}
+
+STRUCTURED_PARSERS = {
+    'character': lambda record: build_character_page(record['title'], record['sections']).to_info(),
+    'pathway': lambda record: build_pathway_page(record['title'], record['sections']).to_info(),
+    'general': lambda record: {
+        'description': '\n\n'.join(paragraphs(record['sections'].get('lead', ''), 30)[:4])
+    },
+}
+
+PATHS = {
+    'extracted': (PARSERS, 'content'),
+    'structured': (STRUCTURED_PARSERS, 'sections'),
+}
+
+
+def expected_fields(kind, info):
+    """Pick the scored fields out of a parser result."""
+    return {name: info.get(name, '') for name in FIELDS[kind]}
+
+
+def load_corpus():
+    """Load every recorded page from the corpus directory."""
+    records = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.json'))):
+        if os.path.basename(path) == 'pages.json':
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+        record['path'] = path
+        records.append(record)
+    return records
+
+
+def input_size(record, source):
+    """Size in bytes of the input a parser path consumes."""
+    if source == 'content':
+        return len(record['content'].encode('utf-8'))
+    return sum(len(text.encode('utf-8')) for text in record['sections'].values())
+
+
+def run(records, repeat, verbose):
+    """Time and score every parser path.
+
+    Returns (rows, mismatches), each mismatch a (record, field id) pair.
+    """
+    rows = []
+    mismatches = []
+
+    for path_name, (parsers, source) in PATHS.items():
+        for kind, parser in parsers.items():
+            docs = [r for r in records if r['kind'] == kind and r.get(source)]
+            if not docs:
+                continue
+
+            size = sum(input_size(r, source) for r in docs)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for record in docs:
+                    parser(record)
+            elapsed = time.perf_counter() - start
+
+            scored = 0
+            correct = 0
+            for record in docs:
+                expected = record.get('expected', {}).get(path_name)
+                if not expected:
+                    continue
+                actual = expected_fields(kind, parser(record))
+                for name, value in expected.items():
+                    field_id = f'{path_name}.{name}'
+                    scored += 1
+                    if actual.get(name) == value:
+                        correct += 1
+                    else:
+                        mismatches.append((record, field_id))
+                        if verbose:
+                            print(f'  {path_name}/{record["title"]}.{name} differs', file=sys.stderr)
+
+            rows.append({
+                'path': path_name,
+                'kind': kind,
+                'docs': len(docs),
+                'docs_per_sec': len(docs) * repeat / elapsed if elapsed else 0.0,
+                'mb_per_sec': size * repeat / elapsed / 1e6 if elapsed else 0.0,
+                'fields': scored,
+                'accuracy': correct / scored if scored else None,
+            })
+
+    return rows, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=20, help='Parse each page this many times')
+    parser.add_argument('--check', action='store_true', help='Exit non-zero if any expected field differs')
+    parser.add_argument('--verbose', action='store_true', help='List every differing field')
+    args = parser.parse_args()
+
+    records = load_corpus()
+    if not records:
+        print('Corpus is empty; record pages with python -m benchmarks.record_corpus', file=sys.stderr)
+        # An empty corpus checks nothing, so it must not pass the gate
+        return 1 if args.check else 0
+
+    rows, mismatches = run(records, args.repeat, args.verbose)
+
+    print(f"{'path':<11}{'kind':<11}{'docs':>6}{'docs/s':>11}{'MB/s':>9}{'fields':>8}{'accuracy':>10}")
+    for row in rows:
+        accuracy = f"{row['accuracy']:.1%}" if row['accuracy'] is not None else '-'
+        print(f"{row['path']:<11}{row['kind']:<11}{row['docs']:>6}{row['docs_per_sec']:>11.0f}"
+              f"{row['mb_per_sec']:>9.2f}{row['fields']:>8}{accuracy:>10}")
+
+    if args.check and mismatches:
+        for record, field_id in mismatches:
+            print(f'{record["title"]}: {field_id} differs from the expected value', file=sys.stderr)
+        print(f'{len(mismatches)} fields differ', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
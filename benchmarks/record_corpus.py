@@ -0,0 +1,103 @@
+"""Record LoM wiki pages into the parser benchmark corpus.
+
+Each page listed in corpus/pages.json is saved as one JSON file holding the
+trafilatura extraction of the rendered page and the wikitext of the sections
+the structured fetch path uses. The current output of both parser paths is
+stored as a draft of the expected fields: correct every draft by hand against
+the page before committing, and fix the parsers until
+``python -m benchmarks.parser_bench --check`` passes.
+
+    python -m benchmarks.record_corpus [--only TITLE ...]
+    python benchmarks/record_corpus.py [...]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+if __package__ in (None, ''):
+    # Run as a script: make the repository root importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.http_scheduler import PRIORITY_BACKGROUND
+from bot.lom_parser import CHARACTER_SECTIONS, PATHWAY_SECTIONS
+from bot.wiki_scraper import LordOfMysteriesWikiScraper
+from benchmarks.parser_bench import CORPUS_DIR, PATHS, expected_fields
+
+
+def corpus_path(title):
+    """Get the corpus file path for a page title."""
+    slug = re.sub(r'[^a-z0-9]+', '_', title.lower()).strip('_')
+    return os.path.join(CORPUS_DIR, f'{slug}.json')
+
+
+async def record_page(scraper, kind, name):
+    """Fetch one page in both representations and write its corpus file."""
+    candidates = [f"{name} Pathway", name] if kind == 'pathway' else [name]
+    title = await scraper.title_index.resolve(candidates)
+    if not title:
+        print(f'skip {name}: not found')
+        return
+
+    url = scraper._page_url(title)
+    downloaded = await scraper.scheduler.fetch_text(url, priority=PRIORITY_BACKGROUND)
+    content = await scraper._extract_text(downloaded) if downloaded else None
+    if not content:
+        print(f'skip {name}: extraction failed')
+        return
+
+    wanted = {'character': CHARACTER_SECTIONS, 'pathway': PATHWAY_SECTIONS}.get(kind, {})
+    if wanted:
+        sections = await scraper._fetch_sections(title, wanted, PRIORITY_BACKGROUND)
+    else:
+        lead = await scraper._fetch_section(title, '0', PRIORITY_BACKGROUND)
+        sections = {'lead': lead} if lead else None
+    if not sections:
+        print(f'skip {name}: section fetch failed')
+        return
+    sections.pop('revid', None)
+
+    record = {
+        'title': title,
+        'name': name,
+        'kind': kind,
+        'url': url,
+        'recorded_at': time.strftime('%Y-%m-%d'),
+        'content': content,
+        'sections': sections,
+    }
+    record['expected'] = {
+        path_name: expected_fields(kind, parsers[kind](record))
+        for path_name, (parsers, source) in PATHS.items()
+        if record.get(source)
+    }
+
+    with open(corpus_path(title), 'w', encoding='utf-8') as f:
+        json.dump(record, f, indent=2, ensure_ascii=False)
+    print(f'recorded {title} ({len(content)} chars)')
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--only', nargs='*', help='Only record these names')
+    args = parser.parse_args()
+
+    with open(os.path.join(CORPUS_DIR, 'pages.json'), 'r', encoding='utf-8') as f:
+        pages = json.load(f)
+
+    scraper = LordOfMysteriesWikiScraper()
+    try:
+        for kind, names in pages.items():
+            for name in names:
+                if args.only and name not in args.only:
+                    continue
+                await record_page(scraper, kind, name)
+    finally:
+        await scraper.scheduler.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,368 @@
+"""Run the bot as several worker processes, each owning a range of shards.
+
+Start with ``python -m bot.cluster``. SHARD_COUNT fixes the number of
+shards (otherwise Discord's recommendation is used) and CLUSTER_WORKERS the
+number of processes (default: one per CPU). The launcher restarts workers
+that die and relays requests between them: a worker calls
+``await bot.cluster.request('stats')`` and gets one reply from every live
+worker, each produced by the handler registered for that command.
+
+Guilds map to shards by ID, so each guild's wiki files have a single owner;
+config.json is shared and guarded by its journal's file lock.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import urllib.request
+from multiprocessing.connection import wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+GATEWAY_URL = 'https://discord.com/api/v10/gateway/bot'
+
+# How long a cross-worker request waits for every worker to answer
+REQUEST_TIMEOUT = 5.0
+
+# Restart delays for a crashing worker, doubling up to the maximum; a worker
+# that stayed up this long starts over from the minimum
+RESTART_DELAY_MIN = 1.0
+RESTART_DELAY_MAX = 60.0
+RESTART_RESET_AFTER = 300.0
+
+# How long workers get to log out when the launcher stops
+SHUTDOWN_GRACE = 15.0
+
+
+def process_memory() -> int:
+    """Resident memory of this process in bytes (peak RSS where /proc is missing)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return 0
+
+
+def fetch_shard_count(token: str) -> int:
+    """Ask Discord how many shards the bot should run."""
+    request = urllib.request.Request(GATEWAY_URL, headers={
+        'Authorization': f'Bot {token}',
+        'User-Agent': 'DiscordBot (cluster launcher, 1.0)'
+    })
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return int(json.load(response)['shards'])
+
+
+def split_shards(shard_count: int, worker_count: int) -> List[List[int]]:
+    """Split shard IDs into contiguous, evenly sized ranges, one per worker."""
+    worker_count = max(1, min(worker_count, shard_count))
+    base, extra = divmod(shard_count, worker_count)
+    ranges = []
+    start = 0
+    for index in range(worker_count):
+        size = base + (1 if index < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+class ClusterClient:
+    """A worker's end of the launcher's pipe.
+
+    Messages are pickled tuples. A worker sends ``('request', id, command,
+    payload)``; the launcher forwards ``('call', call id, command, payload)``
+    to every worker, gathers their ``('reply', call id, ok, value)`` and
+    returns ``('result', id, values)`` to the one that asked.
+    """
+
+    def __init__(self, conn, worker_id: int, shard_ids: List[int], shard_count: int):
+        self.conn = conn
+        self.worker_id = worker_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.on_stop: Optional[Callable[[], Awaitable]] = None
+        self._handlers: Dict[str, Callable] = {}
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def register(self, command: str, handler: Callable[[Any], Any]):
+        """Answer command from other workers with handler(payload); may be async."""
+        self._handlers[command] = handler
+
+    def start(self):
+        """Start reading from the launcher; needs a running event loop."""
+        self._loop = asyncio.get_running_loop()
+        threading.Thread(target=self._read, name='cluster-ipc', daemon=True).start()
+
+    async def request(self, command: str, payload: Any = None, timeout: float = REQUEST_TIMEOUT) -> List:
+        """Run command on every worker, this one included; returns their answers.
+
+        Workers that fail or miss the deadline are left out.
+        """
+        request_id = next(self._ids)
+        future = self._pending[request_id] = self._loop.create_future()
+        try:
+            self.conn.send(('request', request_id, command, payload))
+            return await asyncio.wait_for(future, timeout + 1)
+        except (asyncio.TimeoutError, OSError) as e:
+            logger.warning(f'Cluster request {command} failed: {str(e) or type(e).__name__}')
+            return []
+        finally:
+            self._pending.pop(request_id, None)
+
+    def _read(self):
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                # The launcher is gone; don't keep running unsupervised
+                logger.error('Lost connection to the cluster launcher')
+                message = ('stop',)
+            self._loop.call_soon_threadsafe(self._dispatch, message)
+            if message[0] == 'stop':
+                return
+
+    def _dispatch(self, message):
+        kind = message[0]
+        if kind == 'call':
+            _, call_id, command, payload = message
+            self._loop.create_task(self._answer(call_id, command, payload))
+        elif kind == 'result':
+            _, request_id, values = message
+            future = self._pending.get(request_id)
+            if future is not None and not future.done():
+                future.set_result(values)
+        elif kind == 'stop' and self.on_stop is not None:
+            self._loop.create_task(self.on_stop())
+
+    async def _answer(self, call_id, command, payload):
+        handler = self._handlers.get(command)
+        try:
+            if handler is None:
+                raise LookupError(f'no handler for {command}')
+            value = handler(payload)
+            if asyncio.iscoroutine(value):
+                value = await value
+            reply = ('reply', call_id, True, value)
+        except Exception as e:
+            logger.error(f'Error answering cluster request {command}: {str(e)}')
+            reply = ('reply', call_id, False, str(e))
+        try:
+            self.conn.send(reply)
+        except OSError:
+            pass
+
+
+def _run_worker(worker_id: int, shard_ids: List[int], shard_count: int, conn):
+    """Entry point of a worker process."""
+    # The launcher handles Ctrl+C for the whole cluster and stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import main
+
+    cluster = ClusterClient(conn, worker_id, shard_ids, shard_count)
+    asyncio.run(main.main(shard_ids=shard_ids, shard_count=shard_count, cluster=cluster))
+
+
+class _Worker:
+    def __init__(self, worker_id: int, shard_ids: List[int]):
+        self.worker_id = worker_id
+        self.shard_ids = shard_ids
+        self.process = None
+        self.conn = None
+        self.started_at = 0.0
+        self.restart_delay = RESTART_DELAY_MIN
+        self.restart_at: Optional[float] = None
+
+
+class _Call:
+    def __init__(self, origin: _Worker, request_id: int, waiting: set, deadline: float):
+        self.origin = origin
+        self.request_id = request_id
+        self.waiting = waiting
+        self.deadline = deadline
+        self.values: Dict[int, Any] = {}
+
+
+class ClusterLauncher:
+    """Starts the workers, restarts them when they die and relays their requests."""
+
+    def __init__(self, shard_count: int, worker_count: int):
+        self.shard_count = shard_count
+        self.context = multiprocessing.get_context('spawn')
+        self.workers = [_Worker(i, shard_ids) for i, shard_ids in enumerate(split_shards(shard_count, worker_count))]
+        self._calls: Dict[int, _Call] = {}
+        self._call_ids = itertools.count(1)
+        self._stopping = False
+
+    def _spawn(self, worker: _Worker):
+        parent_conn, child_conn = self.context.Pipe()
+        worker.process = self.context.Process(
+            target=_run_worker,
+            args=(worker.worker_id, worker.shard_ids, self.shard_count, child_conn),
+            name=f'cluster-{worker.worker_id}'
+        )
+        worker.process.start()
+        child_conn.close()
+        worker.conn = parent_conn
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+        logger.info(f'Started worker {worker.worker_id} (pid {worker.process.pid}) for shards '
+                    f'{worker.shard_ids[0]}-{worker.shard_ids[-1]} of {self.shard_count}')
+
+    def _on_exit(self, worker: _Worker):
+        exitcode = worker.process.exitcode
+        worker.conn.close()
+        worker.conn = None
+        worker.process = None
+        for call_id in list(self._calls):
+            self._drop_waiting(call_id, worker.worker_id)
+        if self._stopping:
+            return
+
+        now = time.monotonic()
+        if now - worker.started_at >= RESTART_RESET_AFTER:
+            worker.restart_delay = RESTART_DELAY_MIN
+        worker.restart_at = now + worker.restart_delay
+        logger.error(f'Worker {worker.worker_id} exited with code {exitcode}; '
+                     f'restarting in {worker.restart_delay:.0f}s')
+        worker.restart_delay = min(worker.restart_delay * 2, RESTART_DELAY_MAX)
+
+    def _send(self, worker: _Worker, message) -> bool:
+        if worker.conn is None:
+            return False
+        try:
+            worker.conn.send(message)
+            return True
+        except OSError:
+            return False
+
+    def _on_message(self, worker: _Worker, message):
+        kind = message[0]
+        if kind == 'request':
+            _, request_id, command, payload = message
+            call_id = next(self._call_ids)
+            waiting = {w.worker_id for w in self.workers if self._send(w, ('call', call_id, command, payload))}
+            self._calls[call_id] = _Call(worker, request_id, waiting, time.monotonic() + REQUEST_TIMEOUT)
+            self._finish_if_done(call_id)
+        elif kind == 'reply':
+            _, call_id, ok, value = message
+            call = self._calls.get(call_id)
+            if call is None:
+                return
+            if ok:
+                call.values[worker.worker_id] = value
+            self._drop_waiting(call_id, worker.worker_id)
+
+    def _drop_waiting(self, call_id: int, worker_id: int):
+        call = self._calls[call_id]
+        call.waiting.discard(worker_id)
+        self._finish_if_done(call_id)
+
+    def _finish_if_done(self, call_id: int, force: bool = False):
+        call = self._calls[call_id]
+        if call.waiting and not force:
+            return
+        del self._calls[call_id]
+        values = [call.values[worker_id] for worker_id in sorted(call.values)]
+        self._send(call.origin, ('result', call.request_id, values))
+
+    def _request_stop(self, *_):
+        if not self._stopping:
+            logger.info('Stopping cluster')
+            self._stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        for worker in self.workers:
+            self._spawn(worker)
+
+        while not self._stopping:
+            now = time.monotonic()
+            for worker in self.workers:
+                if worker.process is None and worker.restart_at is not None and now >= worker.restart_at:
+                    self._spawn(worker)
+            for call_id, call in list(self._calls.items()):
+                if now >= call.deadline:
+                    self._finish_if_done(call_id, force=True)
+
+            running = [w for w in self.workers if w.process is not None]
+            by_handle = {}
+            for worker in running:
+                by_handle[worker.conn] = worker
+                by_handle[worker.process.sentinel] = worker
+            for handle in wait(list(by_handle), timeout=1.0):
+                worker = by_handle[handle]
+                if worker.process is None:
+                    continue
+                if handle is worker.conn:
+                    try:
+                        while worker.conn.poll():
+                            self._on_message(worker, worker.conn.recv())
+                    except (EOFError, OSError):
+                        pass
+                if not worker.process.is_alive():
+                    worker.process.join()
+                    self._on_exit(worker)
+
+        self._shutdown()
+
+    def _shutdown(self):
+        running = [w for w in self.workers if w.process is not None]
+        for worker in running:
+            self._send(worker, ('stop',))
+        deadline = time.monotonic() + SHUTDOWN_GRACE
+        for worker in running:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                logger.warning(f'Worker {worker.worker_id} did not stop in time; terminating it')
+                worker.process.terminate()
+                worker.process.join()
+        logger.info('Cluster stopped')
+
+
+def launch():
+    """Start the cluster as configured by the environment."""
+    import main
+    from bot.wiki_storage import open_wiki_storage
+
+    token = os.getenv('DISCORD_BOT_TOKEN')
+    if not token:
+        logger.error('DISCORD_BOT_TOKEN not found in environment variables')
+        return
+
+    shard_count = os.getenv('SHARD_COUNT')
+    if shard_count:
+        shard_count = int(shard_count)
+    else:
+        try:
+            shard_count = fetch_shard_count(token)
+        except Exception as e:
+            logger.error(f'Error fetching recommended shard count: {str(e)}')
+            return
+    worker_count = int(os.getenv('CLUSTER_WORKERS') or os.cpu_count() or 1)
+
+    # One-time migrations (like splitting a legacy wiki.json) run here, before
+    # any worker could start one of its own
+    open_wiki_storage().close()
+
+    logger.info(f'Launching {min(worker_count, shard_count)} workers for {shard_count} shards')
+    ClusterLauncher(shard_count, worker_count).run()
+
+
+if __name__ == '__main__':
+    launch()
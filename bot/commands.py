@@ -1,17 +1,210 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
+import hashlib
+import json
 import logging
+import math
+import os
+import re
+import tempfile
+from bot.embed_cache import EmbedCache, page_version
 from bot.wiki import WikiSystem
+from bot.wiki_storage import open_wiki_storage
+from bot.wiki_io import detect_format, export_guild_async, import_file_async
 from bot.wiki_scraper import LordOfMysteriesWikiScraper
+from bot.pagination import CursorPaginator, EmbedPaginator
+from bot.ratelimit import CommandLimiter, rejection_message
+from bot.cluster import process_memory
 
 logger = logging.getLogger(__name__)
 
+# Most names accepted by one batch lookup
+MAX_BATCH_NAMES = 10
+
+# Entries per !wikilist page
+WIKI_LIST_PAGE_SIZE = 15
+
+# Revisions shown by !wikihistory
+WIKI_HISTORY_LIMIT = 15
+
+# Choices offered per autocomplete request (Discord's maximum)
+AUTOCOMPLETE_LIMIT = 25
+
+# Hash of the last slash command tree synced to Discord, so unchanged
+# commands are not synced again on every start
+APP_COMMANDS_HASH_FILE = 'app_commands.sha256'
+
+# !wikilist order names (Indonesian and English) mapped to WikiSystem orders
+WIKI_LIST_ORDERS = {
+    'baru': 'created', 'created': 'created', 'new': 'created',
+    'update': 'updated', 'updated': 'updated',
+    'edit': 'edits', 'edits': 'edits',
+    'judul': 'title', 'title': 'title', 'az': 'title',
+}
+WIKI_LIST_ORDER_NAMES = ('baru', 'update', 'edit', 'judul')
+
+def parse_name_list(text):
+    """Split a comma, semicolon, pipe or newline separated list of names."""
+    names = []
+    seen = set()
+    for name in re.split(r'[,;|\n]', text):
+        name = name.strip()
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names
+
+def build_wiki_embed(entry, aliases):
+    """Build the embed for a wiki entry."""
+    embed = discord.Embed(
+        title=f"📖 {entry['title']}",
+        description=entry['content'],
+        color=0x0099ff
+    )
+    if aliases:
+        embed.add_field(name="Alias", value=", ".join(aliases)[:1024], inline=False)
+    embed.set_footer(text=f"Dibuat: {entry['created_at'][:10]} • Edit: {entry['edit_count']} kali")
+    return embed
+
+def build_character_embed(info):
+    """Build the embed for a Lord of Mysteries character."""
+    embed = discord.Embed(
+        title=f"👤 {info['title']}",
+        description=info['description'][:1000] if info['description'] else "Informasi umum tidak tersedia",
+        color=0x8B4513,
+        url=info.get('source_url', '')
+    )
+    
+    # Physical Description
+    if info.get('physical_description'):
+        embed.add_field(
+            name="🧍 Physical Description",
+            value=info['physical_description'][:1000],
+            inline=False
+        )
+    
+    # Pathways & Authorities
+    if info.get('pathways_authorities'):
+        embed.add_field(
+            name="⚡ Pathways & Authorities",
+            value=info['pathways_authorities'][:1000],
+            inline=False
+        )
+    
+    embed.set_footer(text="Sumber: Lord of Mysteries Wiki")
+    return embed
+
+def build_pathway_embed(info):
+    """Build the embed for a Lord of Mysteries pathway."""
+    embed = discord.Embed(
+        title=f"🌟 {info['title']}",
+        color=0x4B0082,
+        url=info.get('source_url', '')
+    )
+    
+    # General Information
+    if info.get('general_information'):
+        embed.add_field(
+            name="📋 General Information",
+            value=info['general_information'][:1000],
+            inline=False
+        )
+    
+    # Sequence Levels
+    if info.get('sequence_levels'):
+        embed.add_field(
+            name="⚡ Sequence Levels",
+            value=info['sequence_levels'][:1000],
+            inline=False
+        )
+    
+    embed.set_footer(text="Sumber: Lord of Mysteries Wiki")
+    return embed
+
+def build_general_embed(info):
+    """Build the embed for a general Lord of Mysteries search result."""
+    embed = discord.Embed(
+        title=f"📖 {info['title']}",
+        description=info['description'][:2000] if len(info['description']) > 2000 else info['description'],
+        color=0x800080,
+        url=info.get('source_url', '')
+    )
+    
+    embed.set_footer(text="Sumber: Lord of Mysteries Wiki")
+    return embed
+
+def build_fact_embed(fact):
+    """Build the embed for a random Lord of Mysteries fact."""
+    embed = discord.Embed(
+        title="🎲 Random Lord of Mysteries Fact",
+        description=fact,
+        color=0xFF6347
+    )
+    
+    embed.set_footer(text="Sumber: Lord of Mysteries Wiki")
+    return embed
+
+def build_search_embed(query, results):
+    """Build the embed listing wiki search results."""
+    embed = discord.Embed(
+        title=f"🔍 Hasil Pencarian: '{query}'",
+        color=0x0099ff
+    )
+    
+    for i, result in enumerate(results[:5], 1):
+        match_icon = "📖" if result['match_type'] == 'title' else "📝"
+        embed.add_field(
+            name=f"{match_icon} {result['title']}",
+            value=result['content'],
+            inline=False
+        )
+    
+    if len(results) > 5:
+        embed.set_footer(text=f"Menampilkan 5 dari {len(results)} hasil. Gunakan judul spesifik untuk melihat entry.")
+    return embed
+
+async def respond(interaction, content=None, **kwargs):
+    """Answer an interaction, as a follow-up if it was already deferred."""
+    if interaction.response.is_done():
+        await interaction.followup.send(content, **kwargs)
+    else:
+        await interaction.response.send_message(content, **kwargs)
+
+def app_commands_hash(bot):
+    """Hash the slash command tree as it would be sent to Discord."""
+    payload = [command.to_dict(bot.tree) for command in bot.tree.get_commands()]
+    text = json.dumps([bot.application_id, payload], sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def read_text(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def guild_id_of(ctx):
+    """The guild a command was used in, or None in DMs."""
+    return ctx.guild.id if ctx.guild else None
+
 async def setup_commands(bot, config):
-    """Setup bot commands."""
+    """Setup bot commands.
+    
+    Returns a coroutine function that releases the wiki and scraper on shutdown.
+    """
     
     # Initialize wiki system and scraper
-    wiki = WikiSystem()
+    wiki = WikiSystem(storage=open_wiki_storage())
     lom_scraper = LordOfMysteriesWikiScraper()
+    embed_cache = EmbedCache()
+    limiter = CommandLimiter(config.get_command_limits)
+    
+    @bot.before_invoke
+    async def wait_for_wiki(ctx):
+        """Let a guild's wiki finish unloading before a command touches it."""
+        if ctx.guild:
+            await wiki.ready(ctx.guild.id)
     
     @bot.command(name='setwelcome')
     @commands.has_permissions(manage_guild=True)
@@ -120,15 +313,20 @@ async def setup_commands(bot, config):
                 await ctx.send("❌ Welcome channel no longer exists. Please set a new one.")
                 return
             
-            # Simulate member join event
-            await ctx.send(f"🧪 Testing welcome message for {member.mention}...")
-            
-            # Trigger the welcome logic (we'll import the image generator here)
-            from bot.image_generator import WelcomeImageGenerator
-            import os
-            
-            image_generator = WelcomeImageGenerator()
-            image_path = await image_generator.create_welcome_image(member)
+            with limiter.use('testwelcome', ctx.author.id, ctx.guild.id) as rejection:
+                if rejection:
+                    await ctx.send(rejection_message(rejection))
+                    return
+                
+                # Simulate member join event
+                await ctx.send(f"🧪 Testing welcome message for {member.mention}...")
+                
+                # Trigger the welcome logic (we'll import the image generator here)
+                from bot.image_generator import WelcomeImageGenerator
+                import os
+                
+                image_generator = WelcomeImageGenerator()
+                image_path = await image_generator.create_welcome_image(member)
             
             if not image_path:
                 await ctx.send("❌ Failed to generate welcome image.")
@@ -195,22 +393,37 @@ async def setup_commands(bot, config):
         await ctx.send(embed=embed)
     
     # Wiki Commands
+    def wiki_entry_embed(title, guild_id):
+        """Get (embed, None) for a wiki entry, or (None, error message)."""
+        # Exact titles and aliases of unchanged entries are served from the cache
+        version = wiki.entry_version(title, guild_id)
+        embed = embed_cache.get(('wiki', *version)) if version else None
+        if embed is not None:
+            return embed, None
+        
+        entry, suggestions = wiki.find_entry(title, guild_id)
+        if not entry:
+            if suggestions:
+                names = ", ".join(f"`{s['title']}`" for s in suggestions)
+                return None, f"❌ Wiki entry '{title}' tidak ditemukan. Mungkin maksudmu: {names}?"
+            return None, f"❌ Wiki entry '{title}' tidak ditemukan. Gunakan `!wikisearch {title}` untuk mencari."
+        
+        embed = build_wiki_embed(entry, wiki.get_aliases(entry['title'], guild_id))
+        if suggestions:
+            embed.set_footer(text=f"Menampilkan hasil untuk '{entry['title']}' • {embed.footer.text}")
+        else:
+            embed_cache.put(('wiki', *version), embed)
+        return embed, None
+    
     @bot.command(name='wiki')
     async def wiki_get(ctx, *, title):
         """Get a wiki entry."""
         try:
-            entry = wiki.get_entry(title, ctx.guild.id)
-            if not entry:
-                await ctx.send(f"❌ Wiki entry '{title}' tidak ditemukan. Gunakan `!wikisearch {title}` untuk mencari.")
+            embed, error = wiki_entry_embed(title, ctx.guild.id)
+            if embed is None:
+                await ctx.send(error)
                 return
             
-            embed = discord.Embed(
-                title=f"📖 {entry['title']}",
-                description=entry['content'],
-                color=0x0099ff
-            )
-            embed.set_footer(text=f"Dibuat: {entry['created_at'][:10]} • Edit: {entry['edit_count']} kali")
-            
             await ctx.send(embed=embed)
             
         except Exception as e:
@@ -283,63 +496,235 @@ async def setup_commands(bot, config):
             logger.error(f'Error deleting wiki entry: {str(e)}')
             await ctx.send("❌ Terjadi kesalahan saat menghapus wiki entry.")
     
-    @bot.command(name='wikisearch')
-    async def wiki_search(ctx, *, query):
-        """Search wiki entries."""
+    @bot.command(name='wikirename')
+    @commands.has_permissions(manage_messages=True)
+    async def wiki_rename(ctx, title, *, new_title):
+        """Rename a wiki entry, keeping its aliases."""
         try:
-            results = wiki.search_entries(query, ctx.guild.id, limit=10)
-            
-            if not results:
-                await ctx.send(f"❌ Tidak ditemukan hasil untuk '{query}'.")
+            success = wiki.rename_entry(title, new_title, ctx.guild.id)
+            if success:
+                embed = discord.Embed(
+                    title="✅ Wiki Entry Diganti Nama",
+                    description=f"Entry **{title}** sekarang bernama **{new_title}**.",
+                    color=0x00ff00
+                )
+                await ctx.send(embed=embed)
+            else:
+                await ctx.send(f"❌ Wiki entry '{title}' tidak ditemukan, atau '{new_title}' sudah ada.")
+                
+        except Exception as e:
+            logger.error(f'Error renaming wiki entry: {str(e)}')
+            await ctx.send("❌ Terjadi kesalahan saat mengganti nama wiki entry.")
+    
+    @bot.command(name='wikialias')
+    @commands.has_permissions(manage_messages=True)
+    async def wiki_alias(ctx, title, *, aliases):
+        """Add one or more comma separated aliases for a wiki entry."""
+        try:
+            names = parse_name_list(aliases)
+            added = wiki.add_aliases(names, title, ctx.guild.id)
+            if added:
+                await ctx.send(f"✅ {added} alias ditambahkan untuk **{title}**.")
+            elif wiki.get_entry(title, ctx.guild.id):
+                await ctx.send("❌ Alias tidak boleh sama dengan judul entry yang sudah ada.")
+            else:
+                await ctx.send(f"❌ Wiki entry '{title}' tidak ditemukan.")
+                
+        except Exception as e:
+            logger.error(f'Error adding wiki aliases: {str(e)}')
+            await ctx.send("❌ Terjadi kesalahan saat menambahkan alias.")
+    
+    @bot.command(name='wikiunalias')
+    @commands.has_permissions(manage_messages=True)
+    async def wiki_unalias(ctx, *, aliases):
+        """Remove one or more comma separated aliases."""
+        try:
+            removed = wiki.remove_aliases(parse_name_list(aliases), ctx.guild.id)
+            if removed:
+                await ctx.send(f"✅ {removed} alias dihapus.")
+            else:
+                await ctx.send("❌ Alias tidak ditemukan.")
+                
+        except Exception as e:
+            logger.error(f'Error removing wiki aliases: {str(e)}')
+            await ctx.send("❌ Terjadi kesalahan saat menghapus alias.")
+    
+    @bot.command(name='wikihistory')
+    async def wiki_history(ctx, *, title):
+        """Show the revision history of a wiki entry."""
+        try:
+            revisions = wiki.entry_history(title, ctx.guild.id)
+            if not revisions:
+                await ctx.send(f"❌ Wiki entry '{title}' tidak ditemukan.")
                 return
             
+            lines = []
+            for revision in revisions[:WIKI_HISTORY_LIMIT]:
+                author = f"<@{revision['author_id']}>" if revision['author_id'] else "?"
+                lines.append(f"`rev {revision['rev']}` • {revision['timestamp'][:16].replace('T', ' ')} • {author}")
+            
             embed = discord.Embed(
-                title=f"🔍 Hasil Pencarian: '{query}'",
+                title=f"🕓 Riwayat: {title}",
+                description="\n".join(lines),
                 color=0x0099ff
             )
+            embed.set_footer(text=f"{len(revisions)} revisi. Gunakan !wikidiff atau !wikirollback dengan nomor rev.")
+            await ctx.send(embed=embed)
             
-            for i, result in enumerate(results[:5], 1):
-                match_icon = "📖" if result['match_type'] == 'title' else "📝"
-                embed.add_field(
-                    name=f"{match_icon} {result['title']}",
-                    value=result['content'],
-                    inline=False
+        except Exception as e:
+            logger.error(f'Error showing wiki history: {str(e)}')
+            await ctx.send("❌ Terjadi kesalahan saat menampilkan riwayat wiki entry.")
+    
+    @bot.command(name='wikidiff')
+    async def wiki_diff(ctx, title, old_rev: int, new_rev: int = None):
+        """Show what changed between two revisions of a wiki entry."""
+        try:
+            if new_rev is None:
+                revisions = wiki.entry_history(title, ctx.guild.id)
+                new_rev = revisions[0]['rev'] if revisions else old_rev
+            
+            diff = wiki.diff_revisions(title, old_rev, new_rev, ctx.guild.id)
+            if diff is None:
+                await ctx.send(f"❌ Revisi tidak ditemukan untuk '{title}'. Cek `!wikihistory {title}`.")
+                return
+            if not diff:
+                await ctx.send(f"📖 Tidak ada perbedaan antara rev {old_rev} dan rev {new_rev}.")
+                return
+            
+            if len(diff) > 1900:
+                diff = diff[:1900] + "\n..."
+            await ctx.send(f"```diff\n{diff}\n```")
+            
+        except Exception as e:
+            logger.error(f'Error diffing wiki revisions: {str(e)}')
+            await ctx.send("❌ Terjadi kesalahan saat membandingkan revisi.")
+    
+    @bot.command(name='wikirollback')
+    @commands.has_permissions(manage_messages=True)
+    async def wiki_rollback(ctx, title, rev: int):
+        """Restore a wiki entry to an earlier revision."""
+        try:
+            success = wiki.rollback_entry(title, rev, ctx.author.id, ctx.guild.id)
+            if success:
+                embed = discord.Embed(
+                    title="✅ Wiki Entry Dikembalikan",
+                    description=f"Entry **{title}** dikembalikan ke rev {rev}.",
+                    color=0x00ff00
                 )
+                await ctx.send(embed=embed)
+            else:
+                await ctx.send(f"❌ Revisi {rev} untuk '{title}' tidak ditemukan.")
+                
+        except Exception as e:
+            logger.error(f'Error rolling back wiki entry: {str(e)}')
+            await ctx.send("❌ Terjadi kesalahan saat mengembalikan wiki entry.")
+    
+    @bot.command(name='wikiimport')
+    @commands.has_permissions(manage_guild=True)
+    async def wiki_import(ctx, mode: str = None):
+        """Import wiki entries from an attached JSONL or CSV file (optionally .gz)."""
+        if not ctx.message.attachments:
+            await ctx.send("❌ Lampirkan file `.jsonl` atau `.csv` (boleh `.gz`) bersama command ini.")
+            return
+        
+        attachment = ctx.message.attachments[0]
+        try:
+            fmt = detect_format(attachment.filename)
+        except ValueError:
+            await ctx.send("❌ Format file tidak didukung. Gunakan `.jsonl` atau `.csv` (boleh `.gz`).")
+            return
+        
+        overwrite = (mode or '').lower() in ('timpa', 'overwrite')
+        status = await ctx.send(f"📥 Mengimpor `{attachment.filename}`...")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, os.path.basename(attachment.filename))
+            try:
+                await attachment.save(path)
+                imported, skipped = await import_file_async(wiki, path, ctx.guild.id, fmt, overwrite)
+                await status.edit(content=f"✅ {imported} entry diimpor, {skipped} dilewati.")
+                
+            except Exception as e:
+                logger.error(f'Error importing wiki entries: {str(e)}')
+                await status.edit(content="❌ Terjadi kesalahan saat mengimpor wiki entries.")
+    
+    @bot.command(name='wikiexport')
+    @commands.has_permissions(manage_messages=True)
+    async def wiki_export(ctx, fmt: str = 'jsonl'):
+        """Export this server's wiki as a JSONL or CSV file."""
+        fmt = fmt.lower()
+        if fmt not in ('jsonl', 'csv'):
+            await ctx.send("❌ Format harus `jsonl` atau `csv`.")
+            return
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"wiki-{ctx.guild.id}.{fmt}")
+            try:
+                count = await export_guild_async(wiki, ctx.guild.id, path, fmt)
+                if not count:
+                    await ctx.send("📖 Belum ada wiki entries di server ini.")
+                    return
+                
+                # Compress exports that are too big to upload as they are
+                if os.path.getsize(path) > ctx.guild.filesize_limit:
+                    path = f"{path}.gz"
+                    count = await export_guild_async(wiki, ctx.guild.id, path, fmt)
+                if os.path.getsize(path) > ctx.guild.filesize_limit:
+                    await ctx.send("❌ Hasil export terlalu besar untuk diunggah. Gunakan `python -m bot.wiki_io export`.")
+                    return
+                
+                await ctx.send(f"📤 {count} wiki entries.", file=discord.File(path))
+                
+            except Exception as e:
+                logger.error(f'Error exporting wiki entries: {str(e)}')
+                await ctx.send("❌ Terjadi kesalahan saat mengekspor wiki entries.")
+    
+    @bot.command(name='wikisearch')
+    async def wiki_search(ctx, *, query):
+        """Search wiki entries."""
+        try:
+            results = wiki.search_entries(query, ctx.guild.id, limit=10)
             
-            if len(results) > 5:
-                embed.set_footer(text=f"Menampilkan 5 dari {len(results)} hasil. Gunakan judul spesifik untuk melihat entry.")
+            if not results:
+                await ctx.send(f"❌ Tidak ditemukan hasil untuk '{query}'.")
+                return
             
-            await ctx.send(embed=embed)
+            await ctx.send(embed=build_search_embed(query, results))
             
         except Exception as e:
             logger.error(f'Error searching wiki: {str(e)}')
             await ctx.send("❌ Terjadi kesalahan saat mencari wiki entries.")
     
     @bot.command(name='wikilist')
-    async def wiki_list(ctx):
-        """List all wiki entries."""
+    async def wiki_list(ctx, order: str = 'baru'):
+        """List all wiki entries, a page at a time."""
         try:
-            entries = wiki.list_entries(ctx.guild.id, limit=15)
+            sort = WIKI_LIST_ORDERS.get(order.lower())
+            if not sort:
+                await ctx.send(f"❌ Urutan tidak dikenal. Pilihan: {', '.join(f'`{name}`' for name in WIKI_LIST_ORDER_NAMES)}")
+                return
             
+            entries, _, total = wiki.list_page(ctx.guild.id, sort, limit=WIKI_LIST_PAGE_SIZE)
             if not entries:
                 await ctx.send("📖 Belum ada wiki entries di server ini. Gunakan `!wikiadd` untuk menambahkan.")
                 return
             
-            embed = discord.Embed(
-                title="📚 Daftar Wiki Entries",
-                color=0x0099ff
-            )
-            
-            for entry in entries:
-                embed.add_field(
-                    name=entry['title'],
-                    value=f"{entry['content']}\n*Edit: {entry['edit_count']} kali*",
-                    inline=True
+            async def fetch(cursor):
+                page, next_cursor, count = wiki.list_page(ctx.guild.id, sort, after=cursor, limit=WIKI_LIST_PAGE_SIZE)
+                embed = discord.Embed(
+                    title="📚 Daftar Wiki Entries",
+                    color=0x0099ff
                 )
+                for entry in page:
+                    embed.add_field(
+                        name=entry['title'],
+                        value=f"{entry['content']}\n*Edit: {entry['edit_count']} kali*",
+                        inline=True
+                    )
+                embed.set_footer(text=f"Total: {count} entries • Urutan: {order.lower()}. Gunakan !wiki <judul> untuk membaca.")
+                return embed, next_cursor
             
-            embed.set_footer(text=f"Total: {len(entries)} entries. Gunakan !wiki <judul> untuk membaca.")
-            
-            await ctx.send(embed=embed)
+            page_count = -(-total // WIKI_LIST_PAGE_SIZE)
+            await CursorPaginator(fetch, ctx.author.id, page_count=page_count).send(ctx)
             
         except Exception as e:
             logger.error(f'Error listing wiki entries: {str(e)}')
@@ -359,7 +744,9 @@ async def setup_commands(bot, config):
             value=(
                 "`!wiki <judul>` - Lihat wiki entry\n"
                 "`!wikisearch <kata>` - Cari dalam wiki\n"
-                "`!wikilist` - Daftar semua entries\n"
+                "`!wikilist [baru|update|edit|judul]` - Daftar semua entries\n"
+                "`!wikihistory <judul>` - Riwayat revisi entry\n"
+                "`!wikidiff <judul> <rev> [rev]` - Bandingkan revisi\n"
             ),
             inline=False
         )
@@ -370,13 +757,19 @@ async def setup_commands(bot, config):
                 "`!wikiadd <judul> <isi>` - Tambah entry baru\n"
                 "`!wikiedit <judul> <isi>` - Edit entry\n"
                 "`!wikidelete <judul>` - Hapus entry\n"
+                "`!wikirename <judul> <judul baru>` - Ganti nama entry\n"
+                "`!wikialias <judul> <alias, ...>` - Tambah alias\n"
+                "`!wikiunalias <alias, ...>` - Hapus alias\n"
+                "`!wikirollback <judul> <rev>` - Kembalikan ke revisi lama\n"
+                "`!wikiimport [timpa]` + file - Impor entries dari JSONL/CSV\n"
+                "`!wikiexport [jsonl|csv]` - Ekspor semua entries\n"
             ),
             inline=False
         )
         
         embed.add_field(
             name="💡 Tips",
-            value="• Judul tidak case-sensitive\n• Gunakan tanda kutip untuk judul dengan spasi\n• Konten bisa panjang dan multi-line",
+            value="• Judul tidak case-sensitive\n• Gunakan tanda kutip untuk judul dengan spasi\n• Konten bisa panjang dan multi-line\n• `/wiki` dan `/wikisearch` juga tersedia, dengan saran judul saat mengetik",
             inline=False
         )
         
@@ -387,40 +780,26 @@ async def setup_commands(bot, config):
     async def lom_character(ctx, *, character_name):
         """Search for a Lord of Mysteries character."""
         try:
-            # Send initial message
-            search_msg = await ctx.send(f"🔍 Mencari informasi karakter '{character_name}' di Lord of Mysteries Wiki...")
-            
-            info = await lom_scraper.search_character(character_name)
-            if not info:
-                await search_msg.edit(content=f"❌ Karakter '{character_name}' tidak ditemukan di wiki.")
+            # Pages already cached are answered without a progress message
+            info = lom_scraper.cached_character(character_name)
+            if info:
+                await ctx.send(embed=lom_embed('character', info, build_character_embed))
                 return
             
-            embed = discord.Embed(
-                title=f"👤 {info['title']}",
-                description=info['description'][:1000] if info['description'] else "Informasi umum tidak tersedia",
-                color=0x8B4513,
-                url=info.get('source_url', '')
-            )
-            
-            # Physical Description
-            if info.get('physical_description'):
-                embed.add_field(
-                    name="🧍 Physical Description",
-                    value=info['physical_description'][:1000] if len(info['physical_description']) > 1000 else info['physical_description'],
-                    inline=False
-                )
-            
-            # Pathways & Authorities
-            if info.get('pathways_authorities'):
-                embed.add_field(
-                    name="⚡ Pathways & Authorities",
-                    value=info['pathways_authorities'][:1000] if len(info['pathways_authorities']) > 1000 else info['pathways_authorities'],
-                    inline=False
-                )
-            
-            embed.set_footer(text="Sumber: Lord of Mysteries Wiki")
+            with limiter.use('lomchar', ctx.author.id, guild_id_of(ctx)) as rejection:
+                if rejection:
+                    await ctx.send(rejection_message(rejection))
+                    return
+                
+                # Send initial message
+                search_msg = await ctx.send(f"🔍 Mencari informasi karakter '{character_name}' di Lord of Mysteries Wiki...")
+                
+                info = await lom_scraper.search_character(character_name)
+                if not info:
+                    await search_msg.edit(content=f"❌ Karakter '{character_name}' tidak ditemukan di wiki.")
+                    return
             
-            await search_msg.edit(content="", embed=embed)
+            await search_msg.edit(content="", embed=lom_embed('character', info, build_character_embed))
             
         except Exception as e:
             logger.error(f'Error searching LOM character: {str(e)}')
@@ -430,64 +809,121 @@ async def setup_commands(bot, config):
     async def lom_pathway(ctx, *, pathway_name):
         """Search for a Lord of Mysteries pathway."""
         try:
-            await ctx.send(f"🔍 Mencari informasi pathway '{pathway_name}' di Lord of Mysteries Wiki...")
-            
-            info = await lom_scraper.search_pathway(pathway_name)
+            info = lom_scraper.cached_pathway(pathway_name)
             if not info:
-                await ctx.send(f"❌ Pathway '{pathway_name}' tidak ditemukan di wiki.")
-                return
+                with limiter.use('lompath', ctx.author.id, guild_id_of(ctx)) as rejection:
+                    if rejection:
+                        await ctx.send(rejection_message(rejection))
+                        return
+                    
+                    await ctx.send(f"🔍 Mencari informasi pathway '{pathway_name}' di Lord of Mysteries Wiki...")
+                    
+                    info = await lom_scraper.search_pathway(pathway_name)
+                    if not info:
+                        await ctx.send(f"❌ Pathway '{pathway_name}' tidak ditemukan di wiki.")
+                        return
             
-            embed = discord.Embed(
-                title=f"🌟 {info['title']}",
-                color=0x4B0082,
-                url=info.get('source_url', '')
-            )
+            await ctx.send(embed=lom_embed('pathway', info, build_pathway_embed))
             
-            # General Information
-            if info.get('general_information'):
-                embed.add_field(
-                    name="📋 General Information",
-                    value=info['general_information'][:1000] if len(info['general_information']) > 1000 else info['general_information'],
-                    inline=False
-                )
-            
-            # Sequence Levels
-            if info.get('sequence_levels'):
-                embed.add_field(
-                    name="⚡ Sequence Levels",
-                    value=info['sequence_levels'][:1000] if len(info['sequence_levels']) > 1000 else info['sequence_levels'],
-                    inline=False
-                )
-            
-            embed.set_footer(text="Sumber: Lord of Mysteries Wiki")
+        except Exception as e:
+            logger.error(f'Error searching LOM pathway: {str(e)}')
+            await ctx.send("❌ Terjadi kesalahan saat mencari pathway.")
+    
+    def lom_embed(kind, info, build_embed):
+        """Get the embed for a scraped page, built once per page version."""
+        return embed_cache.get_or_build((kind, info['title'], page_version(info)), lambda: build_embed(info))
+    
+    async def send_batch(ctx, command, names, label, kind, cached, search, build_embed):
+        """Look up several names concurrently and page through the results.
+        
+        Batches whose pages are all cached skip the command's limits.
+        """
+        name_list = parse_name_list(names)
+        if not name_list:
+            await ctx.send(f"❌ Tulis nama {label} dipisahkan koma, contoh: `Klein Moretti, Audrey Hall`.")
+            return
+        
+        if len(name_list) > MAX_BATCH_NAMES:
+            await ctx.send(f"❌ Maksimal {MAX_BATCH_NAMES} nama sekaligus.")
+            return
+        
+        if all(cached(name) for name in name_list):
+            results = await lom_scraper.search_many(search, name_list)
+            search_msg = None
+        else:
+            with limiter.use(command, ctx.author.id, guild_id_of(ctx)) as rejection:
+                if rejection:
+                    await ctx.send(rejection_message(rejection))
+                    return
+                
+                search_msg = await ctx.send(f"🔍 Mencari {len(name_list)} {label} di Lord of Mysteries Wiki...")
+                
+                results = await lom_scraper.search_many(search, name_list)
+        
+        pages = [lom_embed(kind, info, build_embed).copy() for info in results if info]
+        missing = [name for name, info in zip(name_list, results) if not info]
+        
+        if not pages:
+            not_found = f"❌ Tidak ada {label} yang ditemukan di wiki."
+            if search_msg:
+                await search_msg.edit(content=not_found)
+            else:
+                await ctx.send(not_found)
+            return
+        
+        if missing:
+            for page in pages:
+                page.set_footer(text=f"Sumber: Lord of Mysteries Wiki • Tidak ditemukan: {', '.join(missing)}"[:2048])
+        
+        if search_msg:
+            await search_msg.delete()
+        await EmbedPaginator(pages, ctx.author.id).send(ctx)
+    
+    @bot.command(name='lomchars', aliases=['characters'])
+    async def lom_characters(ctx, *, names):
+        """Search for several Lord of Mysteries characters at once."""
+        try:
+            await send_batch(
+                ctx, 'lomchars', names, "karakter", 'character',
+                lom_scraper.cached_character, lom_scraper.search_character, build_character_embed
+            )
             
-            await ctx.send(embed=embed)
+        except Exception as e:
+            logger.error(f'Error searching LOM characters: {str(e)}')
+            await ctx.send("❌ Terjadi kesalahan saat mencari karakter.")
+    
+    @bot.command(name='lompaths', aliases=['pathways'])
+    async def lom_pathways(ctx, *, names):
+        """Search for several Lord of Mysteries pathways at once."""
+        try:
+            await send_batch(
+                ctx, 'lompaths', names, "pathway", 'pathway',
+                lom_scraper.cached_pathway, lom_scraper.search_pathway, build_pathway_embed
+            )
             
         except Exception as e:
-            logger.error(f'Error searching LOM pathway: {str(e)}')
+            logger.error(f'Error searching LOM pathways: {str(e)}')
             await ctx.send("❌ Terjadi kesalahan saat mencari pathway.")
     
     @bot.command(name='lomsearch')
     async def lom_search(ctx, *, search_term):
         """Search for anything on Lord of Mysteries Wiki."""
         try:
-            await ctx.send(f"🔍 Mencari '{search_term}' di Lord of Mysteries Wiki...")
-            
-            info = await lom_scraper.search_general(search_term)
+            info = lom_scraper.cached_general(search_term)
             if not info:
-                await ctx.send(f"❌ '{search_term}' tidak ditemukan di wiki.")
-                return
+                with limiter.use('lomsearch', ctx.author.id, guild_id_of(ctx)) as rejection:
+                    if rejection:
+                        await ctx.send(rejection_message(rejection))
+                        return
+                    
+                    await ctx.send(f"🔍 Mencari '{search_term}' di Lord of Mysteries Wiki...")
+                    
+                    info = await lom_scraper.search_general(search_term)
+                    if not info:
+                        await ctx.send(f"❌ '{search_term}' tidak ditemukan di wiki.")
+                        return
             
-            embed = discord.Embed(
-                title=f"📖 {info['title']}",
-                description=info['description'][:2000] if len(info['description']) > 2000 else info['description'],
-                color=0x800080,
-                url=info.get('source_url', '')
-            )
-            
-            embed.set_footer(text="Sumber: Lord of Mysteries Wiki")
-            
-            await ctx.send(embed=embed)
+            await ctx.send(embed=build_general_embed(info))
             
         except Exception as e:
             logger.error(f'Error searching LOM wiki: {str(e)}')
@@ -497,22 +933,19 @@ async def setup_commands(bot, config):
     async def lom_fact(ctx):
         """Get a random Lord of Mysteries fact."""
         try:
-            fact_msg = await ctx.send("🎲 Mengambil fakta random dari Lord of Mysteries Wiki...")
-            
-            fact = await lom_scraper.get_random_fact()
+            with limiter.use('lomfact', ctx.author.id, guild_id_of(ctx)) as rejection:
+                if rejection:
+                    await ctx.send(rejection_message(rejection))
+                    return
+                
+                fact_msg = await ctx.send("🎲 Mengambil fakta random dari Lord of Mysteries Wiki...")
+                
+                fact = await lom_scraper.get_random_fact()
             if not fact:
                 await fact_msg.edit(content="❌ Tidak bisa mengambil fakta saat ini.")
                 return
             
-            embed = discord.Embed(
-                title="🎲 Random Lord of Mysteries Fact",
-                description=fact,
-                color=0xFF6347
-            )
-            
-            embed.set_footer(text="Sumber: Lord of Mysteries Wiki")
-            
-            await fact_msg.edit(content="", embed=embed)
+            await fact_msg.edit(content="", embed=build_fact_embed(fact))
             
         except Exception as e:
             logger.error(f'Error getting LOM fact: {str(e)}')
@@ -532,6 +965,8 @@ async def setup_commands(bot, config):
             value=(
                 "`!lomchar <nama>` - Cari karakter\n"
                 "`!lompath <nama>` - Cari pathway\n"
+                "`!lomchars <nama1, nama2, ...>` - Cari beberapa karakter sekaligus\n"
+                "`!lompaths <nama1, nama2, ...>` - Cari beberapa pathway sekaligus\n"
                 "`!lomsearch <kata>` - Cari apapun di wiki\n"
                 "`!lomfact` - Fakta random\n"
             ),
@@ -544,6 +979,7 @@ async def setup_commands(bot, config):
                 "• Gunakan nama bahasa Inggris untuk hasil terbaik\n"
                 "• Contoh: `!lomchar Klein Moretti`\n"
                 "• Contoh: `!lompath Fool`\n"
+                "• `/lomchar`, `/lompath`, `/lomsearch` dan `/lomfact` juga tersedia, dengan saran judul saat mengetik\n"
                 "• Bot akan mencari di wiki resmi Lord of Mysteries"
             ),
             inline=False
@@ -553,6 +989,58 @@ async def setup_commands(bot, config):
         
         await ctx.send(embed=embed)
     
+    def cluster_stats(_payload=None):
+        """This process's share of the bot, for !clusterstats."""
+        wiki_stats = wiki.partition_stats()
+        return {
+            'worker': cluster.worker_id if cluster else 0,
+            'shards': cluster.shard_ids if cluster else sorted(getattr(bot, 'shards', {})) or [0],
+            'guilds': len(bot.guilds),
+            'members_cached': bot.member_cache.cached_members() if hasattr(bot, 'member_cache') else 0,
+            'latency': bot.latency,
+            'wiki_resident': wiki_stats['resident'],
+            'wiki_entries': wiki_stats['resident_entries'],
+            'memory': process_memory()
+        }
+    
+    cluster = getattr(bot, 'cluster', None)
+    if cluster is not None:
+        cluster.register('stats', cluster_stats)
+    
+    @bot.command(name='clusterstats')
+    @commands.has_permissions(manage_guild=True)
+    async def cluster_stats_command(ctx):
+        """Tampilkan statistik semua proses bot."""
+        try:
+            workers = await cluster.request('stats') if cluster else [cluster_stats()]
+            if not workers:
+                await ctx.send("❌ Tidak bisa mengambil statistik cluster saat ini.")
+                return
+            
+            embed = discord.Embed(
+                title="📊 Statistik Cluster",
+                description=f"{len(workers)} proses • {sum(w['guilds'] for w in workers)} server",
+                color=0x0099ff
+            )
+            for w in workers:
+                latency = f"{w['latency'] * 1000:.0f} ms" if math.isfinite(w['latency']) else "-"
+                embed.add_field(
+                    name=f"Worker {w['worker']} (shard {w['shards'][0]}-{w['shards'][-1]})",
+                    value=(
+                        f"Server: {w['guilds']}\n"
+                        f"Latency: {latency}\n"
+                        f"Member di cache: {w['members_cached']}\n"
+                        f"Wiki dimuat: {w['wiki_resident']} server, {w['wiki_entries']} entries\n"
+                        f"Memori: {w['memory'] / (1024 * 1024):.0f} MB"
+                    ),
+                    inline=True
+                )
+            await ctx.send(embed=embed)
+            
+        except Exception as e:
+            logger.error(f'Error getting cluster stats: {str(e)}')
+            await ctx.send("❌ Terjadi kesalahan saat mengambil statistik cluster.")
+    
     # Test command untuk debugging
     @bot.command(name='test')
     async def test_command(ctx):
@@ -582,8 +1070,183 @@ async def setup_commands(bot, config):
     @wiki_add.error
     @wiki_edit.error
     @wiki_delete.error
+    @wiki_rename.error
+    @wiki_alias.error
+    @wiki_unalias.error
+    @wiki_rollback.error
+    @wiki_import.error
+    @wiki_export.error
+    @cluster_stats_command.error
     async def permission_error(ctx, error):
         if isinstance(error, commands.MissingPermissions):
             await ctx.send("❌ You need the 'Manage Messages' permission to use this command.")
         else:
             logger.error(f'Command error: {str(error)}')
+    
+    # Slash commands: lookups answer at once from memory, while anything
+    # that may hit the network defers first and follows up when done
+    async def wiki_title_autocomplete(interaction: discord.Interaction, current: str):
+        if interaction.guild_id is None:
+            return []
+        await wiki.ready(interaction.guild_id)
+        return [
+            app_commands.Choice(name=title[:100], value=title[:100])
+            for title in wiki.complete_titles(current, interaction.guild_id, AUTOCOMPLETE_LIMIT)
+        ]
+    
+    async def lom_title_autocomplete(interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=title[:100], value=title[:100])
+            for title in lom_scraper.complete_titles(current, AUTOCOMPLETE_LIMIT)
+        ]
+    
+    @bot.tree.command(name='wiki', description="Tampilkan wiki entry")
+    @app_commands.guild_only()
+    @app_commands.describe(title="Judul atau alias entry")
+    @app_commands.autocomplete(title=wiki_title_autocomplete)
+    async def wiki_get_slash(interaction: discord.Interaction, title: str):
+        try:
+            await wiki.ready(interaction.guild_id)
+            embed, error = wiki_entry_embed(title, interaction.guild_id)
+            if embed is None:
+                await respond(interaction, error, ephemeral=True)
+                return
+            await respond(interaction, embed=embed)
+            
+        except Exception as e:
+            logger.error(f'Error getting wiki entry: {str(e)}')
+            await respond(interaction, "❌ Terjadi kesalahan saat mengambil wiki entry.", ephemeral=True)
+    
+    @bot.tree.command(name='wikisearch', description="Cari wiki entries berdasarkan judul atau isi")
+    @app_commands.guild_only()
+    @app_commands.describe(query="Kata kunci")
+    async def wiki_search_slash(interaction: discord.Interaction, query: str):
+        try:
+            await wiki.ready(interaction.guild_id)
+            results = wiki.search_entries(query, interaction.guild_id, limit=10)
+            if not results:
+                await respond(interaction, f"❌ Tidak ditemukan hasil untuk '{query}'.", ephemeral=True)
+                return
+            await respond(interaction, embed=build_search_embed(query, results))
+            
+        except Exception as e:
+            logger.error(f'Error searching wiki: {str(e)}')
+            await respond(interaction, "❌ Terjadi kesalahan saat mencari wiki entries.", ephemeral=True)
+    
+    async def lom_lookup_slash(interaction, command, name, kind, cached, search, build_embed, label):
+        """Answer a LoM page lookup, deferring only when the page must be fetched."""
+        try:
+            info = cached(name)
+            if not info:
+                with limiter.use(command, interaction.user.id, interaction.guild_id) as rejection:
+                    if rejection:
+                        await respond(interaction, rejection_message(rejection), ephemeral=True)
+                        return
+                    await interaction.response.defer(thinking=True)
+                    info = await search(name)
+            if not info:
+                await respond(interaction, f"❌ {label} '{name}' tidak ditemukan di wiki.")
+                return
+            await respond(interaction, embed=lom_embed(kind, info, build_embed))
+            
+        except Exception as e:
+            logger.error(f'Error searching LOM {kind}: {str(e)}')
+            await respond(interaction, f"❌ Terjadi kesalahan saat mencari {label.lower()}.")
+    
+    @bot.tree.command(name='lomchar', description="Cari karakter Lord of Mysteries")
+    @app_commands.describe(name="Nama karakter")
+    @app_commands.autocomplete(name=lom_title_autocomplete)
+    async def lom_character_slash(interaction: discord.Interaction, name: str):
+        await lom_lookup_slash(
+            interaction, 'lomchar', name, 'character', lom_scraper.cached_character,
+            lom_scraper.search_character, build_character_embed, "Karakter"
+        )
+    
+    @bot.tree.command(name='lompath', description="Cari pathway Lord of Mysteries")
+    @app_commands.describe(name="Nama pathway")
+    @app_commands.autocomplete(name=lom_title_autocomplete)
+    async def lom_pathway_slash(interaction: discord.Interaction, name: str):
+        await lom_lookup_slash(
+            interaction, 'lompath', name, 'pathway', lom_scraper.cached_pathway,
+            lom_scraper.search_pathway, build_pathway_embed, "Pathway"
+        )
+    
+    @bot.tree.command(name='lomsearch', description="Cari apa saja di Lord of Mysteries Wiki")
+    @app_commands.describe(query="Kata kunci")
+    @app_commands.autocomplete(query=lom_title_autocomplete)
+    async def lom_search_slash(interaction: discord.Interaction, query: str):
+        try:
+            info = lom_scraper.cached_general(query)
+            if not info:
+                with limiter.use('lomsearch', interaction.user.id, interaction.guild_id) as rejection:
+                    if rejection:
+                        await respond(interaction, rejection_message(rejection), ephemeral=True)
+                        return
+                    await interaction.response.defer(thinking=True)
+                    info = await lom_scraper.search_general(query)
+            if not info:
+                await respond(interaction, f"❌ '{query}' tidak ditemukan di wiki.")
+                return
+            await respond(interaction, embed=build_general_embed(info))
+            
+        except Exception as e:
+            logger.error(f'Error searching LOM wiki: {str(e)}')
+            await respond(interaction, "❌ Terjadi kesalahan saat mencari di wiki.")
+    
+    @bot.tree.command(name='lomfact', description="Fakta random dari Lord of Mysteries Wiki")
+    async def lom_fact_slash(interaction: discord.Interaction):
+        try:
+            with limiter.use('lomfact', interaction.user.id, interaction.guild_id) as rejection:
+                if rejection:
+                    await respond(interaction, rejection_message(rejection), ephemeral=True)
+                    return
+                await interaction.response.defer(thinking=True)
+                fact = await lom_scraper.get_random_fact()
+            if not fact:
+                await respond(interaction, "❌ Tidak bisa mengambil fakta saat ini.")
+                return
+            await respond(interaction, embed=build_fact_embed(fact))
+            
+        except Exception as e:
+            logger.error(f'Error getting LOM fact: {str(e)}')
+            await respond(interaction, "❌ Terjadi kesalahan saat mengambil fakta.")
+    
+    app_commands_synced = False
+    
+    async def sync_app_commands():
+        """Register the slash commands with Discord when they changed.
+        
+        The commands are global, so only the process owning shard 0 syncs
+        them, and only if the tree differs from the last one synced.
+        """
+        nonlocal app_commands_synced
+        if app_commands_synced:
+            return
+        app_commands_synced = True
+        if cluster is not None and 0 not in cluster.shard_ids:
+            return
+        
+        tree_hash = app_commands_hash(bot)
+        if read_text(APP_COMMANDS_HASH_FILE) == tree_hash:
+            logger.info('Slash commands unchanged since the last sync')
+            return
+        try:
+            synced = await bot.tree.sync()
+            logger.info(f'Synced {len(synced)} slash commands')
+        except discord.HTTPException as e:
+            logger.error(f'Error syncing slash commands: {str(e)}')
+            return
+        try:
+            with open(APP_COMMANDS_HASH_FILE, 'w', encoding='utf-8') as f:
+                f.write(tree_hash)
+        except OSError as e:
+            logger.warning(f'Could not record the synced slash commands: {str(e)}')
+    
+    bot.add_listener(sync_app_commands, 'on_ready')
+    
+    async def shutdown():
+        """Flush the wiki and close the scraper's connections."""
+        wiki.close()
+        await lom_scraper.close()
+    
+    return shutdown
@@ -1,53 +1,202 @@
-import json
-import os
+import asyncio
 import logging
+import os
+from typing import Dict, Optional
+
+from bot.journal import JournaledJsonStore
 
 logger = logging.getLogger(__name__)
 
+# Cooldowns ([uses, seconds]) and concurrency limits of the commands that
+# fetch from the network or render images; config.json can override them
+# under "command_limits", globally or per guild
+DEFAULT_COMMAND_LIMITS = {
+    'lomchar': {'user': [3, 30], 'guild': [20, 60], 'concurrency': 1, 'guild_concurrency': 4},
+    'lompath': {'user': [3, 30], 'guild': [20, 60], 'concurrency': 1, 'guild_concurrency': 4},
+    'lomsearch': {'user': [3, 30], 'guild': [20, 60], 'concurrency': 1, 'guild_concurrency': 4},
+    'lomchars': {'user': [1, 60], 'guild': [5, 60], 'concurrency': 1, 'guild_concurrency': 2},
+    'lompaths': {'user': [1, 60], 'guild': [5, 60], 'concurrency': 1, 'guild_concurrency': 2},
+    'lomfact': {'user': [2, 30], 'guild': [10, 60], 'concurrency': 1, 'guild_concurrency': 2},
+    'testwelcome': {'user': [2, 60], 'guild': [5, 60], 'concurrency': 1, 'guild_concurrency': 1},
+}
+
+# Which members discord.py keeps in memory, overridable under "member_cache":
+# only members who joined while the bot runs, dropped joined_ttl seconds
+# after joining (0 keeps them), and no member chunking on startup
+DEFAULT_MEMBER_CACHE = {'voice': False, 'joined': True, 'chunk_guilds_at_startup': False, 'joined_ttl': 3600}
+
+# How often config.json is checked for changes made outside the bot
+CONFIG_POLL_INTERVAL = 5
+
+
+def _is_count(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_cooldown(value):
+    """Whether value is a [uses, seconds] pair of positive numbers."""
+    return (
+        isinstance(value, list) and len(value) == 2 and _is_count(value[0]) and value[0] > 0
+        and isinstance(value[1], (int, float)) and not isinstance(value[1], bool) and value[1] > 0
+    )
+
+
+def parse_command_limits(data, where: str) -> Dict:
+    """Validate a "command_limits" section, dropping commands and limits of the wrong shape.
+    
+    "user" and "guild" take a [uses, seconds] pair and the concurrency
+    limits a whole number; null, or a concurrency of 0, turns a limit off.
+    """
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        logger.warning(f'Ignoring invalid command_limits {data!r} in {where}')
+        return {}
+    
+    command_limits = {}
+    for command, limits in data.items():
+        if not isinstance(limits, dict):
+            logger.warning(f'Ignoring invalid command_limits.{command} {limits!r} in {where}')
+            continue
+        valid = {}
+        for key, value in limits.items():
+            if key in ('user', 'guild'):
+                ok = value is None or _is_cooldown(value)
+            elif key in ('concurrency', 'guild_concurrency'):
+                ok = value is None or _is_count(value) and value >= 0
+            else:
+                ok = False
+            if ok:
+                valid[key] = value
+            else:
+                logger.warning(f'Ignoring invalid command_limits.{command}.{key} {value!r} in {where}')
+        command_limits[command] = valid
+    return command_limits
+
+
+class GuildSettings:
+    """Typed settings of one guild, built from its section of config.json."""
+    
+    __slots__ = ('welcome_channel', 'command_limits')
+    
+    def __init__(self, welcome_channel: Optional[int] = None, command_limits: Optional[Dict] = None):
+        self.welcome_channel = welcome_channel
+        self.command_limits = command_limits or {}
+    
+    @classmethod
+    def from_dict(cls, guild_id_str, data):
+        """Build settings from a raw guild dict, dropping values of the wrong type."""
+        welcome_channel = data.get('welcome_channel')
+        if welcome_channel is not None:
+            try:
+                welcome_channel = int(welcome_channel)
+            except (TypeError, ValueError):
+                logger.warning(f'Ignoring invalid welcome_channel {welcome_channel!r} for guild {guild_id_str}')
+                welcome_channel = None
+        
+        command_limits = parse_command_limits(data.get('command_limits'), f'guild {guild_id_str}')
+        return cls(welcome_channel, command_limits)
+
+
+class MemberCacheSettings:
+    """Typed member cache settings, built from the "member_cache" section.
+    
+    The cache flags and chunking apply when the bot is created; joined_ttl
+    is read on every sweep, so a reload changes it at once.
+    """
+    
+    __slots__ = ('voice', 'joined', 'chunk_guilds_at_startup', 'joined_ttl')
+    
+    def __init__(self, voice, joined, chunk_guilds_at_startup, joined_ttl):
+        self.voice = voice
+        self.joined = joined
+        self.chunk_guilds_at_startup = chunk_guilds_at_startup
+        self.joined_ttl = joined_ttl
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Build settings over the defaults, dropping values of the wrong type."""
+        settings = dict(DEFAULT_MEMBER_CACHE)
+        if not isinstance(data, dict):
+            return cls(**settings)
+        
+        for key in ('voice', 'joined', 'chunk_guilds_at_startup'):
+            value = data.get(key, settings[key])
+            if isinstance(value, bool):
+                settings[key] = value
+            else:
+                logger.warning(f'Ignoring invalid member_cache.{key} {value!r}')
+        
+        joined_ttl = data.get('joined_ttl', settings['joined_ttl'])
+        if isinstance(joined_ttl, (int, float)) and not isinstance(joined_ttl, bool) and joined_ttl >= 0:
+            settings['joined_ttl'] = joined_ttl
+        else:
+            logger.warning(f'Ignoring invalid member_cache.joined_ttl {joined_ttl!r}')
+        return cls(**settings)
+
+
 class BotConfig:
-    """Manages bot configuration including welcome channels for each guild."""
+    """Manages bot configuration including welcome channels for each guild.
+    
+    Lookups go through typed GuildSettings keyed by integer guild ID, rebuilt
+    from the raw JSON whenever it changes. watch() reloads config.json when
+    it is edited while the bot runs; changes the bot journaled itself are
+    replayed on top, so they win over a hand edit of the same setting. The
+    same poll picks up changes made by other cluster workers.
+    """
     
     def __init__(self, config_file='config.json'):
         self.config_file = config_file
+        self.store = JournaledJsonStore(config_file, lambda: {'guilds': {}}, indent=2)
+        self._changes = 0
+        self._watcher = None
+        self._file_state = None
         self.config = self._load_config()
+        self._file_state = self._stat()
     
     def _load_config(self):
-        """Load configuration from file."""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    return json.load(f)
-            else:
-                return {'guilds': {}}
-        except Exception as e:
-            logger.error(f'Error loading config: {str(e)}')
-            return {'guilds': {}}
+        """Load configuration from the snapshot and journal."""
+        config = self.store.load()
+        self._adopt(config)
+        return config
     
-    def _save_config(self):
-        """Save configuration to file."""
-        try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
-        except Exception as e:
-            logger.error(f'Error saving config: {str(e)}')
+    def _adopt(self, config):
+        """Make config the current data and rebuild the typed index from it."""
+        if not isinstance(config.get('guilds'), dict):
+            config['guilds'] = {}
+        guilds = {}
+        for guild_id_str, data in config['guilds'].items():
+            try:
+                guild_id = int(guild_id_str)
+            except ValueError:
+                logger.warning(f'Ignoring config for invalid guild ID {guild_id_str!r}')
+                continue
+            if isinstance(data, dict):
+                guilds[guild_id] = GuildSettings.from_dict(guild_id_str, data)
+        command_limits = parse_command_limits(config.get('command_limits'), self.config_file)
+        member_cache = MemberCacheSettings.from_dict(config.get('member_cache'))
+        
+        # Swap everything at once, so no lookup sees half of each
+        self.store.data = self.config = config
+        self._guilds, self._command_limits = guilds, command_limits
+        self._member_cache = member_cache
+    
+    def _refresh_guild(self, guild_id):
+        """Rebuild one guild's settings after the bot changed them."""
+        self._changes += 1
+        guild_id_str = str(guild_id)
+        self._guilds[int(guild_id)] = GuildSettings.from_dict(guild_id_str, self.config['guilds'].get(guild_id_str, {}))
     
     def get_welcome_channel(self, guild_id):
         """Get welcome channel ID for a guild."""
-        guild_id_str = str(guild_id)
-        return self.config.get('guilds', {}).get(guild_id_str, {}).get('welcome_channel')
+        settings = self._guilds.get(guild_id)
+        return settings.welcome_channel if settings else None
     
     def set_welcome_channel(self, guild_id, channel_id):
         """Set welcome channel ID for a guild."""
         guild_id_str = str(guild_id)
-        
-        if 'guilds' not in self.config:
-            self.config['guilds'] = {}
-        
-        if guild_id_str not in self.config['guilds']:
-            self.config['guilds'][guild_id_str] = {}
-        
-        self.config['guilds'][guild_id_str]['welcome_channel'] = channel_id
-        self._save_config()
+        self.store.set(['guilds', guild_id_str, 'welcome_channel'], channel_id)
+        self._refresh_guild(guild_id)
         
         logger.info(f'Set welcome channel {channel_id} for guild {guild_id}')
     
@@ -57,18 +206,88 @@ class BotConfig:
         
         if guild_id_str in self.config.get('guilds', {}):
             if 'welcome_channel' in self.config['guilds'][guild_id_str]:
-                del self.config['guilds'][guild_id_str]['welcome_channel']
-                self._save_config()
+                self.store.delete(['guilds', guild_id_str, 'welcome_channel'])
+                self._refresh_guild(guild_id)
                 logger.info(f'Removed welcome channel for guild {guild_id}')
                 return True
         
         return False
     
+    def get_guild_settings(self, guild_id) -> Optional[GuildSettings]:
+        """Get a guild's typed settings, or None if it has none."""
+        return self._guilds.get(guild_id)
+    
     def get_guild_config(self, guild_id):
         """Get all configuration for a guild."""
         guild_id_str = str(guild_id)
         return self.config.get('guilds', {}).get(guild_id_str, {})
     
+    def get_command_limits(self, command, guild_id=None):
+        """Get a command's limits: defaults, then global, then guild overrides."""
+        limits = dict(DEFAULT_COMMAND_LIMITS.get(command, {}))
+        limits.update(self._command_limits.get(command, {}))
+        settings = self._guilds.get(guild_id) if guild_id is not None else None
+        if settings:
+            limits.update(settings.command_limits.get(command, {}))
+        return limits
+    
+    def get_member_cache(self) -> MemberCacheSettings:
+        """Get the member cache settings."""
+        return self._member_cache
+    
     def get_all_guilds(self):
         """Get all configured guilds."""
         return self.config.get('guilds', {})
+    
+    def _stat(self):
+        """State of config.json and its journal; other cluster workers append to the journal."""
+        state = []
+        for path in (self.config_file, self.store.journal_path):
+            try:
+                stat = os.stat(path)
+                state.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                state.append(None)
+        return tuple(state)
+    
+    async def reload(self):
+        """Re-read config.json and the journal off the event loop and swap them in.
+        
+        Returns whether the settings changed. A reload that raced a change
+        made by the bot is dropped; the next poll tries again.
+        """
+        changes = self._changes
+        try:
+            config = await asyncio.to_thread(self.store.reread)
+        except Exception as e:
+            logger.error(f'Error reloading config: {str(e)}')
+            return False
+        if changes != self._changes:
+            self._file_state = None
+            return False
+        if config == self.config:
+            return False
+        
+        self._adopt(config)
+        logger.info(f'Reloaded {self.config_file}: {len(self._guilds)} guilds configured')
+        return True
+    
+    async def _watch(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            state = self._stat()
+            if state != self._file_state:
+                self._file_state = state
+                await self.reload()
+    
+    def watch(self, interval=CONFIG_POLL_INTERVAL):
+        """Start polling config.json for outside edits; needs a running event loop."""
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.get_running_loop().create_task(self._watch(interval))
+    
+    def close(self):
+        """Stop watching and flush pending changes to disk."""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+        self.store.close()
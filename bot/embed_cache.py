@@ -0,0 +1,59 @@
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Built embeds kept ready to send, across all guilds and pages
+EMBED_CACHE_SIZE = 512
+
+
+class EmbedCache:
+    """LRU of built embeds, keyed by what they were rendered from.
+
+    Keys carry a version of their source (a wiki entry's record version, a
+    scraped page's revision), so an edit or refresh simply produces a new
+    key and the old embed ages out. Cached embeds are shared: copy one
+    before changing it.
+    """
+
+    def __init__(self, size: int = EMBED_CACHE_SIZE):
+        self.size = size
+        self._embeds: 'OrderedDict[Hashable, discord.Embed]' = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key: Hashable) -> Optional[discord.Embed]:
+        embed = self._embeds.get(key)
+        if embed is None:
+            self._stats['misses'] += 1
+            return None
+        self._stats['hits'] += 1
+        self._embeds.move_to_end(key)
+        return embed
+
+    def put(self, key: Hashable, embed: discord.Embed) -> discord.Embed:
+        self._embeds[key] = embed
+        self._embeds.move_to_end(key)
+        while len(self._embeds) > self.size:
+            self._embeds.popitem(last=False)
+        return embed
+
+    def get_or_build(self, key: Hashable, build: Callable[[], discord.Embed]) -> discord.Embed:
+        """Get a cached embed, building and caching it on a miss."""
+        embed = self.get(key)
+        if embed is None:
+            embed = self.put(key, build())
+        return embed
+
+    def clear(self):
+        self._embeds.clear()
+
+    def stats(self) -> Dict:
+        return {'cached': len(self._embeds), **self._stats}
+
+
+def page_version(info: Dict):
+    """Version of a scraped page for embed keys: its revision, else when it was fetched."""
+    return info.get('revid') or info.get('fetched_at')
@@ -0,0 +1,266 @@
+import asyncio
+import aiohttp
+import heapq
+import itertools
+import logging
+import math
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# Statuses that mean the host wants us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+# Longest Retry-After pause honoured, in seconds
+MAX_RETRY_AFTER = 300.0
+
+USER_AGENT = 'LoMDiscordBot/0.1 (Discord welcome and wiki bot)'
+
+
+class TokenBucket:
+    """Token bucket rate limiter."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class _HostQueue:
+    """Pending requests and throttle state for one host."""
+
+    def __init__(self, rate: float, burst: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.heap = []
+        self.ready = asyncio.Event()
+        self.blocked_until = 0.0
+        self.throttle_count = 0
+        self.dispatcher: Optional[asyncio.Task] = None
+
+
+class _Job:
+    """A queued outbound request."""
+
+    def __init__(self, url: str, params: Optional[Dict], as_json: bool, priority: int):
+        self.url = url
+        self.params = params
+        self.as_json = as_json
+        self.priority = priority
+        self.attempts = 0
+        self.future = asyncio.get_running_loop().create_future()
+
+
+def _resolve(job: _Job, value):
+    """Complete a job unless its caller has already given up on it."""
+    if not job.future.done():
+        job.future.set_result(value)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given as seconds or an HTTP date.
+
+    The result is capped at MAX_RETRY_AFTER; values that are not finite
+    are treated as missing.
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, OverflowError):
+            return None
+    if not math.isfinite(seconds):
+        return None
+    return min(max(0.0, seconds), MAX_RETRY_AFTER)
+
+
+class RequestScheduler:
+    """Shared outbound HTTP scheduler.
+
+    Every request is queued per host and released through that host's token
+    bucket, with a global cap on concurrent connections. Interactive requests
+    jump ahead of background work, and 429/503 responses pause the host for
+    the Retry-After period before the request is retried. An interactive
+    request that is still unresolved after interactive_deadline seconds,
+    queued or throttled, fails with None.
+    """
+
+    def __init__(self, rate: float = 2.0, burst: int = 4, max_connections: int = 4,
+                 max_retries: int = 2, timeout: float = 20.0, host_limits: Optional[Dict] = None,
+                 interactive_deadline: float = 60.0):
+        self.rate = rate
+        self.burst = burst
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.interactive_deadline = interactive_deadline
+        self.host_limits = host_limits or {}
+        self._hosts: Dict[str, _HostQueue] = {}
+        self._connections: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._counter = itertools.count()
+        self._running = set()
+
+    async def fetch_text(self, url: str, params: Optional[Dict] = None,
+                         priority: int = PRIORITY_INTERACTIVE) -> Optional[str]:
+        """Fetch a URL and return the body text, or None on failure."""
+        return await self._submit(url, params, False, priority)
+
+    async def fetch_json(self, url: str, params: Optional[Dict] = None,
+                         priority: int = PRIORITY_INTERACTIVE) -> Optional[Any]:
+        """Fetch a URL and return the decoded JSON body, or None on failure."""
+        return await self._submit(url, params, True, priority)
+
+    def stats(self) -> Dict:
+        """Get queue and throttle statistics per host."""
+        now = time.monotonic()
+        return {
+            host: {
+                'queued': len(state.heap),
+                'blocked_for': max(0.0, state.blocked_until - now),
+                'throttled': state.throttle_count
+            }
+            for host, state in self._hosts.items()
+        }
+
+    async def close(self):
+        """Stop the dispatchers and close the HTTP session."""
+        for state in self._hosts.values():
+            if state.dispatcher:
+                state.dispatcher.cancel()
+            for _, _, job in state.heap:
+                _resolve(job, None)
+        self._hosts.clear()
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers={'User-Agent': USER_AGENT},
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    def _get_host(self, host: str) -> _HostQueue:
+        state = self._hosts.get(host)
+        if state is None:
+            rate, burst = self.host_limits.get(host, (self.rate, self.burst))
+            state = _HostQueue(rate, burst)
+            self._hosts[host] = state
+        if state.dispatcher is None or state.dispatcher.done():
+            state.dispatcher = asyncio.get_running_loop().create_task(self._dispatch(state))
+        return state
+
+    def _enqueue(self, host: str, job: _Job):
+        state = self._get_host(host)
+        heapq.heappush(state.heap, (job.priority, next(self._counter), job))
+        state.ready.set()
+
+    async def _submit(self, url, params, as_json, priority):
+        if self._connections is None:
+            self._connections = asyncio.Semaphore(self.max_connections)
+        job = _Job(url, params, as_json, priority)
+        self._enqueue(urlsplit(url).netloc, job)
+        if priority > PRIORITY_INTERACTIVE:
+            return await job.future
+        try:
+            # A cancelled job is skipped by the dispatcher and never resolved
+            return await asyncio.wait_for(job.future, self.interactive_deadline)
+        except asyncio.TimeoutError:
+            logger.warning(f'Gave up on {url} after {self.interactive_deadline:.0f}s')
+            return None
+
+    async def _dispatch(self, state: _HostQueue):
+        """Release queued requests for one host at its allowed rate.
+
+        The job is only taken off the queue once a connection and a token
+        are available, so interactive work queued meanwhile still goes first.
+        """
+        while True:
+            if not state.heap:
+                state.ready.clear()
+                await state.ready.wait()
+                continue
+
+            # Honour Retry-After before spending a token
+            delay = state.blocked_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            await self._connections.acquire()
+            delay = state.bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            job = None
+            while state.heap and job is None:
+                _, _, job = heapq.heappop(state.heap)
+                if job.future.done():
+                    job = None
+
+            if job is None:
+                self._connections.release()
+                continue
+
+            task = asyncio.get_running_loop().create_task(self._run(state, job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, state: _HostQueue, job: _Job):
+        """Perform one request and resolve or requeue its job."""
+        retry_after = None
+        try:
+            job.attempts += 1
+            async with self._get_session().get(job.url, params=job.params) as response:
+                if response.status in THROTTLE_STATUSES or response.headers.get('cf-mitigated'):
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if retry_after is None:
+                        retry_after = min(60.0, 2.0 ** (state.throttle_count + 1))
+                elif response.status != 200:
+                    _resolve(job, None)
+                elif job.as_json:
+                    _resolve(job, await response.json(content_type=None))
+                else:
+                    _resolve(job, await response.text())
+
+            if retry_after is None:
+                state.throttle_count = 0
+            else:
+                state.throttle_count += 1
+                state.blocked_until = max(state.blocked_until, time.monotonic() + retry_after)
+                logger.warning(f'Throttled by {urlsplit(job.url).netloc}, pausing {retry_after:.1f}s')
+
+                if job.attempts <= self.max_retries:
+                    heapq.heappush(state.heap, (job.priority, next(self._counter), job))
+                    state.ready.set()
+                else:
+                    _resolve(job, None)
+
+        except Exception as e:
+            logger.error(f'Error fetching {job.url}: {str(e)}')
+            _resolve(job, None)
+        finally:
+            self._connections.release()
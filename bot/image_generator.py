@@ -6,6 +6,7 @@ import os
 import tempfile
 import logging
 from assets.background import create_gradient_background
+from bot.render_service import open_render_client
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,8 @@ class WelcomeImageGenerator:
         self.height = 400
         self.avatar_size = 120
         self.custom_background_url = "https://i.postimg.cc/LXL4Lyw2/20250720-155752.jpg"
+        # Render through the standalone service when RENDER_SOCKET is set
+        self.render_client = open_render_client()
         
     async def create_welcome_image(self, member):
         """
@@ -30,17 +33,24 @@ class WelcomeImageGenerator:
         """
         try:
             # Download member's avatar
-            avatar_image = await self._download_avatar(member)
-            if not avatar_image:
+            avatar_data = await self._download_avatar_data(member)
+            if not avatar_data:
                 logger.error(f'Failed to download avatar for {member.name}')
                 return None
             
-            # Create the welcome image
-            image = await self._generate_image(member, avatar_image)
+            # Let the render service draw it, or fall back to drawing it here
+            png_data = None
+            if self.render_client:
+                png_data = await self.render_client.render(avatar_data, member.display_name, member.guild.name)
+            if not png_data:
+                image = await self._generate_image(member, Image.open(io.BytesIO(avatar_data)))
+                output = io.BytesIO()
+                image.save(output, 'PNG')
+                png_data = output.getvalue()
             
             # Save to temporary file
             temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-            image.save(temp_file.name, 'PNG')
+            temp_file.write(png_data)
             temp_file.close()
             
             return temp_file.name
@@ -49,8 +59,8 @@ class WelcomeImageGenerator:
             logger.error(f'Error creating welcome image: {str(e)}')
             return None
     
-    async def _download_avatar(self, member):
-        """Download member's avatar image."""
+    async def _download_avatar_data(self, member):
+        """Download member's avatar as encoded image bytes."""
         try:
             # Get avatar URL
             avatar_url = member.display_avatar.url
@@ -59,8 +69,7 @@ class WelcomeImageGenerator:
             async with aiohttp.ClientSession() as session:
                 async with session.get(avatar_url) as response:
                     if response.status == 200:
-                        avatar_data = await response.read()
-                        return Image.open(io.BytesIO(avatar_data))
+                        return await response.read()
             
             return None
             
@@ -112,13 +121,37 @@ class WelcomeImageGenerator:
             logger.error(f'Error downloading custom background: {str(e)}')
             return None
     
-    async def _generate_image(self, member, avatar_image):
-        """Generate the welcome image with background and text."""
-        # Create background using custom image
+    async def create_background(self):
+        """Get the background: the custom image, or a gradient if it can't be fetched."""
         image = await self._create_custom_background()
         if not image:
             # Fallback to gradient if custom image fails
             image = create_gradient_background(self.width, self.height)
+        return image
+    
+    async def _generate_image(self, member, avatar_image):
+        """Generate the welcome image with background and text."""
+        static_layer = self.compose_static_layer(await self.create_background())
+        return self.compose_member(static_layer, avatar_image, member.display_name, member.guild.name)
+    
+    def compose_static_layer(self, background):
+        """Draw everything that is the same for every member onto the background.
+        
+        The render service keeps the result in shared memory; see
+        bot/render_service.py.
+        """
+        draw = ImageDraw.Draw(background)
+        
+        # Add title
+        self._add_title(draw)
+        
+        # Add decorative elements
+        self._add_decorations(draw)
+        
+        return background
+    
+    def compose_member(self, image, avatar_image, display_name, guild_name):
+        """Draw a member's avatar and names onto a copy-ready static layer, in place."""
         draw = ImageDraw.Draw(image)
         
         # Process avatar
@@ -132,10 +165,7 @@ class WelcomeImageGenerator:
         image.paste(avatar, (avatar_x, avatar_y), avatar)
         
         # Add text
-        self._add_text(draw, member)
-        
-        # Add decorative elements
-        self._add_decorations(draw)
+        self._add_text(draw, display_name, guild_name)
         
         return image
     
@@ -167,30 +197,50 @@ class WelcomeImageGenerator:
         # Resize back to original size
         return bordered_avatar.resize((self.avatar_size, self.avatar_size), Image.Resampling.LANCZOS)
     
-    def _add_text(self, draw, member):
-        """Add welcome text to the image."""
+    def _load_fonts(self):
+        """Load the title, subtitle and info fonts, falling back to the default font."""
+        # Try to load a better font, fallback to default
         try:
-            # Try to load a better font, fallback to default
-            try:
-                title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 36)
-                subtitle_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 24)
-                info_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 18)
-            except (OSError, IOError):
-                title_font = ImageFont.load_default()
-                subtitle_font = ImageFont.load_default()
-                info_font = ImageFont.load_default()
-            
-            # Welcome text
+            title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 36)
+            subtitle_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 24)
+            info_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 18)
+        except (OSError, IOError):
+            title_font = ImageFont.load_default()
+            subtitle_font = ImageFont.load_default()
+            info_font = ImageFont.load_default()
+        return title_font, subtitle_font, info_font
+    
+    def _add_title(self, draw):
+        """Add the welcome title, which is the same for every member."""
+        try:
+            title_font, _, _ = self._load_fonts()
             welcome_text = "Selamat Datang!"
-            username_text = f"{member.display_name}"
-            server_text = f"ke {member.guild.name}"
             
-            # Calculate text positions
+            # Calculate text position
             title_bbox = draw.textbbox((0, 0), welcome_text, font=title_font)
             title_width = title_bbox[2] - title_bbox[0]
             title_x = (self.width - title_width) // 2
             title_y = 200
             
+            # Draw text with shadow effect
+            shadow_offset = 2
+            draw.text((title_x + shadow_offset, title_y + shadow_offset), welcome_text, 
+                     font=title_font, fill=(0, 0, 0, 128))
+            draw.text((title_x, title_y), welcome_text, font=title_font, fill=(255, 255, 255, 255))
+            
+        except Exception as e:
+            logger.error(f'Error adding title to image: {str(e)}')
+    
+    def _add_text(self, draw, display_name, guild_name):
+        """Add the member's name and the server name to the image."""
+        try:
+            _, subtitle_font, info_font = self._load_fonts()
+            
+            # Welcome text
+            username_text = f"{display_name}"
+            server_text = f"ke {guild_name}"
+            
+            # Calculate text positions
             username_bbox = draw.textbbox((0, 0), username_text, font=subtitle_font)
             username_width = username_bbox[2] - username_bbox[0]
             username_x = (self.width - username_width) // 2
@@ -207,15 +257,12 @@ class WelcomeImageGenerator:
             text_color = (255, 255, 255, 255)
             
             # Draw shadows
-            draw.text((title_x + shadow_offset, title_y + shadow_offset), welcome_text, 
-                     font=title_font, fill=shadow_color)
             draw.text((username_x + shadow_offset, username_y + shadow_offset), username_text, 
                      font=subtitle_font, fill=shadow_color)
             draw.text((server_x + shadow_offset, server_y + shadow_offset), server_text, 
                      font=info_font, fill=shadow_color)
             
             # Draw main text
-            draw.text((title_x, title_y), welcome_text, font=title_font, fill=text_color)
             draw.text((username_x, username_y), username_text, font=subtitle_font, fill=text_color)
             draw.text((server_x, server_y), server_text, font=info_font, fill=text_color)
             
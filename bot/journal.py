@@ -0,0 +1,451 @@
+import copy
+import json
+import os
+import logging
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Compact once the journal is this many times the size of the snapshot
+COMPACT_RATIO = 1.0
+
+# ...but never bother for journals smaller than this
+MIN_COMPACT_BYTES = 64 * 1024
+
+# How long the writer waits for more changes before writing a batch
+FLUSH_DELAY = 0.5
+
+# A failed write is retried after FLUSH_DELAY, doubling with every further
+# failure up to this many seconds
+MAX_RETRY_DELAY = 60.0
+
+
+def apply_record(data: Dict, record: Dict):
+    """Apply one journal record to the data in place.
+
+    Records only ever set or delete leaf paths, creating parent dicts as
+    needed, so replaying records a snapshot already contains is harmless.
+    """
+    *parents, key = record['path']
+    node = data
+    for part in parents:
+        node = node.setdefault(part, {})
+
+    if record['op'] == 'set':
+        node[key] = record['value']
+    else:
+        node.pop(key, None)
+
+
+def write_json_atomic(path: str, data: Any, indent=None):
+    """Write JSON to a temporary file and rename it over the target."""
+    # Per process, so concurrent writers never share a temporary file
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class JournalWriter:
+    """One background thread that writes pending records for every store.
+
+    A store schedules itself whenever it queues a change; the thread waits
+    FLUSH_DELAY for a burst of changes to settle, then flushes each store
+    that is due. A store whose write failed keeps its records pending and is
+    retried with exponential backoff. The thread count stays at one however
+    many stores are open.
+    """
+
+    def __init__(self, name: str = 'journal-writer'):
+        self.name = name
+        # Store -> monotonic time its flush is due
+        self._scheduled: Dict['JournaledJsonStore', float] = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, store: 'JournaledJsonStore', delay: Optional[float] = None):
+        """Flush store after delay (FLUSH_DELAY by default).
+
+        A store already scheduled keeps its time, so new changes neither
+        postpone a pending batch nor cut a retry backoff short.
+        """
+        with self._condition:
+            due = time.monotonic() + (FLUSH_DELAY if delay is None else delay)
+            self._scheduled.setdefault(store, due)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self, store: 'JournaledJsonStore'):
+        with self._condition:
+            self._scheduled.pop(store, None)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._scheduled)
+                wait = min(self._scheduled.values()) - time.monotonic()
+                if wait > 0:
+                    # Woken early by a new schedule; look again
+                    self._condition.wait(wait)
+                    continue
+                now = time.monotonic()
+                stores = [store for store, due in self._scheduled.items() if due <= now]
+                for store in stores:
+                    del self._scheduled[store]
+            for store in stores:
+                try:
+                    written = store.flush()
+                except Exception as e:
+                    logger.error(f'Error flushing journal for {store.path}: {str(e)}')
+                    written = False
+                if not written:
+                    self.schedule(store, min(FLUSH_DELAY * 2 ** store.failures, MAX_RETRY_DELAY))
+
+
+# Shared by every store in the process
+_writer = JournalWriter()
+
+
+class JournaledJsonStore:
+    """A JSON snapshot file plus an append-only journal of changes.
+
+    Every change is appended to ``<path>.journal`` as one JSON line, so a
+    write costs the size of the change rather than the whole file, and a
+    crash can at worst lose a torn last line. Loading replays the journal
+    over the snapshot. Once the journal outgrows the snapshot, a background
+    thread folds it into a new snapshot, working only from the files.
+
+    Changes are applied to ``data`` at once but written behind: the shared
+    JournalWriter thread collects them for ``FLUSH_DELAY`` seconds, keeps
+    only the last change per path, and appends the batch with a single fsync. Values are
+    copied shallowly when queued, so callers should replace nested values
+    rather than mutate them in place. ``close()`` flushes anything pending.
+
+    Several processes may share a store (e.g. cluster workers sharing the
+    bot config): appends, compaction and reads hold an flock on
+    ``<path>.lock``, and a process whose journal was swapped out by another
+    one's compaction reopens it before writing.
+    """
+
+    def __init__(self, path: str, default: Callable[[], Dict], indent=None):
+        self.path = path
+        self.journal_path = f'{path}.journal'
+        self.default = default
+        self.indent = indent
+        self.data = default()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.RLock()
+        self._lock_path = f'{path}.lock'
+        self._journal = None
+        self._compacting = False
+        self._compactor = None
+        self._pending: Dict[tuple, Dict] = {}
+        self._pending_lock = threading.Lock()
+        # Consecutive failed flushes, for the writer's retry backoff
+        self.failures = 0
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool = True):
+        """Hold the cross-process lock on the store's files."""
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        with open(self._lock_path, 'a+b') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _reopen_if_replaced(self):
+        """Reopen the journal if another process's compaction replaced it.
+
+        Call with the file lock and self._lock held.
+        """
+        try:
+            replaced = os.fstat(self._journal.fileno()).st_ino != os.stat(self.journal_path).st_ino
+        except FileNotFoundError:
+            replaced = True
+        if replaced:
+            self._journal.close()
+            self._journal = open(self.journal_path, 'ab')
+
+    def load(self) -> Dict:
+        """Load the snapshot and replay the journal over it.
+
+        A torn last line is cut off. A corrupt line before it is skipped, and
+        the journal is copied aside to ``.corrupt`` first so nothing is lost
+        when the next compaction drops the line.
+        """
+        with self._file_lock():
+            self.data = self._read_snapshot()
+            if os.path.exists(self.journal_path):
+                replayed, good_size, corrupt = self._replay(self.data)
+                if corrupt:
+                    logger.error(
+                        f'Skipped {len(corrupt)} corrupt records in {self.journal_path} at offsets '
+                        f'{corrupt[:10]}; copied it to {self.journal_path}.corrupt'
+                    )
+                    shutil.copyfile(self.journal_path, f'{self.journal_path}.corrupt')
+                if good_size < os.path.getsize(self.journal_path):
+                    logger.warning(f'Discarding torn record at the end of {self.journal_path}')
+                    with open(self.journal_path, 'r+b') as f:
+                        f.truncate(good_size)
+                if replayed:
+                    logger.info(f'Replayed {replayed} journal records for {self.path}')
+
+        self._start()
+        return self.data
+
+    def open(self):
+        """Start journaling changes without reading the data.
+
+        For owners that already hold the current data in another form. Only
+        a torn last line is cut off, so new records are not appended after it.
+        """
+        self.data = None
+        with self._file_lock():
+            self._truncate_torn_tail()
+        self._start()
+
+    def _truncate_torn_tail(self):
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r+b') as f:
+                size = f.seek(0, os.SEEK_END)
+                end = size
+                while end > 0:
+                    start = max(0, end - 4096)
+                    f.seek(start)
+                    newline = f.read(end - start).rfind(b'\n')
+                    if newline >= 0:
+                        end = start + newline + 1
+                        break
+                    end = start
+                if end < size:
+                    logger.warning(f'Discarding torn record at the end of {self.journal_path}')
+                    f.truncate(end)
+
+    def _start(self):
+        self._journal = open(self.journal_path, 'ab')
+        self.maybe_compact()
+
+    def reread(self) -> Dict:
+        """Rebuild the data from the files, e.g. after the snapshot was edited by hand.
+
+        Pending changes are written first, and no flush can run meanwhile, so
+        every change made before the call is in the result. Blocks on file
+        I/O; the caller decides whether to adopt the result as ``data``.
+        """
+        with self._flush_lock:
+            self.flush()
+            with self._file_lock(exclusive=False), self._lock:
+                data = self._read_snapshot()
+                if os.path.exists(self.journal_path):
+                    self._replay(data)
+        return data
+
+    def _read_snapshot(self) -> Dict:
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f'Error loading {self.path}: {str(e)}')
+        return self.default()
+
+    def _replay(self, data: Dict, limit: int = None):
+        """Apply journal records to data.
+
+        Returns (count applied, bytes of complete lines, offsets of corrupt
+        lines). Only a last line without its newline ends the replay early;
+        a complete line that does not parse is skipped.
+        """
+        replayed = 0
+        good_size = 0
+        corrupt = []
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                if limit is not None and good_size + len(line) > limit:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    apply_record(data, json.loads(line))
+                    replayed += 1
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    corrupt.append(good_size)
+                good_size += len(line)
+        return replayed, good_size, corrupt
+
+    def _queue(self, record: Dict):
+        """Queue a record for the writer, replacing any pending one for its path."""
+        with self._pending_lock:
+            key = tuple(record['path'])
+            self._pending.pop(key, None)
+            self._pending[key] = record
+        _writer.schedule(self)
+
+    def release(self):
+        """Stop keeping the data in memory; changes are then only journaled.
+
+        For owners that hold the data in their own form after loading.
+        """
+        self.data = None
+
+    def set(self, path: List[str], value: Any):
+        """Set a leaf value and queue the change for the journal."""
+        if self.data is not None:
+            apply_record(self.data, {'op': 'set', 'path': path, 'value': value})
+        self._queue({'op': 'set', 'path': path, 'value': copy.copy(value)})
+
+    def delete(self, path: List[str]):
+        """Delete a leaf value and queue the change for the journal."""
+        record = {'op': 'delete', 'path': path}
+        if self.data is not None:
+            apply_record(self.data, record)
+        self._queue(record)
+
+    def flush(self) -> bool:
+        """Write all pending records to the journal now.
+
+        Returns False if the write failed; the records are then pending
+        again, behind any newer change to the same path.
+        """
+        with self._flush_lock:
+            with self._pending_lock:
+                records = self._pending
+                self._pending = {}
+            if not records:
+                return True
+
+            try:
+                lines = b''.join(
+                    json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+                    for record in records.values()
+                )
+                with self._file_lock(), self._lock:
+                    self._reopen_if_replaced()
+                    start = self._journal.tell()
+                    try:
+                        self._journal.write(lines)
+                        self._journal.flush()
+                        os.fsync(self._journal.fileno())
+                    except Exception:
+                        self._rollback(start)
+                        raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f'Error writing journal for {self.path} (attempt {self.failures}): {str(e)}')
+                with self._pending_lock:
+                    for key in self._pending:
+                        records.pop(key, None)
+                    records.update(self._pending)
+                    self._pending = records
+                return False
+            self.failures = 0
+        self.maybe_compact()
+        return True
+
+    def _rollback(self, start: int):
+        """Cut a failed append back off the journal, so a partial line is not
+        followed by the retried records. Call with the file lock and self._lock held.
+        """
+        try:
+            self._journal.close()
+        except OSError:
+            pass
+        try:
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(start)
+        finally:
+            self._journal = open(self.journal_path, 'ab')
+
+    def journal_size(self) -> int:
+        return self._journal.tell() if self._journal else 0
+
+    def maybe_compact(self):
+        """Start a background compaction if the journal has grown too large."""
+        size = self.journal_size()
+        if size < MIN_COMPACT_BYTES or self._compacting:
+            return
+        snapshot_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size < snapshot_size * COMPACT_RATIO:
+            return
+
+        self._compacting = True
+        self._compactor = threading.Thread(
+            target=self.compact, name=f'compact-{os.path.basename(self.path)}', daemon=True
+        )
+        self._compactor.start()
+
+    def compact(self):
+        """Fold the journal into a new snapshot.
+
+        Rebuilds the snapshot from the files rather than the live data, so the
+        owner can keep changing it meanwhile. Records appended after the
+        compaction started are carried over into the new journal. Other
+        processes wait on the file lock until the new journal is in place.
+        """
+        try:
+            with self._file_lock():
+                with self._lock:
+                    self._reopen_if_replaced()
+                    self._journal.flush()
+                    cutoff = os.path.getsize(self.journal_path)
+                    snapshot_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+                # Another process may have compacted while this one waited
+                if cutoff < MIN_COMPACT_BYTES or cutoff < snapshot_size * COMPACT_RATIO:
+                    return
+
+                data = self._read_snapshot()
+                _, folded, _ = self._replay(data, limit=cutoff)
+                write_json_atomic(self.path, data, self.indent)
+
+                # Crashing here is safe: replaying the old journal over the new
+                # snapshot gives the same result
+                with self._lock:
+                    self._journal.flush()
+                    with open(self.journal_path, 'rb') as f:
+                        f.seek(folded)
+                        tail = f.read()
+                    temp_path = f'{self.journal_path}.{os.getpid()}.tmp'
+                    with open(temp_path, 'wb') as f:
+                        f.write(tail)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self._journal.close()
+                    os.replace(temp_path, self.journal_path)
+                    self._journal = open(self.journal_path, 'ab')
+
+            logger.info(f'Compacted {self.journal_path}: folded {folded} bytes into the snapshot')
+
+        except Exception as e:
+            logger.error(f'Error compacting {self.path}: {str(e)}')
+        finally:
+            self._compacting = False
+
+    def close(self):
+        """Flush pending changes and close the journal."""
+        _writer.cancel(self)
+        if self._journal:
+            self.flush()
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
@@ -0,0 +1,140 @@
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import shutil
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Rotate the log file at this size unless LOG_ROTATE=time
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+
+# Rotated files kept next to the live one
+DEFAULT_BACKUP_COUNT = 5
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.processName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """Parse "discord=WARNING,bot.wiki=DEBUG" into {logger name: level}."""
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.strip().partition('=')
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _env_count(name: str, default: int) -> int:
+    """Read a non-negative integer setting, warning and using default if it is invalid."""
+    value = os.getenv(name, '').strip()
+    if not value:
+        return default
+    try:
+        count = int(value)
+    except ValueError:
+        count = -1
+    if count < 0:
+        logging.getLogger().warning(f'Ignoring invalid {name} {value!r}; using {default}')
+        return default
+    return count
+
+
+def _file_handler(path: str) -> logging.Handler:
+    backup_count = _env_count('LOG_BACKUPS', DEFAULT_BACKUP_COUNT)
+    if os.getenv('LOG_ROTATE', 'size').lower() == 'time':
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=os.getenv('LOG_WHEN', 'midnight'), backupCount=backup_count, encoding='utf-8'
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=_env_count('LOG_MAX_BYTES', DEFAULT_MAX_BYTES), backupCount=backup_count,
+            encoding='utf-8'
+        )
+    if os.getenv('LOG_COMPRESS', '1') != '0':
+        handler.namer = lambda name: f'{name}.gz'
+        handler.rotator = _gzip_rotator
+    return handler
+
+
+def setup_logging() -> Optional[logging.handlers.QueueListener]:
+    """Send all logging through a queue to a background writer thread.
+
+    Loggers only enqueue records; the listener thread formats them and
+    writes to the console and a rotating log file, so a burst of log lines
+    never blocks the event loop on disk. Configured by environment:
+
+    - LOG_LEVEL: root level (default INFO)
+    - LOG_LEVELS: per-logger levels, e.g. ``discord=WARNING,bot.wiki=DEBUG``
+    - LOG_FILE: log file (default bot.log; empty for console only). Cluster
+      workers each write ``<name>.<worker>.log``
+    - LOG_ROTATE: ``size`` (LOG_MAX_BYTES, default 10 MB) or ``time``
+      (LOG_WHEN, default midnight); LOG_BACKUPS files are kept, gzipped
+      unless LOG_COMPRESS=0
+    - LOG_JSON=1: write JSON lines instead of text
+    """
+    # The queue goes in first so warnings about the settings below are kept
+    # until the listener starts
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    level = os.getenv('LOG_LEVEL', 'INFO').strip().upper()
+    try:
+        root_logger.setLevel(level)
+    except ValueError:
+        root_logger.setLevel(logging.INFO)
+        root_logger.warning(f'Ignoring invalid LOG_LEVEL {level!r}; using INFO')
+
+    for name, level in parse_module_levels(os.getenv('LOG_LEVELS', '')).items():
+        try:
+            logging.getLogger(name).setLevel(level)
+        except ValueError:
+            root_logger.warning(f'Ignoring invalid log level {level!r} for {name}')
+
+    formatter = JsonFormatter() if os.getenv('LOG_JSON', '0') == '1' else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+
+    path = os.getenv('LOG_FILE', 'bot.log')
+    if path:
+        process_name = multiprocessing.current_process().name
+        if process_name != 'MainProcess':
+            # Two processes rotating one file would lose lines
+            root, ext = os.path.splitext(path)
+            path = f'{root}.{process_name}{ext}'
+        handlers.append(_file_handler(path))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Drain the queue before the interpreter exits
+    atexit.register(listener.stop)
+    return listener
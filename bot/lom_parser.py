@@ -0,0 +1,370 @@
+import re
+from dataclasses import dataclass, field, asdict
+from typing import Optional, Dict, List, Tuple
+
+# Section headings we render, matched against the parse API's section list
+CHARACTER_SECTIONS = {
+    'physical': ('physical description', 'appearance'),
+    'pathways': ('pathway', 'authorities', 'abilities', 'powers'),
+}
+
+PATHWAY_SECTIONS = {
+    'general': ('general information', 'overview', 'description'),
+    'sequences': ('sequence', 'potion'),
+}
+
+_COMMENT_RE = re.compile(r'<!--.*?-->', re.S)
+_REF_RE = re.compile(r'<ref[^>/]*/>|<ref[^>]*>.*?</ref>', re.S | re.I)
+_TAG_RE = re.compile(r'<[^>]+>')
+_FILE_RE = re.compile(r'\[\[(?:File|Image|Category):[^\[\]]*(?:\[\[[^\]]*\]\][^\[\]]*)*\]\]', re.I)
+_LINK_RE = re.compile(r'\[\[(?:[^|\]]*\|)?([^\]]+)\]\]')
+_EXTERNAL_LINK_RE = re.compile(r'\[https?://\S+\s*([^\]]*)\]')
+_HEADING_RE = re.compile(r'^=+\s*(.*?)\s*=+\s*$', re.M)
+_EMPHASIS_RE = re.compile(r"'{2,}")
+_SEQUENCE_RE = re.compile(r'sequence\s*(\d+)\s*[:\-–—]?\s*(.+)', re.I)
+
+# Extracted headings are short and carry no digits or sentence punctuation,
+# unlike body lines that merely mention a keyword ("Sequence 9: Seer")
+HEADING_MAX_LENGTH = 40
+_NON_HEADING_RE = re.compile(r'[\d.,:;!?]')
+
+
+@dataclass
+class CharacterPage:
+    """Typed fields rendered for a character page."""
+    title: str
+    description: str = ''
+    physical_description: str = ''
+    pathways_authorities: str = ''
+    pathway: str = ''
+    sequence: Optional[int] = None
+    aliases: List[str] = field(default_factory=list)
+    infobox: Dict[str, str] = field(default_factory=dict)
+
+    def to_info(self) -> Dict:
+        """Convert to the info dict the commands render."""
+        info = asdict(self)
+        info['type'] = 'Character'
+        info['key_info'] = []
+        return info
+
+
+@dataclass
+class PathwayPage:
+    """Typed fields rendered for a pathway page."""
+    title: str
+    general_information: str = ''
+    sequences: List[Tuple[int, str]] = field(default_factory=list)
+    infobox: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def sequence_levels(self) -> str:
+        return '\n'.join(f"Sequence {number}: {name}" for number, name in self.sequences)
+
+    def to_info(self) -> Dict:
+        """Convert to the info dict the commands render."""
+        info = asdict(self)
+        info['type'] = 'Pathway'
+        info['sequence_levels'] = self.sequence_levels
+        info['key_info'] = []
+        return info
+
+
+def select_sections(sections: List[Dict], wanted: Dict[str, Tuple[str, ...]]) -> Dict[str, str]:
+    """Pick section indexes from a parse API section list.
+
+    Returns a mapping of field name to the first section index whose heading
+    contains one of the field's keywords.
+    """
+    selected = {}
+    for section in sections:
+        heading = strip_wikitext(section.get('line', '')).lower()
+        for name, keywords in wanted.items():
+            if name not in selected and any(keyword in heading for keyword in keywords):
+                selected[name] = section['index']
+    return selected
+
+
+def _split_templates(text: str) -> List[Tuple[int, int]]:
+    """Find the spans of top-level {{...}} templates."""
+    spans = []
+    depth = 0
+    start = 0
+    i = 0
+    while i < len(text) - 1:
+        pair = text[i:i + 2]
+        if pair == '{{':
+            if depth == 0:
+                start = i
+            depth += 1
+            i += 2
+        elif pair == '}}' and depth:
+            depth -= 1
+            if depth == 0:
+                spans.append((start, i + 2))
+            i += 2
+        else:
+            i += 1
+    return spans
+
+
+def _split_params(body: str) -> List[str]:
+    """Split template parameters on top-level pipes."""
+    params = []
+    depth = 0
+    current = []
+    i = 0
+    while i < len(body):
+        pair = body[i:i + 2]
+        if pair in ('{{', '[['):
+            depth += 1
+            current.append(pair)
+            i += 2
+        elif pair in ('}}', ']]') and depth:
+            depth -= 1
+            current.append(pair)
+            i += 2
+        elif body[i] == '|' and depth == 0:
+            params.append(''.join(current))
+            current = []
+            i += 1
+        else:
+            current.append(body[i])
+            i += 1
+    params.append(''.join(current))
+    return params
+
+
+def strip_wikitext(text: str) -> str:
+    """Reduce wikitext to plain text."""
+    text = _COMMENT_RE.sub('', text)
+    text = _REF_RE.sub('', text)
+    for start, end in reversed(_split_templates(text)):
+        text = text[:start] + text[end:]
+    text = _FILE_RE.sub('', text)
+    text = _LINK_RE.sub(r'\1', text)
+    text = _EXTERNAL_LINK_RE.sub(r'\1', text)
+    text = _HEADING_RE.sub('', text)
+    text = _TAG_RE.sub('', text)
+    text = _EMPHASIS_RE.sub('', text)
+    return text
+
+
+def parse_infobox(wikitext: str) -> Dict[str, str]:
+    """Parse the first infobox template into plain-text fields."""
+    for start, end in _split_templates(wikitext):
+        params = _split_params(wikitext[start + 2:end - 2])
+        if 'infobox' not in params[0].lower():
+            continue
+
+        fields = {}
+        for param in params[1:]:
+            if '=' not in param:
+                continue
+            key, value = param.split('=', 1)
+            value = ' '.join(strip_wikitext(value.replace('<br>', ', ')).split())
+            if value:
+                fields[key.strip().lower()] = value
+        return fields
+
+    return {}
+
+
+def paragraphs(wikitext: str, min_length: int = 20) -> List[str]:
+    """Split a wikitext section into plain-text lines worth showing."""
+    lines = []
+    for line in strip_wikitext(wikitext).split('\n'):
+        line = line.strip().lstrip('*#:;').strip()
+        if len(line) > min_length:
+            lines.append(line)
+    return lines
+
+
+def parse_sequences(wikitext: str) -> List[Tuple[int, str]]:
+    """Extract (sequence number, name) pairs from a sequence section."""
+    sequences = []
+    seen = set()
+    for line in strip_wikitext(wikitext).split('\n'):
+        match = _SEQUENCE_RE.search(line)
+        if not match:
+            continue
+        number = int(match.group(1))
+        name = match.group(2).strip(' .')
+        if number in seen or not name:
+            continue
+        seen.add(number)
+        sequences.append((number, name))
+    sequences.sort(key=lambda item: item[0], reverse=True)
+    return sequences
+
+
+def build_character_page(title: str, sections: Dict[str, str]) -> CharacterPage:
+    """Build a character page from the lead and selected section wikitext."""
+    lead = sections.get('lead', '')
+    infobox = parse_infobox(lead)
+    page = CharacterPage(title=title, infobox=infobox)
+
+    page.description = '\n\n'.join(paragraphs(lead, 30)[:3])
+    page.physical_description = '\n'.join(paragraphs(sections.get('physical', ''))[:4])
+    page.pathways_authorities = '\n'.join(paragraphs(sections.get('pathways', ''))[:5])
+
+    page.pathway = infobox.get('pathway', '')
+    sequence = re.search(r'\d+', infobox.get('sequence', ''))
+    if sequence:
+        page.sequence = int(sequence.group())
+    page.aliases = [alias.strip() for alias in re.split(r'[,;]', infobox.get('alias', infobox.get('aliases', ''))) if alias.strip()]
+
+    if not page.pathways_authorities and page.pathway:
+        page.pathways_authorities = page.pathway
+        if page.sequence is not None:
+            page.pathways_authorities += f" (Sequence {page.sequence})"
+
+    return page
+
+
+def build_pathway_page(title: str, sections: Dict[str, str]) -> PathwayPage:
+    """Build a pathway page from the lead and selected section wikitext."""
+    lead = sections.get('lead', '')
+    page = PathwayPage(title=title, infobox=parse_infobox(lead))
+
+    general = paragraphs(sections.get('general', '')) or paragraphs(lead, 30)
+    page.general_information = '\n'.join(general[:4])
+    page.sequences = parse_sequences(sections.get('sequences', '') or lead)[:10]
+
+    return page
+
+
+class SectionClassifier:
+    """Classifies extracted heading lines into section kinds with one regex.
+
+    Rules are tried in order, so a heading matching keywords from several
+    kinds is classified by the first rule, just like an if/elif keyword
+    chain. Lines that do not look like headings are always body text.
+    """
+
+    def __init__(self, rules: List[Tuple[str, Tuple[str, ...]]]):
+        alternatives = [
+            f"(?=.*?(?P<{name}>{'|'.join(re.escape(keyword) for keyword in keywords)}))"
+            for name, keywords in rules
+        ]
+        self._pattern = re.compile('^(?:' + '|'.join(alternatives) + ')', re.I)
+
+    def classify(self, line: str) -> Optional[str]:
+        """Return the section kind a line introduces, or None for body text."""
+        if len(line) > HEADING_MAX_LENGTH or _NON_HEADING_RE.search(line):
+            return None
+        match = self._pattern.match(line)
+        return match.lastgroup if match else None
+
+
+CHARACTER_CLASSIFIER = SectionClassifier([
+    ('physical', ('physical description', 'appearance', 'description')),
+    ('pathways', ('pathway', 'authorities', 'sequence', 'potion')),
+    ('stop', ('history', 'personality', 'abilities', 'trivia', 'references')),
+])
+
+PATHWAY_CLASSIFIER = SectionClassifier([
+    ('general', ('general information', 'overview', 'description')),
+    ('sequences', ('sequence', 'levels', 'potion')),
+    ('stop', ('history', 'notable', 'references', 'trivia')),
+])
+
+
+def parse_character_text(content: str, title: str) -> Dict:
+    """Parse character information from extracted page text.
+
+    The description comes from the lead, before the first heading; lines
+    under headings that end the wanted sections are ignored.
+    """
+    classify = CHARACTER_CLASSIFIER.classify
+    description_lines = []
+    physical_lines = []
+    pathway_lines = []
+    section = None
+
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        kind = classify(line)
+        if kind:
+            section = kind
+            continue
+
+        if section == 'physical':
+            if len(line) > 20:
+                physical_lines.append(line)
+        elif section == 'pathways':
+            if len(line) > 20:
+                pathway_lines.append(line)
+        elif section is None and len(line) > 30 and len(description_lines) < 3:
+            # General description when not in specific section
+            description_lines.append(line)
+
+    return {
+        'title': title,
+        'type': 'Character',
+        'description': '\n\n'.join(description_lines),
+        'physical_description': '\n'.join(physical_lines[:4]),
+        'pathways_authorities': '\n'.join(pathway_lines[:5]),
+        'key_info': []
+    }
+
+
+def parse_pathway_text(content: str, pathway_name: str) -> Dict:
+    """Parse pathway information from extracted page text.
+
+    General information comes from its own section when the page has one,
+    and from the lead otherwise.
+    """
+    classify = PATHWAY_CLASSIFIER.classify
+    lead_lines = []
+    general_lines = []
+    sequence_lines = []
+    section = None
+
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        kind = classify(line)
+        if kind:
+            section = kind
+            continue
+
+        if section == 'general':
+            if len(line) > 20:
+                general_lines.append(line)
+        elif section == 'sequences':
+            if len(line) > 15:
+                sequence_lines.append(line)
+        elif section is None and len(line) > 30:
+            lead_lines.append(line)
+
+    return {
+        'title': f"{pathway_name} Pathway",
+        'type': 'Pathway',
+        'general_information': '\n'.join((general_lines or lead_lines[:1])[:4]),
+        'sequence_levels': '\n'.join(sequence_lines[:8]),
+        'key_info': []
+    }
+
+
+def parse_general_text(content: str, title: str) -> Dict:
+    """Parse general information from extracted page text."""
+    description_lines = []
+    for line in content.split('\n'):
+        line = line.strip()
+        if len(line) > 30:
+            description_lines.append(line)
+            if len(description_lines) == 4:
+                break
+
+    return {
+        'title': title,
+        'type': 'General',
+        'description': '\n\n'.join(description_lines),
+        'key_info': []
+    }
@@ -0,0 +1,311 @@
+import asyncio
+import bisect
+import itertools
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Dict, List, Iterable
+from bot.journal import write_json_atomic
+from bot.http_scheduler import RequestScheduler, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from bot.wiki_index import TitleIndex, trigrams
+
+logger = logging.getLogger(__name__)
+
+# Refresh the full title list at most once a day
+INDEX_TTL = 24 * 60 * 60
+
+# Remember failed lookups for a while so repeated typos don't hit the wiki
+NEGATIVE_TTL = 30 * 60
+
+# Failed lookups remembered at once; the oldest are forgotten first
+MISS_CACHE_SIZE = 1024
+
+# A misspelled name resolves to the closest title or redirect at or above
+# this trigram similarity
+FUZZY_MATCH_SCORE = 0.7
+
+# A query is only remembered as an alias of search's top result when they
+# are at least this similar
+LEARN_ALIAS_SCORE = 0.5
+
+# Learned aliases kept in memory; they are never written to the cache file
+LEARNED_ALIAS_LIMIT = 1024
+
+
+def normalize_title(title: str) -> str:
+    """Normalize a page title or user query for index lookups.
+
+    Folds case and diacritics, treats underscores like spaces and drops
+    punctuation so "Azik_Eggers", "azik eggers" and "Azík Eggers" share a key.
+    """
+    title = unicodedata.normalize('NFKD', title)
+    title = ''.join(ch for ch in title if not unicodedata.combining(ch))
+    title = title.casefold().replace('_', ' ')
+    title = re.sub(r"[^\w\s]", '', title)
+    return ' '.join(title.split())
+
+
+def title_similarity(a: str, b: str) -> float:
+    """Dice coefficient of two names' trigram sets."""
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+class LoMTitleIndex:
+    """Cached index of wiki page titles and redirects.
+
+    Maps normalized titles (and redirect sources) to canonical page titles so
+    commands can build the right URL without guessing the capitalization.
+    """
+
+    def __init__(self, api_url: str, scheduler: RequestScheduler, cache_file: str = 'lom_titles.json'):
+        self.api_url = api_url
+        self.scheduler = scheduler
+        self.cache_file = cache_file
+        self.titles: Dict[str, str] = {}
+        self.redirects: Dict[str, str] = {}
+        self.learned: 'OrderedDict[str, str]' = OrderedDict()
+        self.built_at = 0.0
+        self._misses: 'OrderedDict[str, float]' = OrderedDict()
+        self._sorted_keys: Optional[List[str]] = None
+        self._fuzzy_index: Optional[TitleIndex] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._load_cache()
+
+    def _load_cache(self):
+        """Load the title index from the cache file."""
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.titles = data.get('titles', {})
+                self._sorted_keys = None
+                self.redirects = data.get('redirects', {})
+                self._fuzzy_index = None
+                self.built_at = data.get('built_at', 0.0)
+        except Exception as e:
+            logger.error(f'Error loading title index: {str(e)}')
+
+    def _save_cache(self, data: Optional[Dict] = None):
+        """Save the title index, or a copy taken by _cache_data, to the cache file."""
+        try:
+            write_json_atomic(self.cache_file, data or self._cache_data())
+        except Exception as e:
+            logger.error(f'Error saving title index: {str(e)}')
+
+    def _cache_data(self) -> Dict:
+        """Copy the index for saving, so it can be written off the event loop."""
+        return {
+            'built_at': self.built_at,
+            'titles': dict(self.titles),
+            'redirects': dict(self.redirects)
+        }
+
+    def add_titles(self, titles: Iterable[str]):
+        """Add canonical page titles to the index."""
+        for title in titles:
+            key = normalize_title(title)
+            if key not in self.titles:
+                self.titles[key] = title
+                if self._fuzzy_index is not None:
+                    self._fuzzy_index.add(key, title)
+        self._sorted_keys = None
+
+    def add_redirect(self, source: str, target: str):
+        """Map a redirect (or learned alias) to its canonical target."""
+        key = normalize_title(source)
+        if key and key not in self.titles:
+            self.redirects[key] = target
+            if self._fuzzy_index is not None:
+                self._fuzzy_index.add(key, target)
+
+    def learn_alias(self, query: str, title: str):
+        """Remember a query that search resolved to a title, for this run only."""
+        key = normalize_title(query)
+        if key and key not in self.titles and key not in self.redirects:
+            self.learned[key] = title
+            self.learned.move_to_end(key)
+            while len(self.learned) > LEARNED_ALIAS_LIMIT:
+                self.learned.popitem(last=False)
+
+    def lookup(self, name: str, fuzzy: bool = True) -> Optional[str]:
+        """Resolve a name to a canonical title without touching the network."""
+        key = normalize_title(name)
+        if not key:
+            return None
+
+        if key in self.titles:
+            return self.titles[key]
+        if key in self.redirects:
+            return self.redirects[key]
+        if key in self.learned:
+            self.learned.move_to_end(key)
+            return self.learned[key]
+
+        if fuzzy:
+            for _, title, score in self._get_fuzzy_index().suggest(key, 1):
+                if score >= FUZZY_MATCH_SCORE:
+                    return title
+
+        return None
+
+    def _get_fuzzy_index(self) -> TitleIndex:
+        """Get the trigram index over titles and redirects, building it on first use.
+
+        A typo then only scores the names sharing a trigram with it instead
+        of comparing it with every title.
+        """
+        if self._fuzzy_index is None:
+            self._fuzzy_index = TitleIndex()
+            for key, title in self.titles.items():
+                self._fuzzy_index.add(key, title)
+            for key, target in self.redirects.items():
+                self._fuzzy_index.add(key, target)
+        return self._fuzzy_index
+
+    def complete(self, prefix: str, limit: int = 25) -> List[str]:
+        """Get canonical titles starting with a typed prefix, for autocomplete."""
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self.titles)
+        key = normalize_title(prefix)
+        start = bisect.bisect_left(self._sorted_keys, key)
+        results = []
+        for candidate in self._sorted_keys[start:start + limit]:
+            if not candidate.startswith(key):
+                break
+            results.append(self.titles[candidate])
+        return results
+
+    def is_stale(self) -> bool:
+        """Check whether the full title list should be rebuilt."""
+        return time.time() - self.built_at > INDEX_TTL
+
+    async def resolve(self, names: List[str]) -> Optional[str]:
+        """Resolve the first matching candidate name to a canonical title.
+
+        Uses the cached index first and falls back to a single opensearch
+        request for the first candidate, caching whatever it returns.
+        """
+        if self.is_stale():
+            self.schedule_refresh()
+
+        for name in names:
+            title = self.lookup(name)
+            if title:
+                return title
+
+        query = names[0]
+        key = normalize_title(query)
+        missed_at = self._misses.get(key)
+        if missed_at and time.time() - missed_at < NEGATIVE_TTL:
+            return None
+
+        results = await self._opensearch(query)
+        if results:
+            self.add_titles(results)
+            for name in names:
+                title = self.lookup(name, fuzzy=False)
+                if title:
+                    return title
+
+            # Search ranked it first; remember the query as an alias only if
+            # it plausibly names that page, since search matches loosely
+            if title_similarity(key, normalize_title(results[0])) >= LEARN_ALIAS_SCORE:
+                self.learn_alias(query, results[0])
+            return results[0]
+
+        self._misses[key] = time.time()
+        self._misses.move_to_end(key)
+        while len(self._misses) > MISS_CACHE_SIZE:
+            self._misses.popitem(last=False)
+        return None
+
+    async def _opensearch(self, query: str) -> List[str]:
+        """Query the wiki's opensearch endpoint, resolving redirects."""
+        params = {
+            'action': 'opensearch',
+            'search': query,
+            'limit': '10',
+            'namespace': '0',
+            'redirects': 'resolve',
+            'format': 'json'
+        }
+        data = await self.scheduler.fetch_json(self.api_url, params, PRIORITY_INTERACTIVE)
+        if not isinstance(data, list) or len(data) < 2:
+            return []
+        return data[1]
+
+    def schedule_refresh(self):
+        """Rebuild the full title index in the background."""
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        try:
+            self._refresh_task = asyncio.get_running_loop().create_task(self.refresh())
+        except RuntimeError:
+            pass
+
+    async def refresh(self):
+        """Rebuild the index from the wiki's page and redirect lists.
+
+        The old index is kept unless both lists were read in full.
+        """
+        try:
+            titles = []
+            redirects = {}
+            async for page in self._query_all({
+                'list': 'allpages',
+                'apnamespace': '0',
+                'apfilterredir': 'nonredirects',
+                'aplimit': 'max'
+            }):
+                titles.extend(p['title'] for p in page.get('allpages', []))
+
+            async for page in self._query_all({
+                'generator': 'allpages',
+                'gapnamespace': '0',
+                'gapfilterredir': 'redirects',
+                'gaplimit': 'max',
+                'redirects': '1'
+            }):
+                for redirect in page.get('redirects', []):
+                    redirects[redirect['from']] = redirect['to']
+
+            if not titles:
+                return
+
+            self.titles = {}
+            self.redirects = {}
+            self._fuzzy_index = None
+            self.add_titles(titles)
+            for source, target in redirects.items():
+                self.add_redirect(source, target)
+            self.built_at = time.time()
+            self._misses.clear()
+            await asyncio.to_thread(self._save_cache, self._cache_data())
+
+            logger.info(f'Title index rebuilt with {len(self.titles)} pages and {len(self.redirects)} redirects')
+
+        except Exception as e:
+            logger.error(f'Error refreshing title index: {str(e)}')
+
+    async def _query_all(self, params: Dict):
+        """Iterate over every continuation of a MediaWiki query.
+
+        Raises RuntimeError if a page cannot be fetched, so callers never
+        mistake a partial list for the whole one.
+        """
+        params = {'action': 'query', 'format': 'json', **params}
+        for fetched in itertools.count():
+            data = await self.scheduler.fetch_json(self.api_url, params, PRIORITY_BACKGROUND)
+            if not isinstance(data, dict):
+                raise RuntimeError(f'query failed after {fetched} pages')
+
+            yield data.get('query', {})
+
+            if 'continue' not in data:
+                return
+            params = {**params, **data['continue']}
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict
+
+import discord
+
+from bot.cluster import process_memory
+from bot.config import MemberCacheSettings
+
+logger = logging.getLogger(__name__)
+
+# How often members past joined_ttl are dropped and memory use is logged
+MEMBER_CACHE_SWEEP_INTERVAL = 600
+
+
+def member_cache_options(settings: MemberCacheSettings) -> Dict:
+    """Keyword arguments for the bot that apply the member cache settings."""
+    return {
+        'member_cache_flags': discord.MemberCacheFlags(voice=settings.voice, joined=settings.joined),
+        'chunk_guilds_at_startup': settings.chunk_guilds_at_startup
+    }
+
+
+class MemberCacheTrimmer:
+    """Keeps the member cache to recent joins.
+
+    With the "joined" cache flag discord.py keeps every member who joins
+    while the bot runs, so the cache still grows with a guild's churn.
+    Every sweep drops members who joined more than joined_ttl seconds ago,
+    except the bot itself and members in voice when voice caching is on,
+    and logs how many members are cached and the process's memory use.
+    """
+
+    def __init__(self, bot, get_settings: Callable[[], MemberCacheSettings]):
+        self.bot = bot
+        self.get_settings = get_settings
+        self._task = None
+        self._dropped = 0
+        # discord.py has no public way to evict one member, so trimming leans
+        # on the private Guild._remove_member; if a release drops it, only
+        # the cache flags bound the cache
+        self._can_evict = hasattr(discord.Guild, '_remove_member')
+        if not self._can_evict:
+            logger.warning('This discord.py version cannot evict single members; member cache trimming is off')
+
+    def cached_members(self) -> int:
+        return sum(len(guild.members) for guild in self.bot.guilds)
+
+    def sweep(self) -> int:
+        """Drop members past joined_ttl from the cache; returns how many."""
+        settings = self.get_settings()
+        if not settings.joined_ttl or not self._can_evict:
+            return 0
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.joined_ttl)
+        own_id = self.bot.user.id if self.bot.user else None
+        dropped = 0
+        for guild in self.bot.guilds:
+            for member in guild.members:
+                if member.id == own_id:
+                    continue
+                # Voice states are only tracked when voice caching is on
+                if settings.voice and member.voice is not None:
+                    continue
+                if member.joined_at is None or member.joined_at < cutoff:
+                    guild._remove_member(member)
+                    dropped += 1
+        self._dropped += dropped
+        return dropped
+
+    async def _run(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                dropped = self.sweep()
+                logger.info(
+                    f'Member cache: {self.cached_members()} members cached across {len(self.bot.guilds)} guilds '
+                    f'({dropped} dropped); RSS {process_memory() / (1024 * 1024):.0f} MB'
+                )
+            except Exception as e:
+                logger.error(f'Error sweeping member cache: {str(e)}')
+
+    def start(self, interval=MEMBER_CACHE_SWEEP_INTERVAL):
+        """Start sweeping; needs a running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(interval))
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {'cached': self.cached_members(), 'dropped': self._dropped}
@@ -0,0 +1,133 @@
+import discord
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class EmbedPaginator(discord.ui.View):
+    """Button navigation over a list of prepared embeds."""
+
+    def __init__(self, pages: List[discord.Embed], author_id: int, timeout: float = 180):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.author_id = author_id
+        self.index = 0
+        self.message = None
+        self._update_buttons()
+
+    async def send(self, ctx):
+        """Send the first page, with buttons only if there is more than one."""
+        if len(self.pages) == 1:
+            self.message = await ctx.send(embed=self.pages[0])
+            self.stop()
+        else:
+            self.message = await ctx.send(embed=self.pages[0], view=self)
+        return self.message
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = self.index >= len(self.pages) - 1
+        self.page_counter.label = f"{self.index + 1}/{len(self.pages)}"
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("❌ Hanya yang menjalankan command yang bisa mengganti halaman.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction: discord.Interaction):
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.pages[self.index], view=self)
+
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = max(0, self.index - 1)
+        await self._show(interaction)
+
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def page_counter(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = min(len(self.pages) - 1, self.index + 1)
+        await self._show(interaction)
+
+    async def on_timeout(self):
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException as e:
+                logger.warning(f'Could not remove pagination buttons: {str(e)}')
+
+
+class CursorPaginator(discord.ui.View):
+    """Button navigation over pages fetched on demand by cursor.
+
+    fetch(cursor) returns (embed, next cursor or None); the cursor of every
+    visited page is remembered so going back never refetches from the start.
+    """
+
+    def __init__(self, fetch: Callable[[Any], Awaitable[Tuple[discord.Embed, Any]]], author_id: int,
+                 page_count: Optional[int] = None, timeout: float = 180):
+        super().__init__(timeout=timeout)
+        self.fetch = fetch
+        self.author_id = author_id
+        self.page_count = page_count
+        self.cursors = [None]
+        self.next_cursor = None
+        self.index = 0
+        self.message = None
+
+    async def send(self, ctx):
+        """Send the first page, with buttons only if there is a next one."""
+        embed, self.next_cursor = await self.fetch(None)
+        if self.next_cursor is None:
+            self.message = await ctx.send(embed=embed)
+            self.stop()
+        else:
+            self._update_buttons()
+            self.message = await ctx.send(embed=embed, view=self)
+        return self.message
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = self.next_cursor is None
+        total = f"/{self.page_count}" if self.page_count else ""
+        self.page_counter.label = f"{self.index + 1}{total}"
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("❌ Hanya yang menjalankan command yang bisa mengganti halaman.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction: discord.Interaction):
+        embed, self.next_cursor = await self.fetch(self.cursors[self.index])
+        self._update_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = max(0, self.index - 1)
+        await self._show(interaction)
+
+    @discord.ui.button(label="1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def page_counter(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.next_cursor is not None:
+            del self.cursors[self.index + 1:]
+            self.cursors.append(self.next_cursor)
+            self.index += 1
+        await self._show(interaction)
+
+    async def on_timeout(self):
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException as e:
+                logger.warning(f'Could not remove pagination buttons: {str(e)}')
@@ -0,0 +1,148 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prune idle cooldown buckets once this many are tracked
+MAX_IDLE_BUCKETS = 10000
+
+
+class Rejection(NamedTuple):
+    """Why a command use was refused: scope is 'user' or 'guild'."""
+    reason: str
+    scope: str
+    retry_after: float
+
+
+class Cooldown:
+    """Allows rate uses per `per` seconds, refilling continuously."""
+
+    def __init__(self, rate: int, per: float):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+
+    def retry_after(self, now: float) -> float:
+        """Seconds until one use is available (0 if it is now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.per / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.rate
+
+
+class CommandLimiter:
+    """Per-command cooldowns and concurrency limits by user and guild.
+
+    get_limits(command, guild_id) returns the command's settings, e.g.
+    ``{'user': [3, 30], 'guild': [15, 60], 'concurrency': 1,
+    'guild_concurrency': 3}``: at most 3 uses per user per 30 seconds and 15
+    per guild per minute, with one use per user and three per guild running
+    at a time. Missing keys mean no limit. Settings are looked up on every
+    use, so config changes apply at once; the buckets themselves live only
+    in memory.
+    """
+
+    def __init__(self, get_limits: Callable[[str, Optional[int]], Dict]):
+        self.get_limits = get_limits
+        self._cooldowns: Dict[Tuple, Cooldown] = {}
+        self._running: Dict[Tuple, int] = {}
+        self._stats = {'allowed': 0, 'cooldown': 0, 'concurrency': 0}
+
+    def _cooldown(self, key: Tuple, setting) -> Cooldown:
+        rate, per = setting
+        cooldown = self._cooldowns.get(key)
+        if cooldown is None or (cooldown.rate, cooldown.per) != (rate, per):
+            if len(self._cooldowns) >= MAX_IDLE_BUCKETS:
+                self._prune()
+            cooldown = self._cooldowns[key] = Cooldown(rate, per)
+        return cooldown
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [key for key, cooldown in self._cooldowns.items() if cooldown.is_idle(now)]:
+            del self._cooldowns[key]
+
+    def acquire(self, command: str, user_id: int, guild_id: Optional[int]):
+        """Start a use of command; returns (scopes held, None) or (None, Rejection).
+
+        Nothing is taken unless every limit allows the use.
+        """
+        limits = self.get_limits(command, guild_id)
+        scopes = [('user', user_id, 'concurrency')]
+        if guild_id is not None:
+            scopes.append(('guild', guild_id, 'guild_concurrency'))
+
+        for scope, scope_id, concurrency_key in scopes:
+            limit = limits.get(concurrency_key)
+            if limit and self._running.get((command, scope, scope_id), 0) >= limit:
+                self._stats['concurrency'] += 1
+                return None, Rejection('concurrency', scope, 0.0)
+
+        now = time.monotonic()
+        cooldowns = []
+        for scope, scope_id, _ in scopes:
+            setting = limits.get(scope)
+            if setting:
+                cooldown = self._cooldown((command, scope, scope_id), setting)
+                retry_after = cooldown.retry_after(now)
+                if retry_after > 0:
+                    self._stats['cooldown'] += 1
+                    return None, Rejection('cooldown', scope, retry_after)
+                cooldowns.append(cooldown)
+
+        for cooldown in cooldowns:
+            cooldown.take()
+        held = [(command, scope, scope_id) for scope, scope_id, _ in scopes]
+        for key in held:
+            self._running[key] = self._running.get(key, 0) + 1
+        self._stats['allowed'] += 1
+        return held, None
+
+    def release(self, held):
+        for key in held:
+            count = self._running[key] - 1
+            if count:
+                self._running[key] = count
+            else:
+                del self._running[key]
+
+    @contextmanager
+    def use(self, command: str, user_id: int, guild_id: Optional[int]):
+        """Hold a use of command for the block; yields a Rejection or None.
+
+        A rejected use holds nothing, so the block should return at once.
+        """
+        held, rejection = self.acquire(command, user_id, guild_id)
+        try:
+            yield rejection
+        finally:
+            if held:
+                self.release(held)
+
+    def stats(self) -> Dict:
+        return {'buckets': len(self._cooldowns), 'running': sum(self._running.values()), **self._stats}
+
+
+def rejection_message(rejection: Rejection) -> str:
+    """Tell a user, in the bot's language, why their command was refused."""
+    if rejection.reason == 'concurrency':
+        if rejection.scope == 'guild':
+            return "⏳ Terlalu banyak permintaan yang sedang berjalan di server ini. Coba lagi sebentar lagi."
+        return "⏳ Permintaanmu sebelumnya masih diproses. Tunggu sampai selesai."
+    if rejection.scope == 'guild':
+        return f"⏳ Command ini sedang ramai dipakai di server ini. Coba lagi dalam {rejection.retry_after:.0f} detik."
+    return f"⏳ Tunggu {rejection.retry_after:.0f} detik sebelum memakai command ini lagi."
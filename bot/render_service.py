@@ -0,0 +1,212 @@
+"""Standalone welcome image renderer, shared by every bot process.
+
+Start with ``python -m bot.render_service`` and set RENDER_SOCKET to the same
+address for the bot, which then sends render jobs here instead of running
+Pillow in its own process. The address is a Unix socket path (a
+``\\\\.\\pipe\\name`` on Windows); RENDER_AUTHKEY, if set, must match on both
+sides.
+
+The service composes the static layer (background, title and decorations)
+once and keeps its pixels in shared memory. RENDER_PROCESSES render
+processes (default: one per CPU) attach to it and only draw the member's
+avatar and names on a copy, so the background is neither downloaded nor
+held once per process.
+"""
+import asyncio
+import io
+import logging
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+from typing import List, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# How long the bot waits for a rendered image before rendering it itself
+RENDER_TIMEOUT = 30.0
+
+# Connections the bot keeps open to the service for reuse
+MAX_IDLE_CONNECTIONS = 4
+
+# Set in each render process by _attach()
+_static_layer: Optional[Image.Image] = None
+_generator = None
+_shared = None
+
+
+def _authkey() -> Optional[bytes]:
+    key = os.getenv('RENDER_AUTHKEY')
+    return key.encode('utf-8') if key else None
+
+
+def _attach(shm_name: str, size):
+    """Map the static layer from shared memory into this render process."""
+    global _static_layer, _generator, _shared
+    from bot.image_generator import WelcomeImageGenerator
+
+    # The service owns the segment; don't let this process's resource
+    # tracker unlink it when the process exits (Python 3.13+; before that
+    # the pool's processes share the service's tracker)
+    try:
+        _shared = shared_memory.SharedMemory(name=shm_name, track=False)
+    except TypeError:
+        _shared = shared_memory.SharedMemory(name=shm_name)
+    _static_layer = Image.frombuffer('RGBA', size, _shared.buf, 'raw', 'RGBA', 0, 1)
+    _generator = WelcomeImageGenerator()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _render(avatar_bytes: bytes, display_name: str, guild_name: str) -> bytes:
+    """Render one member's welcome image in a render process; returns PNG bytes."""
+    avatar_image = Image.open(io.BytesIO(avatar_bytes))
+    image = _generator.compose_member(_static_layer.copy(), avatar_image, display_name, guild_name)
+    output = io.BytesIO()
+    image.save(output, 'PNG')
+    return output.getvalue()
+
+
+class RenderService:
+    """Accepts render jobs on a local socket and runs them on a process pool.
+
+    Each connection is served by its own thread: it receives
+    ``('render', avatar_bytes, display_name, guild_name)`` and answers
+    ``('ok', png_bytes)`` or ``('error', message)``.
+    """
+
+    def __init__(self, address: str, processes: Optional[int] = None):
+        self.address = address
+        self.processes = processes or os.cpu_count() or 1
+        self.listener = None
+        self.pool = None
+        self.shared = None
+
+    def _publish_static_layer(self):
+        from bot.image_generator import WelcomeImageGenerator
+        generator = WelcomeImageGenerator()
+        background = asyncio.run(generator.create_background())
+        layer = generator.compose_static_layer(background).convert('RGBA')
+        pixels = layer.tobytes()
+        self.shared = shared_memory.SharedMemory(create=True, size=len(pixels))
+        self.shared.buf[:len(pixels)] = pixels
+        logger.info(f'Static layer ({len(pixels) // 1024} KB) published as {self.shared.name}')
+        return layer.size
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    _, avatar_bytes, display_name, guild_name = message
+                    reply = ('ok', self.pool.submit(_render, avatar_bytes, display_name, guild_name).result())
+                except Exception as e:
+                    logger.error(f'Error rendering welcome image: {str(e)}')
+                    reply = ('error', str(e))
+                try:
+                    conn.send(reply)
+                except OSError:
+                    return
+
+    def _stop(self, *_):
+        logger.info('Stopping render service')
+        # Wakes accept() in the main thread
+        self.listener.close()
+
+    def run(self):
+        try:
+            with Client(self.address, authkey=_authkey()):
+                logger.error(f'A render service is already listening on {self.address}')
+                return
+        except (OSError, EOFError):
+            pass
+        if not self.address.startswith('\\\\') and os.path.exists(self.address):
+            # Left behind by a service that didn't exit cleanly
+            os.remove(self.address)
+
+        size = self._publish_static_layer()
+        try:
+            self.pool = ProcessPoolExecutor(self.processes, initializer=_attach, initargs=(self.shared.name, size))
+            self.listener = Listener(self.address, authkey=_authkey())
+            signal.signal(signal.SIGINT, self._stop)
+            signal.signal(signal.SIGTERM, self._stop)
+            logger.info(f'Render service listening on {self.address} with {self.processes} render processes')
+            while True:
+                try:
+                    conn = self.listener.accept()
+                except OSError:
+                    break
+                except Exception as e:
+                    # A client with the wrong authkey
+                    logger.warning(f'Rejected render connection: {str(e)}')
+                    continue
+                threading.Thread(target=self._serve, args=(conn,), name='render-conn', daemon=True).start()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+            self.shared.close()
+            self.shared.unlink()
+        logger.info('Render service stopped')
+
+
+class RenderClient:
+    """The bot's side: sends render jobs to the service over reused connections."""
+
+    def __init__(self, address: str):
+        self.address = address
+        self._idle: List = []
+
+    def _render(self, avatar_bytes: bytes, display_name: str, guild_name: str) -> bytes:
+        while True:
+            try:
+                conn, reused = self._idle.pop(), True
+            except IndexError:
+                conn, reused = Client(self.address, authkey=_authkey()), False
+            try:
+                conn.send(('render', avatar_bytes, display_name, guild_name))
+                if not conn.poll(RENDER_TIMEOUT):
+                    raise TimeoutError('render service did not answer in time')
+                status, value = conn.recv()
+                break
+            except (OSError, EOFError):
+                conn.close()
+                # An idle connection may have outlived a service restart
+                if not reused:
+                    raise
+            except BaseException:
+                conn.close()
+                raise
+        if len(self._idle) < MAX_IDLE_CONNECTIONS:
+            self._idle.append(conn)
+        else:
+            conn.close()
+        if status != 'ok':
+            raise RuntimeError(value)
+        return value
+
+    async def render(self, avatar_bytes: bytes, display_name: str, guild_name: str) -> Optional[bytes]:
+        """Render a welcome image as PNG bytes, or return None if the service failed."""
+        try:
+            return await asyncio.to_thread(self._render, avatar_bytes, display_name, guild_name)
+        except Exception as e:
+            logger.error(f'Error using render service at {self.address}: {str(e)}')
+            return None
+
+
+def open_render_client() -> Optional[RenderClient]:
+    """A client for the service at RENDER_SOCKET, or None to render in-process."""
+    address = os.getenv('RENDER_SOCKET')
+    return RenderClient(address) if address else None
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    RenderService(os.getenv('RENDER_SOCKET', 'render.sock'), int(os.getenv('RENDER_PROCESSES') or 0) or None).run()
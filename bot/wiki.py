@@ -1,57 +1,491 @@
-import json
-import os
+import asyncio
+import difflib
+import itertools
 import logging
+import os
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import discord
 from discord.ext import commands
+from bot.wiki_index import SearchIndex, SortedIndex, TitleIndex, highlight_snippet
+from bot.wiki_history import RevisionHistory
+from bot.wiki_records import ContentStore, EntryRecord, make_preview, to_isoformat, to_timestamp
+from bot.wiki_snapshot import load_snapshot, remove_snapshot, write_snapshot
+from bot.wiki_storage import JsonWikiStorage
 
 logger = logging.getLogger(__name__)
 
+# A misspelled title resolves on its own above this similarity, as long as
+# the runner-up is clearly behind
+AUTO_RESOLVE_SCORE = 0.7
+AUTO_RESOLVE_MARGIN = 0.1
+
+# Suggestions below this similarity are not worth showing
+SUGGEST_MIN_SCORE = 0.3
+
+# Autocomplete only falls back to typo matching for wikis up to this many
+# titles; the trigram scan grows with the wiki and must fit a keystroke
+AUTOCOMPLETE_FUZZY_MAX_TITLES = 10000
+
+# Guild partitions unused for this long are evicted from memory
+PARTITION_IDLE_TTL = 30 * 60
+
+# Evict the least recently used partitions once resident entry records and
+# their indexes weigh more than this many characters
+PARTITION_MEMORY_BUDGET = 16 * 1024 * 1024
+
+# Rough per-entry overhead of a record and its dict slot, in characters
+RECORD_OVERHEAD = 200
+
+# Rough weight of one item in each index, in the same characters: a term's
+# posting for one entry (kept in both postings and doc_terms), a trigram of
+# a title or alias, and an item of a listing
+POSTING_SIZE = 140
+TRIGRAM_SIZE = 200
+SORTED_ITEM_SIZE = 100
+
+# How often idle partitions are looked for
+EVICTION_INTERVAL = 60
+
+
+# Orders entries can be listed in, as sort items built from a key and its record
+LIST_ORDERS = {
+    'created': lambda title_key, record: (-record.created_at, title_key),
+    'updated': lambda title_key, record: (-record.updated_at, title_key),
+    'edits': lambda title_key, record: (-record.edit_count, title_key),
+    'title': lambda title_key, record: (title_key,),
+}
+
+
+# Partition generations are unique across reloads, so a (guild, generation)
+# pair never names two different states of a wiki
+_generations = itertools.count(1)
+
+
+def entry_size(title_key, record):
+    """Approximate memory weight of an entry record, in characters."""
+    return RECORD_OVERHEAD + len(title_key) + len(record.preview)
+
+
+class WikiPartition:
+    """One guild's wiki: compact entry records, aliases and lazily built indexes.
+    
+    Entry bodies are kept in the shared ContentStore rather than in memory.
+    stale is set whenever the partition differs from its last snapshot, and
+    generation changes with every entry or alias change.
+    """
+    
+    def __init__(self, guild_id_str, data, contents, authors):
+        self.guild_id_str = guild_id_str
+        self.contents = contents
+        self.authors = authors
+        self.entries = {}
+        self.aliases = data['aliases']
+        self.alias_targets = {}
+        for alias, target in self.aliases.items():
+            self.alias_targets.setdefault(target, set()).add(alias)
+        self.search_index = None
+        self.title_index = None
+        self.sorted_indexes = {}
+        self.records_size = 0
+        self.last_used = time.monotonic()
+        self.stale = True
+        self.generation = next(_generations)
+        for title_key, entry in data['entries'].items():
+            self.put(title_key, entry, cache=False)
+    
+    @classmethod
+    def from_snapshot(cls, guild_id_str, meta, contents, authors):
+        """Rebuild a partition from snapshot meta whose bodies are already in contents."""
+        partition = cls(guild_id_str, {'entries': {}, 'aliases': meta['aliases']}, contents, authors)
+        for title_key, title, author_id, created_at, updated_at, edit_count, offset, length, preview in meta['entries']:
+            record = EntryRecord(
+                title_key if title == title_key else title, authors.setdefault(author_id, author_id),
+                created_at, updated_at, edit_count, offset, length, preview
+            )
+            partition.entries[title_key] = record
+            partition.records_size += entry_size(title_key, record)
+        if meta['search'] is not None:
+            index = partition.search_index = SearchIndex()
+            (index.postings, index.title_terms, index.doc_terms, index.doc_lengths,
+             index.total_length, index.sorted_terms) = meta['search']
+            index.posting_count = sum(len(weights) for weights in index.doc_terms.values())
+        partition.stale = False
+        return partition
+    
+    def snapshot(self, read_raw):
+        """Get (meta, compressed bodies) for write_snapshot.
+        
+        read_raw(record) returns a body still compressed. Bodies are laid out
+        back to back, so the offsets in meta point into the snapshot's
+        content section.
+        """
+        records = []
+        chunks = []
+        offset = 0
+        for title_key, record in self.entries.items():
+            chunk = read_raw(record)
+            records.append((
+                title_key, record.title, record.author_id, record.created_at, record.updated_at,
+                record.edit_count, offset, len(chunk), record.preview
+            ))
+            chunks.append(chunk)
+            offset += len(chunk)
+        
+        search = None
+        if self.search_index is not None:
+            index = self.search_index
+            search = (index.postings, index.title_terms, index.doc_terms, index.doc_lengths,
+                      index.total_length, index.sorted_terms)
+        return {'entries': records, 'aliases': self.aliases, 'search': search}, chunks
+    
+    def put(self, title_key, entry, cache=True):
+        """Store an entry dict as a record, replacing any previous version."""
+        content = entry['content']
+        offset, length = self.contents.put(self.guild_id_str, title_key, content, cache)
+        title = entry['title']
+        author_id = entry.get('author_id')
+        record = EntryRecord(
+            title_key if title == title_key else title,
+            self.authors.setdefault(author_id, author_id),
+            to_timestamp(entry.get('created_at')),
+            to_timestamp(entry.get('updated_at')),
+            entry.get('edit_count', 0),
+            offset, length, make_preview(content)
+        )
+        previous = self.entries.get(title_key)
+        if previous:
+            self.records_size -= entry_size(title_key, previous)
+        self.entries[title_key] = record
+        self.touch()
+        self.records_size += entry_size(title_key, record)
+        
+        for order, index in self.sorted_indexes.items():
+            sort_item = LIST_ORDERS[order]
+            if previous:
+                index.remove(sort_item(title_key, previous))
+            index.add(sort_item(title_key, record))
+        return record
+    
+    def remove(self, title_key):
+        """Drop an entry record and its cached body."""
+        record = self.entries.pop(title_key)
+        self.records_size -= entry_size(title_key, record)
+        self.touch()
+        self.contents.discard(self.guild_id_str, title_key)
+        for order, index in self.sorted_indexes.items():
+            index.remove(LIST_ORDERS[order](title_key, record))
+    
+    @property
+    def size(self):
+        """Approximate memory weight of the records and built indexes, in characters."""
+        size = self.records_size
+        if self.search_index is not None:
+            size += POSTING_SIZE * self.search_index.posting_count
+        if self.title_index is not None:
+            size += TRIGRAM_SIZE * self.title_index.gram_count
+        for index in self.sorted_indexes.values():
+            size += SORTED_ITEM_SIZE * len(index)
+        return size
+    
+    def touch(self):
+        """Mark the partition changed."""
+        self.stale = True
+        self.generation = next(_generations)
+    
+    def content(self, title_key, cache=True):
+        """Read an entry's body."""
+        return self.contents.get(self.guild_id_str, title_key, self.entries[title_key], cache)
+    
+    def entry(self, title_key, cache=True):
+        """Get an entry as a dict, or None if it does not exist."""
+        record = self.entries.get(title_key)
+        if record is None:
+            return None
+        return record.to_dict(self.content(title_key, cache))
+    
+    def drop_indexes(self):
+        """Forget every derived index; each is rebuilt on its next use."""
+        self.search_index = None
+        self.title_index = None
+        self.sorted_indexes = {}
+    
+    def get_search_index(self):
+        """Get the search index, building it on first use."""
+        if self.search_index is None:
+            self.search_index = SearchIndex()
+            for title_key, record in self.entries.items():
+                self.search_index.add(title_key, record.title, self.content(title_key))
+            self.stale = True
+        return self.search_index
+    
+    def set_alias(self, alias, target):
+        """Point an alias at an entry key, keeping the reverse index in step."""
+        self.drop_alias(alias)
+        self.aliases[alias] = target
+        self.touch()
+        self.alias_targets.setdefault(target, set()).add(alias)
+        if self.title_index is not None:
+            self.title_index.add(alias, target)
+    
+    def drop_alias(self, alias):
+        """Remove an alias; returns the key it pointed at, or None."""
+        target = self.aliases.pop(alias, None)
+        if target is None:
+            return None
+        self.touch()
+        names = self.alias_targets[target]
+        names.discard(alias)
+        if not names:
+            del self.alias_targets[target]
+        if self.title_index is not None:
+            self.title_index.remove(alias)
+        return target
+    
+    def aliases_of(self, title_key):
+        """Get the aliases pointing at an entry key."""
+        return self.alias_targets.get(title_key, set())
+    
+    def get_sorted_index(self, order):
+        """Get the listing index for an order, building it on first use."""
+        index = self.sorted_indexes.get(order)
+        if index is None:
+            sort_item = LIST_ORDERS[order]
+            index = self.sorted_indexes[order] = SortedIndex()
+            index.items = sorted(sort_item(title_key, record) for title_key, record in self.entries.items())
+        return index
+    
+    def get_title_index(self):
+        """Get the title index, building it on first use."""
+        if self.title_index is None:
+            self.title_index = TitleIndex()
+            for title_key in self.entries:
+                self.title_index.add(title_key, title_key)
+            for alias, target in self.aliases.items():
+                self.title_index.add(alias, target)
+        return self.title_index
+
+
+def build_indexes(items, aliases, search=True):
+    """Build (search index or None, title index) from (key, title, compressed body) items.
+    
+    Touches nothing shared, so it can run on a worker thread.
+    """
+    search_index = SearchIndex() if search else None
+    title_index = TitleIndex()
+    for title_key, title, body in items:
+        if search_index is not None:
+            search_index.add(title_key, title, zlib.decompress(body).decode('utf-8'))
+        title_index.add(title_key, title_key)
+    for alias, target in aliases.items():
+        title_index.add(alias, target)
+    return search_index, title_index
+
+
 class WikiSystem:
-    """Manages wiki entries for the Discord bot."""
+    """Manages wiki entries for the Discord bot.
     
-    def __init__(self, wiki_file='wiki.json'):
+    Each guild's wiki is a partition loaded from storage on first access and
+    evicted again after PARTITION_IDLE_TTL without use, or least recently
+    used first when resident entries and their indexes exceed
+    PARTITION_MEMORY_BUDGET.
+    
+    A partition that changed is written to a binary snapshot in snapshot_dir
+    when it is evicted or the wiki closes. Eviction only detaches the
+    partition; flushing its storage and writing the snapshot happen on a
+    background thread, so the command that triggered it does no file I/O. The next load restores records,
+    aliases, the search index and compressed bodies from the snapshot as long
+    as storage still reports the version it was taken at, and falls back to
+    rebuilding from storage otherwise.
+    """
+    
+    def __init__(self, wiki_file='wiki.json', storage=None, history=None, snapshot_dir='wiki_snapshots'):
         self.wiki_file = wiki_file
-        self.wiki_data = self._load_wiki()
+        self.storage = storage or JsonWikiStorage(legacy_file=wiki_file)
+        self.history = history or RevisionHistory()
+        self.snapshot_dir = snapshot_dir
+        os.makedirs(snapshot_dir, exist_ok=True)
+        self.contents = ContentStore()
+        self._known_guilds = set(self.storage.list_guilds())
+        self._partitions = OrderedDict()
+        self._unloader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='wiki-unload')
+        self._unloading = {}
+        self._authors = {}
+        self._last_eviction = time.monotonic()
+        self._stats = {'hits': 0, 'loads': 0, 'snapshot_loads': 0, 'evictions': 0}
     
-    def _load_wiki(self):
-        """Load wiki data from file."""
-        try:
-            if os.path.exists(self.wiki_file):
-                with open(self.wiki_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+    def close(self):
+        """Snapshot and unload every partition, then close the storage and history."""
+        for guild_id_str in list(self._partitions):
+            self._unload(guild_id_str)
+        self._unloader.shutdown(wait=True)
+        self.history.close()
+        self.storage.close()
+        self.contents.close()
+    
+    def _partition(self, guild_id, create=False):
+        """Get a guild's partition, loading it on first access.
+        
+        Returns None for guilds without a wiki unless create is set.
+        """
+        guild_id_str = str(guild_id)
+        partition = self._partitions.get(guild_id_str)
+        if partition is not None:
+            self._stats['hits'] += 1
+            self._partitions.move_to_end(guild_id_str)
+        else:
+            if guild_id_str not in self._known_guilds and not create:
+                return None
+            pending = self._unloading.get(guild_id_str)
+            if pending is not None:
+                # Reused right after eviction: the reload must see the
+                # flushed storage and must not share the old blob file's name.
+                # Commands await ready() first, so this rarely has to block
+                pending.result()
+            partition = self._restore(guild_id_str) if guild_id_str in self._known_guilds else None
+            if partition is None:
+                partition = WikiPartition(guild_id_str, self.storage.load_guild(guild_id_str), self.contents, self._authors)
+            self._partitions[guild_id_str] = partition
+            self._known_guilds.add(guild_id_str)
+            self.history.preload(guild_id_str)
+            self._stats['loads'] += 1
+            self._evict(keep=guild_id_str)
+        
+        partition.last_used = time.monotonic()
+        if partition.last_used - self._last_eviction >= EVICTION_INTERVAL:
+            self._evict(keep=guild_id_str)
+        return partition
+    
+    async def ready(self, guild_id):
+        """Wait without blocking the event loop until a guild's partition can load.
+        
+        A partition evicted moments ago is still being unloaded on the unload
+        thread; loading it again has to wait for that to finish.
+        """
+        pending = self._unloading.get(str(guild_id))
+        if pending is not None:
+            await asyncio.wrap_future(pending)
+    
+    def _evict(self, keep=None):
+        """Evict idle partitions, then the least recently used over budget."""
+        now = time.monotonic()
+        self._last_eviction = now
+        resident_size = self._resident_size()
+        for guild_id_str, partition in list(self._partitions.items()):
+            if guild_id_str == keep:
+                continue
+            if resident_size > PARTITION_MEMORY_BUDGET or now - partition.last_used >= PARTITION_IDLE_TTL:
+                resident_size -= partition.size
+                self._unload(guild_id_str)
             else:
-                return {'entries': {}, 'aliases': {}}
+                # Partitions are in least recently used order, so the rest are fresher
+                break
+    
+    def _resident_size(self):
+        return sum(partition.size for partition in self._partitions.values())
+    
+    def _restore(self, guild_id_str):
+        """Load a partition from its snapshot, or None if there is no usable one."""
+        try:
+            snapshot = load_snapshot(self.snapshot_dir, guild_id_str, self.storage.guild_version(guild_id_str))
+            if snapshot is None:
+                return None
+            self.contents.adopt(
+                guild_id_str, os.path.join(self.snapshot_dir, f'{guild_id_str}.snap'),
+                snapshot.content_offset, snapshot.content_length
+            )
+            partition = WikiPartition.from_snapshot(guild_id_str, snapshot.meta, self.contents, self._authors)
         except Exception as e:
-            logger.error(f'Error loading wiki: {str(e)}')
-            return {'entries': {}, 'aliases': {}}
+            logger.warning(f'Could not restore wiki snapshot for guild {guild_id_str}: {str(e)}')
+            self.contents.drop_guild(guild_id_str)
+            return None
+        self._stats['snapshot_loads'] += 1
+        return partition
     
-    def _save_wiki(self):
-        """Save wiki data to file."""
+    def _save_snapshot(self, partition, version, content):
+        """Write a partition's snapshot at the storage version it now matches."""
+        guild_id_str = partition.guild_id_str
         try:
-            with open(self.wiki_file, 'w', encoding='utf-8') as f:
-                json.dump(self.wiki_data, f, indent=2, ensure_ascii=False)
+            if not partition.entries and not partition.aliases:
+                remove_snapshot(self.snapshot_dir, guild_id_str)
+                return
+            meta, chunks = partition.snapshot(content.raw)
+            # The bodies may be served from the old snapshot; let go of it
+            # before it is replaced
+            content.close()
+            write_snapshot(self.snapshot_dir, guild_id_str, version, meta, chunks)
         except Exception as e:
-            logger.error(f'Error saving wiki: {str(e)}')
+            logger.error(f'Error writing wiki snapshot for guild {guild_id_str}: {str(e)}')
+            remove_snapshot(self.snapshot_dir, guild_id_str)
+    
+    def _unload(self, guild_id_str):
+        """Detach a partition and finish unloading it on the unload thread."""
+        partition = self._partitions.pop(guild_id_str)
+        finish_storage = self.storage.detach_guild(guild_id_str)
+        content = self.contents.detach(guild_id_str)
+        self.history.drop_guild(guild_id_str)
+        self._stats['evictions'] += 1
+        
+        def forget(done):
+            if self._unloading.get(guild_id_str) is done:
+                self._unloading.pop(guild_id_str, None)
+        
+        future = self._unloading[guild_id_str] = self._unloader.submit(
+            self._finish_unload, partition, finish_storage, content
+        )
+        future.add_done_callback(forget)
+    
+    def _finish_unload(self, partition, finish_storage, content):
+        """Flush an evicted partition's storage and snapshot it; runs on the unload thread."""
+        try:
+            version = finish_storage()
+            if partition.stale:
+                self._save_snapshot(partition, version, content)
+        except Exception as e:
+            logger.error(f'Error unloading wiki partition for guild {partition.guild_id_str}: {str(e)}')
+        finally:
+            content.close()
+        logger.debug(f'Evicted wiki partition for guild {partition.guild_id_str} ({partition.size} chars)')
+    
+    def partition_stats(self):
+        """Get statistics on the resident guild partitions."""
+        return {
+            'resident': len(self._partitions),
+            'known': len(self._known_guilds),
+            'resident_entries': sum(len(p.entries) for p in self._partitions.values()),
+            'resident_size': self._resident_size(),
+            'cached_bodies': self.contents.cached_count(),
+            'indexed': sum(1 for p in self._partitions.values() if p.search_index is not None),
+            'unloading': len(self._unloading),
+            **self._stats
+        }
     
     def add_entry(self, title, content, author_id, guild_id):
         """Add a new wiki entry."""
         title_lower = title.lower()
         guild_id_str = str(guild_id)
+        partition = self._partition(guild_id_str, create=True)
         
-        if guild_id_str not in self.wiki_data['entries']:
-            self.wiki_data['entries'][guild_id_str] = {}
-        
-        self.wiki_data['entries'][guild_id_str][title_lower] = {
+        now = datetime.now().isoformat(timespec='seconds')
+        entry = {
             'title': title,
             'content': content,
             'author_id': author_id,
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat(),
+            'created_at': now,
+            'updated_at': now,
             'edit_count': 0
         }
+        partition.put(title_lower, entry)
+        
+        if partition.search_index is not None:
+            partition.search_index.add(title_lower, title, content)
+        if partition.title_index is not None:
+            partition.title_index.add(title_lower, title_lower)
         
-        self._save_wiki()
+        self.storage.put_entry(guild_id_str, title_lower, entry)
         logger.info(f'Wiki entry "{title}" added by user {author_id} in guild {guild_id}')
         return True
     
@@ -59,136 +493,457 @@ class WikiSystem:
         """Edit an existing wiki entry."""
         title_lower = title.lower()
         guild_id_str = str(guild_id)
+        partition = self._partition(guild_id_str)
         
-        if guild_id_str not in self.wiki_data['entries']:
+        if partition is None or title_lower not in partition.entries:
             return False
         
-        if title_lower not in self.wiki_data['entries'][guild_id_str]:
-            return False
-        
-        entry = self.wiki_data['entries'][guild_id_str][title_lower]
-        entry['content'] = content
-        entry['updated_at'] = datetime.now().isoformat()
+        record = partition.entries[title_lower]
+        old_content = partition.content(title_lower)
+        entry = record.to_dict(content)
+        entry['updated_at'] = datetime.now().isoformat(timespec='seconds')
         entry['edit_count'] += 1
+        self.history.record_edit(
+            guild_id_str, title_lower, record.edit_count, old_content, content, author_id,
+            record.updated_at, record.author_id if record.edit_count == 0 else None
+        )
+        partition.put(title_lower, entry)
+        
+        if partition.search_index is not None:
+            partition.search_index.add(title_lower, entry['title'], content)
         
-        self._save_wiki()
+        self.storage.put_entry(guild_id_str, title_lower, entry)
         logger.info(f'Wiki entry "{title}" edited by user {author_id} in guild {guild_id}')
         return True
     
+    def entry_version(self, title, guild_id):
+        """Get (guild, entry key, record version, aliases) for a title or alias, or None.
+        
+        The tuple changes whenever anything an entry's rendering shows could
+        have changed, and only then, so it can key caches of rendered
+        entries without an edit elsewhere in the guild invalidating them.
+        """
+        partition, title_key = self._resolve(title, guild_id)
+        if partition is None:
+            return None
+        aliases = tuple(sorted(partition.aliases_of(title_key)))
+        return partition.guild_id_str, title_key, partition.entries[title_key].version, aliases
+    
     def get_entry(self, title, guild_id):
         """Get a wiki entry."""
         title_lower = title.lower()
-        guild_id_str = str(guild_id)
+        partition = self._partition(guild_id)
+        if partition is None:
+            return None
         
         # Check aliases first
-        if guild_id_str in self.wiki_data.get('aliases', {}):
-            if title_lower in self.wiki_data['aliases'][guild_id_str]:
-                title_lower = self.wiki_data['aliases'][guild_id_str][title_lower]
-        
-        if guild_id_str in self.wiki_data['entries']:
-            return self.wiki_data['entries'][guild_id_str].get(title_lower)
-        
-        return None
+        title_lower = partition.aliases.get(title_lower, title_lower)
+        return partition.entry(title_lower)
     
     def delete_entry(self, title, guild_id):
         """Delete a wiki entry."""
         title_lower = title.lower()
         guild_id_str = str(guild_id)
+        partition = self._partition(guild_id_str)
         
-        if guild_id_str not in self.wiki_data['entries']:
+        if partition is None or title_lower not in partition.entries:
             return False
         
-        if title_lower not in self.wiki_data['entries'][guild_id_str]:
-            return False
+        partition.remove(title_lower)
         
-        del self.wiki_data['entries'][guild_id_str][title_lower]
+        if partition.search_index is not None:
+            partition.search_index.remove(title_lower)
+        if partition.title_index is not None:
+            partition.title_index.remove(title_lower)
         
         # Remove aliases pointing to this entry
-        if guild_id_str in self.wiki_data.get('aliases', {}):
-            aliases_to_remove = []
-            for alias, target in self.wiki_data['aliases'][guild_id_str].items():
-                if target == title_lower:
-                    aliases_to_remove.append(alias)
-            
-            for alias in aliases_to_remove:
-                del self.wiki_data['aliases'][guild_id_str][alias]
+        for alias in list(partition.aliases_of(title_lower)):
+            partition.drop_alias(alias)
+            self.storage.delete_alias(guild_id_str, alias)
         
-        self._save_wiki()
+        self.history.purge(guild_id_str, title_lower)
+        self.storage.delete_entry(guild_id_str, title_lower)
         logger.info(f'Wiki entry "{title}" deleted from guild {guild_id}')
         return True
     
+    def suggest_titles(self, title, guild_id, limit=3):
+        """Suggest entries whose title or alias is close to a misspelled title."""
+        partition = self._partition(guild_id)
+        if partition is None or not partition.entries:
+            return []
+        
+        suggestions = []
+        for name, title_key, score in partition.get_title_index().suggest(title, limit):
+            if score >= SUGGEST_MIN_SCORE and title_key in partition.entries:
+                suggestions.append({
+                    'title': partition.entries[title_key].title,
+                    'matched': name,
+                    'score': score
+                })
+        return suggestions
+    
+    def complete_titles(self, prefix, guild_id, limit=25):
+        """Get entry titles for autocomplete as a title is typed.
+        
+        Titles starting with the prefix come first, in title order, from the
+        title listing index; when they run short in a wiki of at most
+        AUTOCOMPLETE_FUZZY_MAX_TITLES entries, titles close to a misspelled
+        prefix fill the rest.
+        """
+        partition = self._partition(guild_id)
+        if partition is None:
+            return []
+        
+        prefix = prefix.strip().lower()
+        keys = [item[0] for item in partition.get_sorted_index('title').prefixed(prefix, limit)]
+        if len(keys) < limit and len(prefix) >= 3 and len(partition.entries) <= AUTOCOMPLETE_FUZZY_MAX_TITLES:
+            for name, title_key, score in partition.get_title_index().suggest(prefix, limit):
+                if score >= SUGGEST_MIN_SCORE and title_key not in keys and title_key in partition.entries:
+                    keys.append(title_key)
+        return [partition.entries[title_key].title for title_key in keys[:limit]]
+    
+    def find_entry(self, title, guild_id):
+        """Get a wiki entry, falling back to the closest title for typos.
+        
+        Returns (entry, suggestions): the entry is set when the title matches
+        exactly or one suggestion is confident enough to resolve on its own;
+        otherwise suggestions lists the closest titles for "did you mean".
+        """
+        entry = self.get_entry(title, guild_id)
+        if entry:
+            return entry, []
+        
+        suggestions = self.suggest_titles(title, guild_id)
+        if suggestions and suggestions[0]['score'] >= AUTO_RESOLVE_SCORE:
+            runner_up = suggestions[1]['score'] if len(suggestions) > 1 else 0.0
+            if suggestions[0]['score'] - runner_up >= AUTO_RESOLVE_MARGIN:
+                return self.get_entry(suggestions[0]['title'], guild_id), suggestions[:1]
+        
+        return None, suggestions
+    
     def search_entries(self, query, guild_id, limit=10):
-        """Search wiki entries by title or content."""
-        query_lower = query.lower()
+        """Search wiki entries by title or content, best matches first."""
         guild_id_str = str(guild_id)
         results = []
         
-        if guild_id_str not in self.wiki_data['entries']:
+        if guild_id_str not in self._known_guilds:
             return results
         
-        for title_key, entry in self.wiki_data['entries'][guild_id_str].items():
-            # Search in title
-            if query_lower in entry['title'].lower():
-                results.append({
-                    'title': entry['title'],
-                    'content': entry['content'][:100] + '...' if len(entry['content']) > 100 else entry['content'],
-                    'match_type': 'title'
-                })
-            # Search in content
-            elif query_lower in entry['content'].lower():
-                results.append({
-                    'title': entry['title'],
-                    'content': entry['content'][:100] + '...' if len(entry['content']) > 100 else entry['content'],
-                    'match_type': 'content'
-                })
-            
-            if len(results) >= limit:
-                break
+        if self.storage.supports_search:
+            return self.storage.search(query, guild_id_str, limit)
+        
+        partition = self._partition(guild_id_str)
+        for title_key, score, title_match in partition.get_search_index().search(query, limit):
+            results.append({
+                'title': partition.entries[title_key].title,
+                'content': highlight_snippet(partition.content(title_key), query),
+                'match_type': 'title' if title_match else 'content',
+                'score': score
+            })
         
         return results
     
-    def list_entries(self, guild_id, limit=20):
-        """List all wiki entries for a guild."""
-        guild_id_str = str(guild_id)
-        entries = []
+    def list_entries(self, guild_id, limit=20, order='created'):
+        """List the first wiki entries for a guild."""
+        return self.list_page(guild_id, order, limit=limit)[0]
+    
+    def list_page(self, guild_id, order='created', after=None, limit=15):
+        """List one page of a guild's wiki entries in the given order.
         
-        if guild_id_str not in self.wiki_data['entries']:
-            return entries
+        order is one of LIST_ORDERS; after is the cursor returned with the
+        previous page. Returns (entries, next cursor or None, total entries).
+        """
+        partition = self._partition(guild_id)
+        if partition is None:
+            return [], None, 0
         
-        for entry in self.wiki_data['entries'][guild_id_str].values():
+        index = partition.get_sorted_index(order)
+        items = index.page(after, limit + 1)
+        entries = []
+        for item in items[:limit]:
+            record = partition.entries[item[-1]]
             entries.append({
-                'title': entry['title'],
-                'content': entry['content'][:50] + '...' if len(entry['content']) > 50 else entry['content'],
-                'created_at': entry['created_at'],
-                'edit_count': entry['edit_count']
+                'title': record.title,
+                'content': record.preview,
+                'created_at': to_isoformat(record.created_at),
+                'updated_at': to_isoformat(record.updated_at),
+                'edit_count': record.edit_count
             })
         
-        # Sort by creation date (newest first)
-        entries.sort(key=lambda x: x['created_at'], reverse=True)
-        return entries[:limit]
+        next_cursor = items[limit - 1] if len(items) > limit else None
+        return entries, next_cursor, len(index)
+    
+    def import_entries(self, entries, guild_id, overwrite=False):
+        """Add a batch of entry dicts at once, for bulk imports.
+        
+        Each entry needs a title and content and may carry author_id,
+        created_at, updated_at, edit_count and a list of aliases. Existing
+        titles are skipped unless overwrite is set. Instead of updating the
+        derived indexes per entry they are dropped, to be rebuilt once the
+        whole import is in (see rebuild_indexes), and the batch is handed to
+        storage in one call. Returns (imported, skipped).
+        """
+        guild_id_str = str(guild_id)
+        partition = self._partition(guild_id_str, create=True)
+        now = datetime.now().isoformat(timespec='seconds')
+        
+        batch = {}
+        aliases = {}
+        skipped = 0
+        for item in entries:
+            title = item.get('title')
+            content = item.get('content')
+            if not isinstance(title, str) or not title.strip() or not isinstance(content, str):
+                skipped += 1
+                continue
+            
+            title = title.strip()
+            title_lower = title.lower()
+            if title_lower in batch or (title_lower in partition.entries and not overwrite):
+                skipped += 1
+                continue
+            
+            try:
+                author_id = int(item['author_id']) if item.get('author_id') not in (None, '') else None
+                edit_count = int(item.get('edit_count') or 0)
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+            
+            created_at = item.get('created_at') or now
+            batch[title_lower] = {
+                'title': title,
+                'content': content,
+                'author_id': author_id,
+                'created_at': created_at,
+                'updated_at': item.get('updated_at') or created_at,
+                'edit_count': edit_count
+            }
+            for alias in item.get('aliases') or ():
+                aliases[str(alias).strip().lower()] = title_lower
+        
+        if not batch:
+            return 0, skipped
+        
+        partition.drop_indexes()
+        for title_key, entry in batch.items():
+            if title_key in partition.entries:
+                self.history.purge(guild_id_str, title_key)
+            partition.put(title_key, entry, cache=False)
+        for alias, target in list(aliases.items()):
+            if not alias or alias in partition.entries:
+                del aliases[alias]
+            else:
+                partition.set_alias(alias, target)
+        
+        self.storage.put_batch(guild_id_str, batch, aliases)
+        logger.debug(f'Imported {len(batch)} wiki entries into guild {guild_id} ({skipped} skipped)')
+        return len(batch), skipped
+    
+    async def rebuild_indexes(self, guild_id):
+        """Rebuild a partition's search and title indexes on a worker thread.
+        
+        Bodies are copied out still compressed, then decompressed and indexed
+        off the event loop. The new indexes are kept only if the partition
+        did not change meanwhile; otherwise they are rebuilt on next use.
+        """
+        partition = self._partition(guild_id)
+        if partition is None:
+            return
+        generation = partition.generation
+        guild_id_str = partition.guild_id_str
+        items = [
+            (title_key, record.title, self.contents.raw(guild_id_str, record))
+            for title_key, record in partition.entries.items()
+        ]
+        search_index, title_index = await asyncio.to_thread(
+            build_indexes, items, dict(partition.aliases), not self.storage.supports_search
+        )
+        if self._partitions.get(guild_id_str) is partition and partition.generation == generation:
+            partition.search_index = search_index
+            partition.title_index = title_index
+            partition.stale = True
+    
+    def export_keys(self, guild_id):
+        """Get a guild's entry keys in title order, for exporting."""
+        partition = self._partition(guild_id)
+        return sorted(partition.entries) if partition else []
+    
+    def export_entries(self, title_keys, guild_id):
+        """Get entry dicts with their aliases, for exporting.
+        
+        Keys deleted since export_keys are skipped; bodies are read without
+        filling the content cache.
+        """
+        partition = self._partition(guild_id)
+        if partition is None:
+            return []
+        
+        entries = []
+        for title_key in title_keys:
+            entry = partition.entry(title_key, cache=False)
+            if entry:
+                entry['aliases'] = sorted(partition.aliases_of(title_key))
+                entries.append(entry)
+        return entries
+    
+    def rename_entry(self, old_title, new_title, guild_id):
+        """Rename a wiki entry, carrying its aliases over to the new title."""
+        old_key = old_title.lower()
+        new_key = new_title.lower()
+        guild_id_str = str(guild_id)
+        partition = self._partition(guild_id_str)
+        
+        if partition is None or old_key not in partition.entries:
+            return False
+        if new_key != old_key and new_key in partition.entries:
+            return False
+        
+        entry = partition.entry(old_key)
+        entry['title'] = new_title
+        entry['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        
+        # An alias spelled like the new title would shadow it
+        if partition.drop_alias(new_key) is not None:
+            self.storage.delete_alias(guild_id_str, new_key)
+        
+        if new_key != old_key:
+            partition.remove(old_key)
+            if partition.search_index is not None:
+                partition.search_index.remove(old_key)
+            if partition.title_index is not None:
+                partition.title_index.remove(old_key)
+                partition.title_index.add(new_key, new_key)
+            self.storage.delete_entry(guild_id_str, old_key)
+            self.history.rename(guild_id_str, old_key, new_key)
+            
+            for alias in list(partition.aliases_of(old_key)):
+                partition.set_alias(alias, new_key)
+                self.storage.put_alias(guild_id_str, alias, new_key)
+        
+        partition.put(new_key, entry)
+        if partition.search_index is not None:
+            partition.search_index.add(new_key, new_title, entry['content'])
+        self.storage.put_entry(guild_id_str, new_key, entry)
+        
+        logger.info(f'Wiki entry "{old_title}" renamed to "{new_title}" in guild {guild_id}')
+        return True
+    
+    def _resolve(self, title, guild_id):
+        """Get (partition, entry key) for a title or alias, or (None, None)."""
+        partition = self._partition(guild_id)
+        if partition is None:
+            return None, None
+        title_lower = title.lower()
+        title_lower = partition.aliases.get(title_lower, title_lower)
+        if title_lower not in partition.entries:
+            return None, None
+        return partition, title_lower
+    
+    def entry_history(self, title, guild_id):
+        """List an entry's revisions, newest first.
+        
+        Returns dicts with rev, timestamp (ISO) and author_id; the current
+        revision is always included, even before the first edit.
+        """
+        partition, title_key = self._resolve(title, guild_id)
+        if partition is None:
+            return []
+        
+        record = partition.entries[title_key]
+        revisions = {
+            revision.rev: {'rev': revision.rev, 'timestamp': to_isoformat(revision.timestamp), 'author_id': revision.author_id}
+            for revision in self.history.revisions(partition.guild_id_str, title_key)
+        }
+        if record.edit_count not in revisions:
+            revisions[record.edit_count] = {
+                'rev': record.edit_count,
+                'timestamp': to_isoformat(record.updated_at),
+                'author_id': record.author_id if record.edit_count == 0 else None
+            }
+        return sorted(revisions.values(), key=lambda revision: revision['rev'], reverse=True)
+    
+    def get_revision(self, title, rev, guild_id):
+        """Get an entry's content at a revision, or None if it is not recorded."""
+        partition, title_key = self._resolve(title, guild_id)
+        if partition is None:
+            return None
+        if rev == partition.entries[title_key].edit_count:
+            return partition.content(title_key)
+        return self.history.get(partition.guild_id_str, title_key, rev)
+    
+    def diff_revisions(self, title, old_rev, new_rev, guild_id):
+        """Get a unified diff between two revisions, or None if either is missing."""
+        old = self.get_revision(title, old_rev, guild_id)
+        new = self.get_revision(title, new_rev, guild_id)
+        if old is None or new is None:
+            return None
+        return '\n'.join(difflib.unified_diff(
+            old.splitlines(), new.splitlines(), f'rev {old_rev}', f'rev {new_rev}', lineterm=''
+        ))
+    
+    def rollback_entry(self, title, rev, author_id, guild_id):
+        """Restore an entry's content from a revision, as a new edit."""
+        content = self.get_revision(title, rev, guild_id)
+        if content is None:
+            return False
+        partition, title_key = self._resolve(title, guild_id)
+        return self.edit_entry(title_key, content, author_id, guild_id)
+    
+    def get_aliases(self, title, guild_id):
+        """List the aliases of a wiki entry, alphabetically."""
+        partition = self._partition(guild_id)
+        if partition is None:
+            return []
+        title_lower = title.lower()
+        title_lower = partition.aliases.get(title_lower, title_lower)
+        return sorted(partition.aliases_of(title_lower))
     
     def add_alias(self, alias, target_title, guild_id):
         """Add an alias for a wiki entry."""
-        alias_lower = alias.lower()
+        return self.add_aliases([alias], target_title, guild_id) == 1
+    
+    def add_aliases(self, aliases, target_title, guild_id):
+        """Add several aliases for a wiki entry; returns how many were added.
+        
+        Aliases spelled like an existing entry title are skipped.
+        """
         target_lower = target_title.lower()
         guild_id_str = str(guild_id)
+        partition = self._partition(guild_id_str)
         
         # Check if target exists
-        if guild_id_str not in self.wiki_data['entries']:
-            return False
+        if partition is None:
+            return 0
+        target_lower = partition.aliases.get(target_lower, target_lower)
+        if target_lower not in partition.entries:
+            return 0
         
-        if target_lower not in self.wiki_data['entries'][guild_id_str]:
-            return False
-        
-        # Initialize aliases for guild if needed
-        if 'aliases' not in self.wiki_data:
-            self.wiki_data['aliases'] = {}
+        added = 0
+        for alias in aliases:
+            alias_lower = alias.lower()
+            if alias_lower in partition.entries:
+                continue
+            partition.set_alias(alias_lower, target_lower)
+            self.storage.put_alias(guild_id_str, alias_lower, target_lower)
+            added += 1
         
-        if guild_id_str not in self.wiki_data['aliases']:
-            self.wiki_data['aliases'][guild_id_str] = {}
+        logger.info(f'Added {added} wiki aliases for "{target_title}" in guild {guild_id}')
+        return added
+    
+    def remove_aliases(self, aliases, guild_id):
+        """Remove several aliases; returns how many existed."""
+        guild_id_str = str(guild_id)
+        partition = self._partition(guild_id_str)
+        if partition is None:
+            return 0
         
-        self.wiki_data['aliases'][guild_id_str][alias_lower] = target_lower
-        self._save_wiki()
+        removed = 0
+        for alias in aliases:
+            alias_lower = alias.lower()
+            if partition.drop_alias(alias_lower) is not None:
+                self.storage.delete_alias(guild_id_str, alias_lower)
+                removed += 1
         
-        logger.info(f'Wiki alias "{alias}" -> "{target_title}" added in guild {guild_id}')
-        return True
\ No newline at end of file
+        logger.info(f'Removed {removed} wiki aliases in guild {guild_id}')
+        return removed
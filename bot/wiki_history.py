@@ -0,0 +1,325 @@
+import difflib
+import json
+import os
+import re
+import struct
+import threading
+import time
+import logging
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Store a full copy instead of a delta at least every this many revisions,
+# which bounds how many deltas rebuilding any revision has to apply
+SNAPSHOT_INTERVAL = 10
+
+TOKEN_RE = re.compile(r'\s+|\S+')
+
+# Each record is its compressed length followed by zlib-compressed JSON
+RECORD_HEADER = struct.Struct('<I')
+
+# A log at least this large is compacted once less than half of it is live
+HISTORY_COMPACT_BYTES = 1024 * 1024
+
+
+class Revision(NamedTuple):
+    rev: int
+    op: str
+    offset: int
+    length: int
+    timestamp: int
+    author_id: Optional[int]
+
+
+def make_delta(old: str, new: str) -> List:
+    """Encode new as a list of copied token ranges of old and inserted text."""
+    old_tokens = TOKEN_RE.findall(old)
+    new_tokens = TOKEN_RE.findall(new)
+    delta = []
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif j2 > j1:
+            text = ''.join(new_tokens[j1:j2])
+            if delta and isinstance(delta[-1], str):
+                delta[-1] += text
+            else:
+                delta.append(text)
+    return delta
+
+
+def apply_delta(old: str, delta: List) -> str:
+    """Rebuild the new text from the old one and a delta."""
+    old_tokens = TOKEN_RE.findall(old)
+    parts = []
+    for item in delta:
+        if isinstance(item, str):
+            parts.append(item)
+        else:
+            parts.extend(old_tokens[item[0]:item[1]])
+    return ''.join(parts)
+
+
+def _needs_compaction(index: Dict[str, List[Revision]], end: int) -> bool:
+    """Whether most of a log of this size is no longer indexed."""
+    if end < HISTORY_COMPACT_BYTES:
+        return False
+    live = sum(RECORD_HEADER.size + r.length for revisions in index.values() for r in revisions)
+    return live * 2 < end
+
+
+class RevisionHistory:
+    """Per-entry revision history, stored as deltas against periodic full copies.
+
+    Each guild has an append-only ``<guild id>.history`` log. The first edit
+    of an entry stores its previous content in full; later edits store a
+    token-level delta against the revision before, with a full copy every
+    SNAPSHOT_INTERVAL revisions.
+
+    Disk work runs on one writer thread: appends are written and fsynced
+    there in order, a guild's log is indexed there when its wiki partition
+    loads, and a log mostly made of purged chains is compacted there when
+    it is indexed or unloaded. The index is dropped with the partition.
+    """
+
+    def __init__(self, directory='wiki_history'):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._indexes: Dict[str, Dict[str, List[Revision]]] = {}
+        self._loading: Dict[str, Future] = {}
+        # Where each indexed guild's next record goes, counting queued writes
+        self._ends: Dict[str, int] = {}
+        # Records queued for the writer by guild and offset, so they can be
+        # read back before they reach the disk
+        self._unwritten: Dict[str, Dict[int, bytes]] = {}
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='wiki-history')
+
+    def _path(self, guild_id_str):
+        return os.path.join(self.directory, f'{guild_id_str}.history')
+
+    def preload(self, guild_id_str):
+        """Start indexing a guild's log on the writer thread."""
+        if guild_id_str not in self._indexes and guild_id_str not in self._loading:
+            self._loading[guild_id_str] = self._writer.submit(self._scan, guild_id_str)
+
+    def _index(self, guild_id_str) -> Dict[str, List[Revision]]:
+        """Get a guild's revision index, waiting for its scan if needed."""
+        index = self._indexes.get(guild_id_str)
+        if index is not None:
+            return index
+
+        self.preload(guild_id_str)
+        index, end = self._loading.pop(guild_id_str).result()
+        self._indexes[guild_id_str] = index
+        self._ends[guild_id_str] = end
+        return index
+
+    def _scan(self, guild_id_str):
+        """Index a guild's log, compacting it first if it is mostly dead.
+
+        Runs on the writer thread; returns the index and the log's size.
+        """
+        index, end = self._read_log(guild_id_str)
+        if _needs_compaction(index, end):
+            index, end = self._compact(guild_id_str, index, end)
+        return index, end
+
+    def _read_log(self, guild_id_str):
+        """Index a guild's log, cutting off a torn record at its end."""
+        index = {}
+        path = self._path(guild_id_str)
+        if not os.path.exists(path):
+            return index, 0
+
+        good_size = 0
+        with open(path, 'rb') as f:
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                length, = RECORD_HEADER.unpack(header)
+                offset = f.tell()
+                body = f.read(length)
+                try:
+                    record = json.loads(zlib.decompress(body))
+                except (zlib.error, ValueError):
+                    break
+                self._apply(index, record, offset, length)
+                good_size = offset + length
+
+        if good_size < os.path.getsize(path):
+            logger.warning(f'Discarding torn record at the end of {path}')
+            with open(path, 'r+b') as f:
+                f.truncate(good_size)
+        return index, good_size
+
+    def _compact(self, guild_id_str, index, end):
+        """Rewrite a guild's log with only its live revisions.
+
+        Purged chains and rename records are dropped, and every record is
+        stored under its entry's current key. Returns the new index and
+        size, or the old ones if the rewrite failed.
+        """
+        path = self._path(guild_id_str)
+        temp_path = f'{path}.tmp'
+        compacted = {}
+        try:
+            with open(path, 'rb') as old, open(temp_path, 'wb') as new:
+                for key, revisions in index.items():
+                    for revision in revisions:
+                        old.seek(revision.offset)
+                        record = json.loads(zlib.decompress(old.read(revision.length)))
+                        record['key'] = key
+                        body = zlib.compress(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                        new.write(RECORD_HEADER.pack(len(body)))
+                        compacted.setdefault(key, []).append(revision._replace(offset=new.tell(), length=len(body)))
+                        new.write(body)
+                new.flush()
+                os.fsync(new.fileno())
+                new_end = new.tell()
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.error(f'Error compacting wiki history for guild {guild_id_str}: {str(e)}')
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return index, end
+        logger.info(f'Compacted wiki history for guild {guild_id_str} from {end} to {new_end} bytes')
+        return compacted, new_end
+
+    def _apply(self, index, record, offset, length):
+        """Update an index with one log record."""
+        key = record['key']
+        if record['op'] == 'purge':
+            index.pop(key, None)
+        elif record['op'] == 'rename':
+            revisions = index.pop(key, None)
+            if revisions:
+                index[record['to']] = revisions
+        else:
+            index.setdefault(key, []).append(Revision(
+                record['rev'], record['op'], offset, length, record['ts'], record.get('author')
+            ))
+
+    def _append(self, guild_id_str, record):
+        """Index a record at once and queue it for the writer thread."""
+        index = self._index(guild_id_str)
+        body = zlib.compress(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        offset = self._ends[guild_id_str] + RECORD_HEADER.size
+        self._ends[guild_id_str] = offset + len(body)
+        with self._lock:
+            self._unwritten.setdefault(guild_id_str, {})[offset] = body
+        self._writer.submit(self._write, guild_id_str, offset, body)
+        self._apply(index, record, offset, len(body))
+
+    def _write(self, guild_id_str, offset, body):
+        """Append one record to a guild's log and fsync it; runs on the writer thread."""
+        path = self._path(guild_id_str)
+        start = offset - RECORD_HEADER.size
+        try:
+            with open(path, 'ab') as f:
+                if f.tell() != start:
+                    raise ValueError(f'log is {f.tell()} bytes, expected {start}')
+                try:
+                    f.write(RECORD_HEADER.pack(len(body)) + body)
+                    f.flush()
+                    os.fsync(f.fileno())
+                except Exception:
+                    f.truncate(start)
+                    raise
+        except Exception as e:
+            logger.error(f'Error writing wiki history for guild {guild_id_str}: {str(e)}')
+        finally:
+            with self._lock:
+                unwritten = self._unwritten[guild_id_str]
+                del unwritten[offset]
+                if not unwritten:
+                    del self._unwritten[guild_id_str]
+
+    def _read(self, guild_id_str, revision: Revision):
+        with self._lock:
+            body = self._unwritten.get(guild_id_str, {}).get(revision.offset)
+        if body is None:
+            with open(self._path(guild_id_str), 'rb') as f:
+                f.seek(revision.offset)
+                body = f.read(revision.length)
+        return json.loads(zlib.decompress(body))['data']
+
+    def record_edit(self, guild_id_str: str, key: str, old_rev: int, old_content: str,
+                    new_content: str, author_id: Optional[int], old_timestamp: int = 0,
+                    old_author_id: Optional[int] = None):
+        """Record that an entry went from old_rev to old_rev + 1."""
+        revisions = self._index(guild_id_str).get(key)
+        now = int(time.time())
+
+        # Start (or restart, if an edit went unrecorded) from a full copy
+        if not revisions or revisions[-1].rev != old_rev:
+            self._append(guild_id_str, {
+                'op': 'full', 'key': key, 'rev': old_rev, 'ts': old_timestamp, 'author': old_author_id,
+                'data': old_content
+            })
+            revisions = self._index(guild_id_str)[key]
+
+        last_full = next(r.rev for r in reversed(revisions) if r.op == 'full')
+        record = {'op': 'full', 'key': key, 'rev': old_rev + 1, 'ts': now, 'author': author_id, 'data': new_content}
+        if old_rev + 1 - last_full < SNAPSHOT_INTERVAL:
+            delta = make_delta(old_content, new_content)
+            if len(json.dumps(delta)) < len(new_content):
+                record.update(op='delta', data=delta)
+        self._append(guild_id_str, record)
+
+    def revisions(self, guild_id_str: str, key: str) -> List[Revision]:
+        """List an entry's recorded revisions, oldest first."""
+        return list(self._index(guild_id_str).get(key, ()))
+
+    def get(self, guild_id_str: str, key: str, rev: int) -> Optional[str]:
+        """Rebuild an entry's content at a revision, or None if not recorded."""
+        revisions = self._index(guild_id_str).get(key, [])
+        position = next((i for i, r in enumerate(revisions) if r.rev == rev), None)
+        if position is None:
+            return None
+
+        start = position
+        while revisions[start].op != 'full':
+            start -= 1
+        content = self._read(guild_id_str, revisions[start])
+        for revision in revisions[start + 1:position + 1]:
+            content = apply_delta(content, self._read(guild_id_str, revision))
+        return content
+
+    def purge(self, guild_id_str: str, key: str):
+        """Forget an entry's history, e.g. when it is deleted."""
+        if key in self._index(guild_id_str):
+            self._append(guild_id_str, {'op': 'purge', 'key': key})
+
+    def rename(self, guild_id_str: str, key: str, new_key: str):
+        """Move an entry's history to a new key."""
+        if key != new_key and key in self._index(guild_id_str):
+            self._append(guild_id_str, {'op': 'rename', 'key': key, 'to': new_key})
+
+    def size(self, guild_id_str: str) -> int:
+        """Bytes used by a guild's history log."""
+        path = self._path(guild_id_str)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def drop_guild(self, guild_id_str: str):
+        """Forget a guild's in-memory index, compacting its log if it is mostly dead."""
+        index = self._indexes.pop(guild_id_str, None)
+        end = self._ends.pop(guild_id_str, 0)
+        self._loading.pop(guild_id_str, None)
+        if index is not None and _needs_compaction(index, end):
+            self._writer.submit(self._scan, guild_id_str)
+
+    def flush(self):
+        """Wait for every queued write to reach the disk."""
+        self._writer.submit(lambda: None).result()
+
+    def close(self):
+        """Finish the queued writes and stop the writer thread."""
+        self._writer.shutdown(wait=True)
@@ -0,0 +1,356 @@
+import bisect
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r'\w+')
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# A title occurrence counts as this many content occurrences
+TITLE_BOOST = 3.0
+
+# Prefix matches score lower than whole-word matches
+PREFIX_WEIGHT = 0.5
+
+# Cap on how many indexed terms one query prefix may expand to
+MAX_PREFIX_TERMS = 16
+
+# When a query's rarest word still matches more entries than this, its terms
+# are searched through their champion lists (the entries where each term
+# weighs the most) instead of every posting
+CHAMPION_THRESHOLD = 2048
+CHAMPION_SIZE = 256
+
+SNIPPET_LENGTH = 100
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return TOKEN_RE.findall(text.casefold())
+
+
+class SearchIndex:
+    """Inverted index over one guild's wiki entries.
+
+    Postings map each term to the entries containing it and the weighted term
+    frequency, so a query only touches the entries that share its terms.
+    Results are ranked with BM25, and the last query word also matches as a
+    prefix so partially typed words still find entries. Very common terms
+    keep a champion list so queries on them stay cheap at any wiki size.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.title_terms: Dict[str, Set[str]] = {}
+        self.doc_terms: Dict[str, Dict[str, float]] = {}
+        self.doc_lengths: Dict[str, float] = {}
+        self.total_length = 0.0
+        self.sorted_terms: List[str] = []
+        # (term, entry) pairs indexed, for estimating the index's memory use
+        self.posting_count = 0
+        self.champions: Dict[str, Tuple[List[Tuple[float, str]], Dict[str, float]]] = {}
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, key: str, title: str, content: str):
+        """Index an entry, replacing any previous version of it."""
+        if key in self.doc_terms:
+            self.remove(key)
+
+        title_counts = Counter(tokenize(title))
+        counts = Counter(tokenize(content))
+        weights = {term: float(count) for term, count in counts.items()}
+        for term, count in title_counts.items():
+            weights[term] = weights.get(term, 0.0) + TITLE_BOOST * count
+
+        length = sum(weights.values())
+        self.doc_lengths[key] = length
+        self.total_length += length
+        self.title_terms[key] = set(title_counts)
+        self.doc_terms[key] = weights
+        self.posting_count += len(weights)
+
+        for term, weight in weights.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                bisect.insort(self.sorted_terms, term)
+            postings[key] = weight
+            if term in self.champions:
+                self._offer_champion(term, key, self._impact(key, weight))
+
+    def remove(self, key: str):
+        """Drop an entry from the index."""
+        weights = self.doc_terms.pop(key, None)
+        if weights is None:
+            return
+        self.posting_count -= len(weights)
+
+        for term in weights:
+            postings = self.postings[term]
+            del postings[key]
+            if not postings:
+                del self.postings[term]
+                index = bisect.bisect_left(self.sorted_terms, term)
+                del self.sorted_terms[index]
+
+            champion = self.champions.get(term)
+            if champion and champion[1].pop(key, None) is not None:
+                # Rebuild from the postings once too many champions are gone
+                if len(champion[1]) < CHAMPION_SIZE // 2:
+                    del self.champions[term]
+
+        self.title_terms.pop(key, None)
+        self.total_length -= self.doc_lengths.pop(key)
+
+    def _impact(self, key: str, tf: float) -> float:
+        """Length-normalized weight of a term in an entry, for champion lists."""
+        average_length = self.total_length / len(self.doc_lengths) if self.doc_lengths else 1.0
+        return tf / (tf + K1 * (1 - B + B * self.doc_lengths[key] / average_length))
+
+    def _offer_champion(self, term: str, key: str, impact: float):
+        """Add an entry to a term's champion list if it weighs enough."""
+        heap, members = self.champions[term]
+        if len(members) < CHAMPION_SIZE:
+            heapq.heappush(heap, (impact, key))
+            members[key] = impact
+            return
+
+        # Drop heap items for entries that were removed or re-added since
+        while heap and members.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        if heap and impact > heap[0][0]:
+            _, evicted = heapq.heapreplace(heap, (impact, key))
+            del members[evicted]
+            members[key] = impact
+
+    def _candidates(self, term: str, use_champions: bool):
+        """Entries to consider for a term, limited to its champions if asked."""
+        postings = self.postings[term]
+        if not use_champions or len(postings) <= CHAMPION_SIZE:
+            return postings.keys()
+
+        champion = self.champions.get(term)
+        if champion is None:
+            best = heapq.nlargest(
+                CHAMPION_SIZE,
+                ((self._impact(key, tf), key) for key, tf in postings.items())
+            )
+            heap = best[::-1]
+            heapq.heapify(heap)
+            champion = self.champions[term] = (heap, {key: impact for impact, key in best})
+        return champion[1].keys()
+
+    def _expand(self, token: str, prefix: bool) -> List[Tuple[str, float]]:
+        """Get the indexed terms a query token matches, with their weights."""
+        terms = []
+        if token in self.postings:
+            terms.append((token, 1.0))
+        if prefix:
+            index = bisect.bisect_right(self.sorted_terms, token)
+            while index < len(self.sorted_terms) and len(terms) < MAX_PREFIX_TERMS:
+                term = self.sorted_terms[index]
+                if not term.startswith(token):
+                    break
+                terms.append((term, PREFIX_WEIGHT))
+                index += 1
+        return terms
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float, bool]]:
+        """Rank entries for a query.
+
+        Every query word must match (the last one as a prefix); the rarest
+        word picks the candidates, so common words never scan their whole
+        posting list. Returns (key, score, title_match) tuples, best first.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self.doc_lengths:
+            return []
+
+        groups = []
+        for i, token in enumerate(tokens):
+            terms = self._expand(token, prefix=i == len(tokens) - 1)
+            if not terms:
+                return []
+            groups.append(terms)
+
+        # Start from the word with the fewest matching entries
+        groups.sort(key=lambda terms: sum(len(self.postings[term]) for term, _ in terms))
+        use_champions = sum(len(self.postings[term]) for term, _ in groups[0]) > CHAMPION_THRESHOLD
+        candidates = set()
+        for term, _ in groups[0]:
+            candidates.update(self._candidates(term, use_champions))
+        for terms in groups[1:]:
+            candidates = {
+                key for key in candidates
+                if any(key in self.postings[term] for term, _ in terms)
+            }
+            if not candidates:
+                return []
+
+        doc_count = len(self.doc_lengths)
+        average_length = self.total_length / doc_count
+        scores = dict.fromkeys(candidates, 0.0)
+        for terms in groups:
+            for term, weight in terms:
+                postings = self.postings[term]
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                if len(postings) < len(scores):
+                    matches = [(key, tf) for key, tf in postings.items() if key in scores]
+                else:
+                    matches = [(key, postings[key]) for key in scores if key in postings]
+                for key, tf in matches:
+                    norm = K1 * (1 - B + B * self.doc_lengths[key] / average_length)
+                    scores[key] += weight * idf * tf * (K1 + 1) / (tf + norm)
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [
+            (key, score, any(term in self.title_terms[key] for terms in groups for term, _ in terms))
+            for key, score in best
+        ]
+
+
+def trigrams(text: str) -> Set[str]:
+    """Get the padded character trigrams of a normalized title."""
+    text = f"  {' '.join(tokenize(text))} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TitleIndex:
+    """Trigram index over one guild's entry titles and aliases.
+
+    Used to find the titles closest to a misspelled name; each name maps to
+    the key of the entry it belongs to.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = {}
+        self.grams: Dict[str, Set[str]] = {}
+        self.targets: Dict[str, str] = {}
+        # (trigram, name) pairs indexed, for estimating the index's memory use
+        self.gram_count = 0
+
+    def __len__(self):
+        return len(self.targets)
+
+    def add(self, name: str, target: str):
+        """Index a title or alias pointing at an entry key."""
+        name = name.lower()
+        if name in self.targets:
+            self.remove(name)
+
+        grams = trigrams(name)
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(name)
+        self.grams[name] = grams
+        self.targets[name] = target
+        self.gram_count += len(grams)
+
+    def remove(self, name: str):
+        """Drop a title or alias from the index."""
+        name = name.lower()
+        grams = self.grams.pop(name, None)
+        if grams is None:
+            return
+        self.gram_count -= len(grams)
+
+        for gram in grams:
+            names = self.postings[gram]
+            names.discard(name)
+            if not names:
+                del self.postings[gram]
+        del self.targets[name]
+
+    def suggest(self, query: str, limit: int = 5) -> List[Tuple[str, str, float]]:
+        """Find the closest names to a query.
+
+        Returns (name, target key, similarity) tuples, best first, where
+        similarity is the Dice coefficient of the trigram sets.
+        """
+        grams = trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        scored = [
+            (name, 2 * count / (len(grams) + len(self.grams[name])))
+            for name, count in shared.items()
+        ]
+        best = heapq.nlargest(limit * 2, scored, key=lambda item: item[1])
+
+        # Several aliases of one entry should only produce one suggestion
+        results = []
+        seen = set()
+        for name, score in best:
+            target = self.targets[name]
+            if target not in seen:
+                seen.add(target)
+                results.append((name, target, score))
+        return results[:limit]
+
+
+class SortedIndex:
+    """Entries kept in one sort order, for cursor-paginated listings.
+
+    Items are (sort value..., key) tuples in a sorted list. A page is one
+    bisect past the cursor (the last item of the previous page) plus a
+    slice, so its cost does not depend on how deep into the listing it is.
+    """
+
+    def __init__(self):
+        self.items: List[Tuple] = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item: Tuple):
+        bisect.insort(self.items, item)
+
+    def remove(self, item: Tuple):
+        index = bisect.bisect_left(self.items, item)
+        if index < len(self.items) and self.items[index] == item:
+            del self.items[index]
+
+    def page(self, after: Optional[Tuple] = None, limit: int = 10) -> List[Tuple]:
+        """Get up to limit items following the cursor (from the start if None)."""
+        start = 0 if after is None else bisect.bisect_right(self.items, after)
+        return self.items[start:start + limit]
+
+    def prefixed(self, prefix: str, limit: int = 10) -> List[Tuple]:
+        """Get up to limit items whose first sort value starts with prefix."""
+        start = bisect.bisect_left(self.items, (prefix,))
+        matches = []
+        for item in self.items[start:start + limit]:
+            if not item[0].startswith(prefix):
+                break
+            matches.append(item)
+        return matches
+
+
+def highlight_snippet(text: str, query: str, length: int = SNIPPET_LENGTH) -> str:
+    """Cut a snippet around the first query match and bold the matches."""
+    tokens = [re.escape(token) for token in dict.fromkeys(tokenize(query))]
+    if not tokens:
+        return text[:length] + '...' if len(text) > length else text
+
+    pattern = re.compile(r'\b(' + '|'.join(tokens) + r')\w*', re.I)
+    match = pattern.search(text)
+    start = 0
+    if match and match.start() > length // 3:
+        start = match.start() - length // 3
+        space = text.rfind(' ', 0, start)
+        start = space + 1 if space > start - 15 else start
+
+    snippet = text[start:start + length]
+    snippet = pattern.sub(lambda m: f'**{m.group(0)}**', snippet.replace('*', '\\*'))
+    if start > 0:
+        snippet = '...' + snippet
+    if start + length < len(text):
+        snippet += '...'
+    return snippet
@@ -0,0 +1,195 @@
+import asyncio
+import csv
+import gzip
+import json
+import logging
+import sys
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Entries read, indexed and persisted together during an import
+IMPORT_BATCH_SIZE = 1000
+
+# Entries read from the wiki and written together during an export
+EXPORT_BATCH_SIZE = 500
+
+# csv.field_size_limit takes a C long, which is 32 bits on some platforms
+CSV_FIELD_SIZE_LIMIT = 2 ** 31 - 1
+
+CSV_FIELDS = ('title', 'content', 'author_id', 'created_at', 'updated_at', 'edit_count', 'aliases')
+
+# Separates aliases inside the CSV aliases column
+ALIAS_SEPARATOR = '|'
+
+
+def detect_format(path: str) -> str:
+    """Guess jsonl or csv from a file name, ignoring a .gz suffix."""
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    raise ValueError(f'Unknown wiki file format: {path}')
+
+
+def open_text(path: str, mode: str):
+    """Open a text file for reading or writing, gzip-compressed if it ends in .gz."""
+    if path.lower().endswith('.gz'):
+        return gzip.open(path, f'{mode}t', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def read_entries(f, fmt: str) -> Iterator[Dict]:
+    """Stream entry dicts from an open file.
+
+    Lines or rows that cannot be parsed come out as empty dicts, so the
+    importer counts them as skipped instead of stopping.
+    """
+    if fmt == 'csv':
+        # Wiki content can be far longer than the csv module's default limit
+        csv.field_size_limit(CSV_FIELD_SIZE_LIMIT)
+        for row in csv.DictReader(f):
+            aliases = row.get('aliases') or ''
+            row['aliases'] = [alias for alias in aliases.split(ALIAS_SEPARATOR) if alias.strip()]
+            yield row
+        return
+
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            item = None
+        yield item if isinstance(item, dict) else {}
+
+
+def write_entries(f, entries: Iterable[Dict], fmt: str, header: bool = False) -> int:
+    """Write entry dicts to an open file; returns how many were written."""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        if header:
+            writer.writeheader()
+        for entry in entries:
+            writer.writerow({**entry, 'aliases': ALIAS_SEPARATOR.join(entry.get('aliases', ()))})
+            count += 1
+        return count
+
+    for entry in entries:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def import_file(wiki, path: str, guild_id, fmt: Optional[str] = None, overwrite: bool = False,
+                batch_size: int = IMPORT_BATCH_SIZE) -> Tuple[int, int]:
+    """Import a JSONL or CSV file (optionally .gz) into a guild's wiki.
+
+    Reads and applies one batch at a time, so memory stays bounded by the
+    batch size however large the file is. Returns (imported, skipped).
+    """
+    fmt = fmt or detect_format(path)
+    imported = skipped = 0
+    with open_text(path, 'r') as f:
+        for batch in batched(read_entries(f, fmt), batch_size):
+            added, rejected = wiki.import_entries(batch, guild_id, overwrite)
+            imported += added
+            skipped += rejected
+    return imported, skipped
+
+
+async def import_file_async(wiki, path: str, guild_id, fmt: Optional[str] = None, overwrite: bool = False,
+                            batch_size: int = IMPORT_BATCH_SIZE) -> Tuple[int, int]:
+    """Like import_file, but reads each batch in a worker thread.
+
+    Batches are applied on the event loop, which gets a turn between them;
+    storage writes them behind. The indexes are rebuilt once at the end,
+    off the loop.
+    """
+    fmt = fmt or detect_format(path)
+    imported = skipped = 0
+    f = await asyncio.to_thread(open_text, path, 'r')
+    try:
+        batches = batched(read_entries(f, fmt), batch_size)
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            added, rejected = wiki.import_entries(batch, guild_id, overwrite)
+            imported += added
+            skipped += rejected
+    finally:
+        await asyncio.to_thread(f.close)
+    if imported:
+        await wiki.rebuild_indexes(guild_id)
+    return imported, skipped
+
+
+def export_guild(wiki, guild_id, path: str, fmt: Optional[str] = None,
+                 batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """Export a guild's wiki to a JSONL or CSV file (gzip if it ends in .gz).
+
+    Entries are read and written one batch at a time. Returns the count.
+    """
+    fmt = fmt or detect_format(path)
+    count = 0
+    with open_text(path, 'w') as f:
+        for keys in batched(wiki.export_keys(guild_id), batch_size):
+            count += write_entries(f, wiki.export_entries(keys, guild_id), fmt, header=count == 0)
+        if count == 0 and fmt == 'csv':
+            write_entries(f, (), fmt, header=True)
+    return count
+
+
+async def export_guild_async(wiki, guild_id, path: str, fmt: Optional[str] = None,
+                             batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """Like export_guild, but writes each batch in a worker thread."""
+    fmt = fmt or detect_format(path)
+    count = 0
+    f = await asyncio.to_thread(open_text, path, 'w')
+    try:
+        for keys in batched(wiki.export_keys(guild_id), batch_size):
+            entries = wiki.export_entries(keys, guild_id)
+            count += await asyncio.to_thread(write_entries, f, entries, fmt, count == 0)
+        if count == 0 and fmt == 'csv':
+            await asyncio.to_thread(write_entries, f, (), fmt, True)
+    finally:
+        await asyncio.to_thread(f.close)
+    return count
+
+
+if __name__ == '__main__':
+    from bot.wiki import WikiSystem
+    from bot.wiki_storage import open_wiki_storage
+
+    if len(sys.argv) < 4 or sys.argv[1] not in ('import', 'export'):
+        print('Usage: python -m bot.wiki_io import|export <guild_id> <file.jsonl|file.csv[.gz]> [--overwrite]')
+        print('Stop the bot first; it must not write the same wiki storage at the same time.')
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO)
+
+    command, guild, file_path = sys.argv[1:4]
+    wiki_system = WikiSystem(storage=open_wiki_storage())
+    try:
+        if command == 'import':
+            imported, skipped = import_file(wiki_system, file_path, guild, overwrite='--overwrite' in sys.argv[4:])
+            print(f'Imported {imported} entries, skipped {skipped}')
+        else:
+            print(f'Exported {export_guild(wiki_system, guild, file_path)} entries')
+    finally:
+        wiki_system.close()
@@ -0,0 +1,253 @@
+import itertools
+import mmap
+import os
+import shutil
+import tempfile
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+# Characters of content kept in memory for listings
+PREVIEW_LENGTH = 50
+
+# Decompressed entry bodies kept in memory across all guilds
+CONTENT_CACHE_SIZE = 256
+
+# Every record gets a version unique within the process; records are never
+# changed in place, so a new version means a new state of the entry
+_record_versions = itertools.count(1)
+
+
+def to_timestamp(value) -> int:
+    """Convert an ISO timestamp string to integer epoch seconds."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except (TypeError, ValueError):
+        return 0
+
+
+def to_isoformat(timestamp: int) -> str:
+    """Convert integer epoch seconds back to an ISO timestamp string."""
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+def make_preview(content: str) -> str:
+    return content[:PREVIEW_LENGTH] + '...' if len(content) > PREVIEW_LENGTH else content
+
+
+class EntryRecord:
+    """Compact in-memory metadata for one wiki entry.
+
+    The body lives in a ContentStore; the record only keeps where to find it
+    and a short preview, so listing entries never touches content. Records
+    are replaced rather than changed, and each has its own version.
+    """
+
+    __slots__ = (
+        'title', 'author_id', 'created_at', 'updated_at', 'edit_count', 'offset', 'length', 'preview', 'version'
+    )
+
+    def __init__(self, title: str, author_id: Optional[int], created_at: int, updated_at: int,
+                 edit_count: int, offset: int, length: int, preview: str):
+        self.title = title
+        self.author_id = author_id
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.edit_count = edit_count
+        self.offset = offset
+        self.length = length
+        self.preview = preview
+        self.version = next(_record_versions)
+
+    def to_dict(self, content: str) -> Dict:
+        """Build the entry dict used by storage and callers."""
+        return {
+            'title': self.title,
+            'content': content,
+            'author_id': self.author_id,
+            'created_at': to_isoformat(self.created_at),
+            'updated_at': to_isoformat(self.updated_at),
+            'edit_count': self.edit_count
+        }
+
+
+def _remap(f, current, end):
+    """Get a memory map of f covering at least end bytes, replacing current if it is short."""
+    if current is not None and len(current) >= end:
+        return current
+    f.flush()
+    if current is not None:
+        current.close()
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class GuildContent:
+    """One guild's compressed bodies.
+
+    An optional read-only base mapped straight from a snapshot's content
+    section comes first, then the guild's own blob file with the bodies
+    stored since. Offsets run through both: below the base's length they
+    point into the base, above it into the blob file.
+
+    detach() hands one of these to its caller, who may read and close it on
+    another thread.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._file = None
+        self._mapped = None
+        self._base = None
+        self._base_offset = 0
+        self._base_length = 0
+
+    def adopt(self, path: str, offset: int, length: int):
+        """Use length bytes of path at offset as the base, without copying them."""
+        with open(path, 'rb') as f:
+            base = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if offset + length > len(base):
+            base.close()
+            raise ValueError('truncated content')
+        self._base, self._base_offset, self._base_length = base, offset, length
+
+    def append(self, data: bytes) -> int:
+        """Store compressed bytes; returns their offset."""
+        if self._file is None:
+            self._file = open(self.path, 'w+b')
+        offset = self._file.seek(0, os.SEEK_END)
+        self._file.write(data)
+        return self._base_length + offset
+
+    def read(self, offset: int, length: int) -> bytes:
+        if offset < self._base_length:
+            start = self._base_offset + offset
+            return self._base[start:start + length]
+        offset -= self._base_length
+        self._mapped = _remap(self._file, self._mapped, offset + length)
+        return self._mapped[offset:offset + length]
+
+    def raw(self, record: EntryRecord) -> bytes:
+        """Read an entry body still compressed."""
+        return self.read(record.offset, record.length)
+
+    def close(self):
+        """Unmap the base and close and remove the blob file."""
+        for mapped in (self._mapped, self._base):
+            if mapped is not None:
+                mapped.close()
+        self._mapped = self._base = None
+        if self._file is not None:
+            self._file.close()
+            try:
+                os.remove(self._file.name)
+            except OSError:
+                pass
+            self._file = None
+
+
+class ContentStore:
+    """Entry bodies kept out of memory in compressed per-guild blob files.
+
+    Bodies are zlib-compressed and appended to ``<guild id>.blob``; reads go
+    through a memory map of the file, with the most recently used bodies kept
+    decompressed in a small LRU. The files are a cache rebuilt from wiki
+    storage whenever a guild is loaded, so by default they live in a
+    temporary directory removed on close. A guild restored from a snapshot
+    reads its bodies from the snapshot file itself; zlib's checksum catches
+    a damaged body when it is decompressed.
+    """
+
+    def __init__(self, directory: Optional[str] = None, cache_size: int = CONTENT_CACHE_SIZE):
+        self._owns_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix='wiki-content-')
+        os.makedirs(self.directory, exist_ok=True)
+        self.cache_size = cache_size
+        self._guilds: Dict[str, GuildContent] = {}
+        self._cache: 'OrderedDict[Tuple[str, str], str]' = OrderedDict()
+
+    def _guild(self, guild_id_str) -> GuildContent:
+        guild = self._guilds.get(guild_id_str)
+        if guild is None:
+            guild = self._guilds[guild_id_str] = GuildContent(os.path.join(self.directory, f'{guild_id_str}.blob'))
+        return guild
+
+    def _remember(self, guild_id_str, key, content):
+        self._cache[(guild_id_str, key)] = content
+        self._cache.move_to_end((guild_id_str, key))
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def put(self, guild_id_str: str, key: str, content: str, cache: bool = True) -> Tuple[int, int]:
+        """Store an entry body; returns its (offset, length)."""
+        data = zlib.compress(content.encode('utf-8'))
+        offset = self._guild(guild_id_str).append(data)
+        if cache:
+            self._remember(guild_id_str, key, content)
+        else:
+            self._cache.pop((guild_id_str, key), None)
+        return offset, len(data)
+
+    def get(self, guild_id_str: str, key: str, record: EntryRecord, cache: bool = True) -> str:
+        """Read an entry body, from the LRU if it is hot.
+
+        Pass cache=False for one-off scans so they do not flush the LRU.
+        """
+        content = self._cache.get((guild_id_str, key))
+        if content is not None:
+            self._cache.move_to_end((guild_id_str, key))
+            return content
+
+        content = zlib.decompress(self._guilds[guild_id_str].raw(record)).decode('utf-8')
+        if cache:
+            self._remember(guild_id_str, key, content)
+        return content
+
+    def raw(self, guild_id_str: str, record: EntryRecord) -> bytes:
+        """Read an entry body still compressed, e.g. to copy it elsewhere."""
+        return self._guilds[guild_id_str].raw(record)
+
+    def adopt(self, guild_id_str: str, path: str, offset: int, length: int):
+        """Serve a guild's bodies from length bytes of path at offset.
+
+        Used to restore bodies from a snapshot, whose records already point
+        into that byte range. The range is mapped, not copied, so this costs
+        the same however large the wiki is.
+        """
+        self.drop_guild(guild_id_str)
+        try:
+            self._guild(guild_id_str).adopt(path, offset, length)
+        except Exception:
+            self.drop_guild(guild_id_str)
+            raise
+
+    def cached_count(self) -> int:
+        """Number of bodies currently held decompressed in memory."""
+        return len(self._cache)
+
+    def discard(self, guild_id_str: str, key: str):
+        """Forget a deleted entry's cached body."""
+        self._cache.pop((guild_id_str, key), None)
+
+    def detach(self, guild_id_str: str) -> GuildContent:
+        """Take a guild's bodies out of the store without any file I/O.
+
+        The store forgets the guild at once, as drop_guild does; the caller
+        reads what it still needs from the returned GuildContent and closes it.
+        """
+        for cache_key in [k for k in self._cache if k[0] == guild_id_str]:
+            del self._cache[cache_key]
+        return self._guilds.pop(guild_id_str, None) or GuildContent(None)
+
+    def drop_guild(self, guild_id_str: str):
+        """Remove a guild's blob file and cached bodies."""
+        self.detach(guild_id_str).close()
+
+    def close(self):
+        """Drop every guild and remove the directory if it was temporary."""
+        for guild_id_str in list(self._guilds):
+            self.drop_guild(guild_id_str)
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
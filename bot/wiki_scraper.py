@@ -1,44 +1,204 @@
 import asyncio
-import aiohttp
 import logging
-from typing import Optional, Dict, List
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, List, Callable
 import re
+from urllib.parse import quote
+from bot.lom_titles import LoMTitleIndex
+from bot.http_scheduler import RequestScheduler, PRIORITY_INTERACTIVE
+from bot.lom_parser import (
+    CHARACTER_SECTIONS, PATHWAY_SECTIONS, select_sections, paragraphs,
+    build_character_page, build_pathway_page,
+    parse_character_text, parse_pathway_text, parse_general_text
+)
 
 try:
-    from trafilatura import fetch_url, extract
+    from trafilatura import extract
     TRAFILATURA_AVAILABLE = True
 except ImportError:
     TRAFILATURA_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# How long parsed pages are served from memory before refetching
+PAGE_CACHE_TTL = 60 * 60
+
+# Parsed pages kept in memory; the least recently used are dropped first
+PAGE_CACHE_SIZE = 256
+
+# The field holding each page kind's lead; pages without one are not cached
+LEAD_FIELDS = {'character': 'description', 'pathway': 'general_information', 'general': 'description'}
+
 class LordOfMysteriesWikiScraper:
     """Scrapes Lord of Mysteries Wiki for information."""
     
-    def __init__(self):
+    def __init__(self, scheduler: Optional[RequestScheduler] = None):
         self.base_url = "https://lordofthemysteries.fandom.com"
         self.wiki_url = f"{self.base_url}/wiki/"
+        self.api_url = f"{self.base_url}/api.php"
+        self.scheduler = scheduler or RequestScheduler()
+        self.title_index = LoMTitleIndex(self.api_url, self.scheduler)
+        self._page_cache = OrderedDict()
+    
+    async def close(self):
+        """Close the request scheduler."""
+        await self.scheduler.close()
+    
+    def _page_url(self, title: str) -> str:
+        """Build the wiki URL for a canonical page title."""
+        return f"{self.wiki_url}{quote(title.replace(' ', '_'))}"
+    
+    def _get_cached(self, kind: str, title: str) -> Optional[Dict]:
+        """Get a parsed page from the cache if it is still fresh."""
+        cached = self._page_cache.get((kind, title))
+        if cached and time.time() - cached[0] < PAGE_CACHE_TTL:
+            self._page_cache.move_to_end((kind, title))
+            return cached[1]
+        return None
+    
+    def _set_cached(self, kind: str, title: str, info: Dict):
+        """Store a parsed page in the cache, unless its lead came back empty.
+        
+        An empty lead usually means a fetch went wrong, so the page is
+        fetched again next time instead of being served empty for an hour.
+        """
+        info['fetched_at'] = time.time()
+        if not info.get(LEAD_FIELDS[kind], '').strip():
+            logger.warning(f'Not caching {kind} page {title}: its lead is empty')
+            return
+        self._page_cache[(kind, title)] = (info['fetched_at'], info)
+        self._page_cache.move_to_end((kind, title))
+        while len(self._page_cache) > PAGE_CACHE_SIZE:
+            self._page_cache.popitem(last=False)
+    
+    def _peek(self, kind: str, names: List[str]) -> Optional[Dict]:
+        """Get a cached page for the first name the title index knows exactly.
+        
+        Never touches the network, so callers can answer hot lookups at once.
+        """
+        for name in names:
+            title = self.title_index.lookup(name, fuzzy=False)
+            if title:
+                return self._get_cached(kind, title)
+        return None
+    
+    def cached_general(self, search_term: str) -> Optional[Dict]:
+        """Get a general search result only if it is already cached."""
+        return self._peek('general', [search_term])
+    
+    def complete_titles(self, prefix: str, limit: int = 25) -> List[str]:
+        """Get page titles starting with a typed prefix, from the title index."""
+        return self.title_index.complete(prefix, limit)
+    
+    def cached_character(self, character_name: str) -> Optional[Dict]:
+        """Get a character page only if it is already cached."""
+        return self._peek('character', [character_name])
+    
+    def cached_pathway(self, pathway_name: str) -> Optional[Dict]:
+        """Get a pathway page only if it is already cached."""
+        return self._peek('pathway', [f"{pathway_name} Pathway", pathway_name])
+    
+    async def _api_get(self, params: Dict, priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict]:
+        """Call the MediaWiki API and return the decoded response."""
+        params = {'format': 'json', 'formatversion': '2', **params}
+        data = await self.scheduler.fetch_json(self.api_url, params, priority)
+        if not isinstance(data, dict):
+            return None
+        
+        if 'error' in data:
+            logger.warning(f"Wiki API error for {params.get('page')}: {data['error'].get('info')}")
+            return None
+        return data
+    
+    async def _fetch_section(self, title: str, index: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[str]:
+        """Fetch the wikitext of a single page section, or None if the request failed."""
+        data = await self._api_get({
+            'action': 'parse',
+            'page': title,
+            'prop': 'wikitext',
+            'section': index,
+            'redirects': '1'
+        }, priority)
+        return data['parse'].get('wikitext', '') if data else None
+    
+    async def _fetch_sections(self, title: str, wanted: Dict, priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict]:
+        """Fetch the lead plus only the sections we render.
+        
+        Asks the parse API for the section list first, then downloads the
+        wikitext of the lead and each wanted section concurrently. Returns
+        None if any request fails or the lead is empty, so callers fall back
+        to the full page instead of rendering a partial one.
+        """
+        data = await self._api_get({
+            'action': 'parse',
+            'page': title,
+            'prop': 'sections|revid',
+            'redirects': '1'
+        }, priority)
+        if not data:
+            return None
         
-    async def search_character(self, character_name: str) -> Optional[Dict]:
+        parse = data['parse']
+        selected = select_sections(parse.get('sections', []), wanted)
+        names = ['lead', *selected]
+        texts = await asyncio.gather(*(
+            self._fetch_section(title, index, priority) for index in ['0', *selected.values()]
+        ))
+        
+        if any(text is None for text in texts) or not texts[0].strip():
+            return None
+        
+        sections = dict(zip(names, texts))
+        sections['revid'] = parse.get('revid')
+        return sections
+    
+    async def _extract_text(self, html: str) -> Optional[str]:
+        """Extract the main text of a rendered page off the event loop."""
+        if TRAFILATURA_AVAILABLE:
+            return await asyncio.to_thread(extract, html)
+        # Simple text extraction (basic fallback)
+        return re.sub(r'<[^>]+>', '', html)
+    
+    async def _fetch_extracted(self, title: str, parser: Callable,
+                               priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict]:
+        """Fetch the full rendered page and parse the extracted text."""
+        # Fetch the page
+        downloaded = await self.scheduler.fetch_text(self._page_url(title), priority=priority)
+        if not downloaded:
+            return None
+            
+        # Extract content
+        content = await self._extract_text(downloaded)
+        if not content:
+            return None
+        
+        return parser(content, title)
+    
+    async def search_character(self, character_name: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict]:
         """Search for a character on the wiki."""
         try:
-            # Format character name for URL
-            formatted_name = character_name.replace(" ", "_").title()
-            url = f"{self.wiki_url}{formatted_name}"
-            
-            # Fetch the page
-            downloaded = fetch_url(url)
-            if not downloaded:
-                return None
-                
-            # Extract content
-            content = extract(downloaded)
-            if not content:
+            # Resolve the canonical page title
+            title = await self.title_index.resolve([character_name])
+            if not title:
                 return None
             
-            # Parse content for key information
-            info = self._parse_character_info(content, character_name)
-            info['source_url'] = url
+            cached = self._get_cached('character', title)
+            if cached:
+                return cached
+            
+            # Fetch only the sections we render, falling back to the full page
+            sections = await self._fetch_sections(title, CHARACTER_SECTIONS, priority)
+            if sections:
+                info = build_character_page(title, sections).to_info()
+                info['revid'] = sections['revid']
+            else:
+                info = await self._fetch_extracted(title, parse_character_text, priority)
+                if not info:
+                    return None
+            
+            info['source_url'] = self._page_url(title)
+            self._set_cached('character', title, info)
             
             return info
             
@@ -46,26 +206,32 @@ class LordOfMysteriesWikiScraper:
             logger.error(f'Error searching character {character_name}: {str(e)}')
             return None
     
-    async def search_pathway(self, pathway_name: str) -> Optional[Dict]:
+    async def search_pathway(self, pathway_name: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict]:
         """Search for a pathway on the wiki."""
         try:
-            # Format pathway name for URL
-            formatted_name = f"{pathway_name.replace(' ', '_')}_Pathway"
-            url = f"{self.wiki_url}{formatted_name}"
-            
-            # Fetch the page
-            downloaded = fetch_url(url)
-            if not downloaded:
-                return None
-                
-            # Extract content
-            content = extract(downloaded)
-            if not content:
+            # Resolve the canonical page title, preferring the pathway page
+            title = await self.title_index.resolve([f"{pathway_name} Pathway", pathway_name])
+            if not title:
                 return None
             
-            # Parse content for pathway information
-            info = self._parse_pathway_info(content, pathway_name)
-            info['source_url'] = url
+            cached = self._get_cached('pathway', title)
+            if cached:
+                return cached
+            
+            # Fetch only the sections we render, falling back to the full page
+            sections = await self._fetch_sections(title, PATHWAY_SECTIONS, priority)
+            if sections:
+                info = build_pathway_page(title, sections).to_info()
+                info['revid'] = sections['revid']
+            else:
+                info = await self._fetch_extracted(
+                    title, lambda content, name: parse_pathway_text(content, name.removesuffix(' Pathway')), priority
+                )
+                if not info:
+                    return None
+            
+            info['source_url'] = self._page_url(title)
+            self._set_cached('pathway', title, info)
             
             return info
             
@@ -73,26 +239,34 @@ class LordOfMysteriesWikiScraper:
             logger.error(f'Error searching pathway {pathway_name}: {str(e)}')
             return None
     
-    async def search_general(self, search_term: str) -> Optional[Dict]:
+    async def search_general(self, search_term: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict]:
         """General search on the wiki."""
         try:
-            # Format search term for URL
-            formatted_term = search_term.replace(" ", "_").title()
-            url = f"{self.wiki_url}{formatted_term}"
-            
-            # Fetch the page
-            downloaded = fetch_url(url)
-            if not downloaded:
-                return None
-                
-            # Extract content
-            content = extract(downloaded)
-            if not content:
+            # Resolve the canonical page title
+            title = await self.title_index.resolve([search_term])
+            if not title:
                 return None
             
-            # Parse general content
-            info = self._parse_general_info(content, search_term)
-            info['source_url'] = url
+            cached = self._get_cached('general', title)
+            if cached:
+                return cached
+            
+            # The lead section is all we show, so skip the rest of the page
+            lead = await self._fetch_section(title, '0', priority)
+            if lead:
+                info = {
+                    'title': title,
+                    'type': 'General',
+                    'description': '\n\n'.join(paragraphs(lead, 30)[:4]),
+                    'key_info': []
+                }
+            else:
+                info = await self._fetch_extracted(title, parse_general_text, priority)
+                if not info:
+                    return None
+            
+            info['source_url'] = self._page_url(title)
+            self._set_cached('general', title, info)
             
             return info
             
@@ -100,156 +274,15 @@ class LordOfMysteriesWikiScraper:
             logger.error(f'Error searching {search_term}: {str(e)}')
             return None
     
-    def _parse_character_info(self, content: str, character_name: str) -> Dict:
-        """Parse character information from wiki content."""
-        info = {
-            'title': character_name,
-            'type': 'Character',
-            'description': '',
-            'physical_description': '',
-            'pathways_authorities': '',
-            'key_info': []
-        }
-        
-        lines = content.split('\n')
-        current_section = ''
-        
-        # Track sections we're interested in
-        collecting_physical = False
-        collecting_pathways = False
-        description_lines = []
-        physical_lines = []
-        pathway_lines = []
+    async def search_many(self, search: Callable, names: List[str],
+                          priority: int = PRIORITY_INTERACTIVE) -> List[Optional[Dict]]:
+        """Run one search method for several names concurrently.
         
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Detect section headers
-            line_lower = line.lower()
-            
-            # Physical Description section
-            if any(keyword in line_lower for keyword in ['physical description', 'appearance', 'description']):
-                collecting_physical = True
-                collecting_pathways = False
-                current_section = 'physical'
-                continue
-            
-            # Pathways & Authorities section  
-            elif any(keyword in line_lower for keyword in ['pathway', 'authorities', 'sequence', 'potion']):
-                collecting_physical = False
-                collecting_pathways = True
-                current_section = 'pathways'
-                continue
-            
-            # Stop collecting if we hit another major section
-            elif any(keyword in line_lower for keyword in ['history', 'personality', 'abilities', 'trivia', 'references']):
-                collecting_physical = False
-                collecting_pathways = False
-                current_section = ''
-                continue
-            
-            # Collect content based on current section
-            if collecting_physical and len(line) > 20:
-                physical_lines.append(line)
-            elif collecting_pathways and len(line) > 20:
-                pathway_lines.append(line)
-            elif current_section == '' and len(line) > 30 and len(description_lines) < 3:
-                # General description when not in specific section
-                description_lines.append(line)
-        
-        # Build the info
-        info['description'] = '\n\n'.join(description_lines)
-        info['physical_description'] = '\n'.join(physical_lines[:4])  # Limit to avoid too long
-        info['pathways_authorities'] = '\n'.join(pathway_lines[:5])
-        
-        return info
-    
-    def _parse_pathway_info(self, content: str, pathway_name: str) -> Dict:
-        """Parse pathway information from wiki content."""
-        info = {
-            'title': f"{pathway_name} Pathway",
-            'type': 'Pathway',
-            'general_information': '',
-            'sequence_levels': '',
-            'key_info': []
-        }
-        
-        lines = content.split('\n')
-        
-        # Track sections
-        collecting_general = False
-        collecting_sequences = False
-        general_lines = []
-        sequence_lines = []
-        current_section = ''
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            line_lower = line.lower()
-            
-            # Detect General Information section
-            if any(keyword in line_lower for keyword in ['general information', 'overview', 'description']):
-                collecting_general = True
-                collecting_sequences = False
-                current_section = 'general'
-                continue
-            
-            # Detect Sequence section
-            elif any(keyword in line_lower for keyword in ['sequence', 'levels', 'potion']):
-                collecting_general = False
-                collecting_sequences = True
-                current_section = 'sequences'
-                continue
-            
-            # Stop collecting if we hit other sections
-            elif any(keyword in line_lower for keyword in ['history', 'notable', 'references', 'trivia']):
-                collecting_general = False
-                collecting_sequences = False
-                current_section = ''
-                continue
-            
-            # Collect content
-            if collecting_general and len(line) > 20:
-                general_lines.append(line)
-            elif collecting_sequences and len(line) > 15:
-                sequence_lines.append(line)
-            elif current_section == '' and len(line) > 30 and len(general_lines) == 0:
-                # Fallback to early content as general info
-                general_lines.append(line)
-        
-        info['general_information'] = '\n'.join(general_lines[:4])
-        info['sequence_levels'] = '\n'.join(sequence_lines[:8])
-        
-        return info
-    
-    def _parse_general_info(self, content: str, search_term: str) -> Dict:
-        """Parse general information from wiki content."""
-        info = {
-            'title': search_term,
-            'type': 'General',
-            'description': '',
-            'key_info': []
-        }
-        
-        lines = content.split('\n')
-        description_lines = []
-        
-        # Extract first few meaningful lines
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            if len(line) > 30 and len(description_lines) < 4:
-                description_lines.append(line)
-        
-        info['description'] = '\n\n'.join(description_lines)
-        return info
+        Results come back in the order of the names. The scheduler still
+        applies the per-host limits, so a batch costs about as long as its
+        slowest lookup rather than the sum of them.
+        """
+        return await asyncio.gather(*(search(name, priority) for name in names))
     
     async def get_random_fact(self) -> Optional[str]:
         """Get a random fact from different wiki pages."""
@@ -273,21 +306,10 @@ class LordOfMysteriesWikiScraper:
             url = f"{self.wiki_url}{selected_page}"
             
             # Fetch the page
-            if TRAFILATURA_AVAILABLE:
-                downloaded = fetch_url(url)
-                if not downloaded:
-                    return None
-                content = extract(downloaded)
-            else:
-                # Fallback method using aiohttp
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url) as response:
-                        if response.status != 200:
-                            return None
-                        html = await response.text()
-                        # Simple text extraction (basic fallback)
-                        import re
-                        content = re.sub(r'<[^>]+>', '', html)
+            downloaded = await self.scheduler.fetch_text(url)
+            if not downloaded:
+                return None
+            content = await self._extract_text(downloaded)
             
             if not content:
                 return None
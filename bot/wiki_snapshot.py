@@ -0,0 +1,113 @@
+import json
+import logging
+import marshal
+import os
+import struct
+import sys
+import zlib
+from typing import Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of any section changes
+SNAPSHOT_VERSION = 2
+
+MAGIC = b'WIKISNAP'
+
+# Format version, then the lengths of the state, meta and content sections
+# and a CRC32 over state and meta. Content is not covered: it is served
+# from the file in place, and each body carries zlib's own checksum
+HEADER = struct.Struct('<8sIIQQI')
+
+# marshal output is only readable by the Python that wrote it
+FORMAT_TAG = f'{SNAPSHOT_VERSION}/{marshal.version}/{sys.version_info[0]}.{sys.version_info[1]}'
+
+
+class Snapshot(NamedTuple):
+    meta: Dict
+    content_offset: int
+    content_length: int
+
+
+def _path(directory, guild_id_str):
+    return os.path.join(directory, f'{guild_id_str}.snap')
+
+
+def write_snapshot(directory: str, guild_id_str: str, state: str, meta: Dict, content_chunks) -> int:
+    """Write a guild's snapshot atomically; returns its size in bytes.
+
+    state is the storage version the snapshot was taken at, meta a
+    marshal-able dict of records and indexes, and content_chunks an iterable
+    of compressed bodies laid out back to back as meta's offsets expect.
+    """
+    path = _path(directory, guild_id_str)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    state_bytes = json.dumps({'format': FORMAT_TAG, 'state': state}).encode('utf-8')
+    meta_bytes = marshal.dumps(meta)
+
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * HEADER.size)
+        f.write(state_bytes)
+        f.write(meta_bytes)
+        crc = zlib.crc32(meta_bytes, zlib.crc32(state_bytes))
+        content_length = 0
+        for chunk in content_chunks:
+            f.write(chunk)
+            content_length += len(chunk)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, SNAPSHOT_VERSION, len(state_bytes), len(meta_bytes), content_length, crc))
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.seek(0, os.SEEK_END)
+    os.replace(tmp_path, path)
+    return size
+
+
+def load_snapshot(directory: str, guild_id_str: str, state: str) -> Optional[Snapshot]:
+    """Read a guild's snapshot if it is intact and was taken at state.
+
+    Only the header, state and meta are read and checked, so loading costs
+    the size of the metadata; the content section is left for the caller to
+    map. Returns None, logging why, when there is no usable snapshot; the
+    caller then rebuilds from storage.
+    """
+    path = _path(directory, guild_id_str)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError('truncated header')
+            magic, version, state_length, meta_length, content_length, expected_crc = HEADER.unpack(header)
+            if magic != MAGIC or version != SNAPSHOT_VERSION:
+                logger.info(f'Ignoring wiki snapshot {path}: unsupported version')
+                return None
+
+            state_bytes = f.read(state_length)
+            header_state = json.loads(state_bytes)
+            if header_state.get('format') != FORMAT_TAG or header_state.get('state') != state:
+                logger.info(f'Ignoring stale wiki snapshot {path}')
+                return None
+
+            meta_bytes = f.read(meta_length)
+            crc = zlib.crc32(meta_bytes, zlib.crc32(state_bytes))
+            content_offset = f.tell()
+            if os.fstat(f.fileno()).st_size < content_offset + content_length:
+                raise ValueError('truncated content')
+            if crc != expected_crc:
+                raise ValueError('checksum mismatch')
+            meta = marshal.loads(meta_bytes)
+    except (OSError, ValueError, EOFError, TypeError) as e:
+        logger.warning(f'Ignoring corrupt wiki snapshot {path}: {str(e)}')
+        return None
+
+    return Snapshot(meta, content_offset, content_length)
+
+
+def remove_snapshot(directory: str, guild_id_str: str):
+    try:
+        os.remove(_path(directory, guild_id_str))
+    except OSError:
+        pass
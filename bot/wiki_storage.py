@@ -0,0 +1,482 @@
+import os
+import logging
+import sqlite3
+import sys
+from typing import Callable, Optional, Dict, List
+
+from bot.journal import JournaledJsonStore, write_json_atomic
+from bot.wiki_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class WikiStorage:
+    """Persistence backend for WikiSystem.
+
+    Backends load one guild's wiki at a time and are then told about each
+    change, so they can persist just that change.
+    """
+
+    # Whether search() can answer queries without the in-memory index
+    supports_search = False
+
+    def list_guilds(self) -> List[str]:
+        """List the guilds that have wiki data."""
+        raise NotImplementedError
+
+    def load_guild(self, guild_id_str: str) -> Dict:
+        """Load one guild's wiki data as {'entries': {...}, 'aliases': {...}}."""
+        raise NotImplementedError
+
+    def unload_guild(self, guild_id_str: str):
+        """Release anything held for a guild whose data was evicted."""
+
+    def guild_version(self, guild_id_str: str) -> str:
+        """Get a token that changes whenever a guild's stored data changes.
+
+        Pending writes must be flushed (unload_guild) before asking.
+        """
+        raise NotImplementedError
+
+    def detach_guild(self, guild_id_str: str) -> Callable[[], str]:
+        """Start unloading a guild without blocking on its pending writes.
+
+        Returns a function the caller runs later, on a background thread,
+        that finishes unloading and returns the guild's version. Backends
+        whose writes are already durable unload at once.
+        """
+        self.unload_guild(guild_id_str)
+        version = self.guild_version(guild_id_str)
+        return lambda: version
+
+    def load(self) -> Dict:
+        """Load all wiki data as {'entries': {guild: ...}, 'aliases': {guild: ...}}."""
+        data = {'entries': {}, 'aliases': {}}
+        for guild_id_str in self.list_guilds():
+            guild_data = self.load_guild(guild_id_str)
+            data['entries'][guild_id_str] = guild_data['entries']
+            data['aliases'][guild_id_str] = guild_data['aliases']
+        return data
+
+    def put_entry(self, guild_id_str: str, title_key: str, entry: Dict):
+        """Persist a new or changed entry."""
+        raise NotImplementedError
+
+    def delete_entry(self, guild_id_str: str, title_key: str):
+        """Persist the removal of an entry."""
+        raise NotImplementedError
+
+    def put_alias(self, guild_id_str: str, alias: str, target: str):
+        """Persist a new or changed alias."""
+        raise NotImplementedError
+
+    def put_batch(self, guild_id_str: str, entries: Dict[str, Dict], aliases: Dict[str, str]):
+        """Persist many entries and aliases at once, for bulk imports."""
+        for title_key, entry in entries.items():
+            self.put_entry(guild_id_str, title_key, entry)
+        for alias, target in aliases.items():
+            self.put_alias(guild_id_str, alias, target)
+
+    def delete_alias(self, guild_id_str: str, alias: str):
+        """Persist the removal of an alias."""
+        raise NotImplementedError
+
+    def search(self, query: str, guild_id_str: str, limit: int = 10) -> List[Dict]:
+        """Search entries in the backend itself, if supported."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend."""
+
+
+def empty_guild_data() -> Dict:
+    return {'entries': {}, 'aliases': {}}
+
+
+class JsonWikiStorage(WikiStorage):
+    """Stores each guild's wiki in its own JSON snapshot plus journal.
+
+    Files live in ``wiki/<guild id>.json``; each change appends one record to
+    that guild's journal, which is folded back into the snapshot in the
+    background once it grows large. A single-file ``wiki.json`` from older
+    versions is split into per-guild files on first start.
+    """
+
+    def __init__(self, wiki_dir='wiki', legacy_file=None):
+        self.wiki_dir = wiki_dir
+        self._stores: Dict[str, JournaledJsonStore] = {}
+        os.makedirs(wiki_dir, exist_ok=True)
+        if legacy_file and os.path.exists(legacy_file):
+            self._split_legacy(legacy_file)
+
+    def _guild_file(self, guild_id_str):
+        return os.path.join(self.wiki_dir, f'{guild_id_str}.json')
+
+    def _split_legacy(self, legacy_file):
+        """Split an old single-file wiki into per-guild files."""
+        legacy = JournaledJsonStore(legacy_file, empty_guild_data)
+        data = legacy.load()
+        legacy.close()
+
+        guilds = set(data.get('entries', {})) | set(data.get('aliases', {}))
+        for guild_id_str in guilds:
+            write_json_atomic(self._guild_file(guild_id_str), {
+                'entries': data.get('entries', {}).get(guild_id_str, {}),
+                'aliases': data.get('aliases', {}).get(guild_id_str, {})
+            }, indent=2)
+
+        for path in (legacy_file, legacy.journal_path):
+            if os.path.exists(path):
+                os.replace(path, f'{path}.migrated')
+        logger.info(f'Split {legacy_file} into {len(guilds)} guild files in {self.wiki_dir}')
+
+    def _open(self, guild_id_str):
+        """Open a guild's store and return its data, which the store then lets go of."""
+        self.unload_guild(guild_id_str)
+        store = JournaledJsonStore(self._guild_file(guild_id_str), empty_guild_data, indent=2)
+        data = store.load()
+        data.setdefault('entries', {})
+        data.setdefault('aliases', {})
+        store.release()
+        self._stores[guild_id_str] = store
+        return data
+
+    def _store(self, guild_id_str):
+        store = self._stores.get(guild_id_str)
+        if store is None:
+            # The caller already holds the data (e.g. from a snapshot), so
+            # only open the journal for appending
+            store = JournaledJsonStore(self._guild_file(guild_id_str), empty_guild_data, indent=2)
+            store.open()
+            self._stores[guild_id_str] = store
+        return store
+
+    def list_guilds(self):
+        guilds = set()
+        for name in os.listdir(self.wiki_dir):
+            if name.endswith('.json') or name.endswith('.json.journal'):
+                guilds.add(name.split('.', 1)[0])
+        return sorted(guilds)
+
+    def load_guild(self, guild_id_str):
+        """Load a guild's wiki data from its snapshot and journal."""
+        return self._open(guild_id_str)
+
+    def unload_guild(self, guild_id_str):
+        store = self._stores.pop(guild_id_str, None)
+        if store:
+            store.close()
+
+    def detach_guild(self, guild_id_str):
+        """Hand the guild's store to the caller, who flushes and closes it."""
+        store = self._stores.pop(guild_id_str, None)
+
+        def finish():
+            if store:
+                store.close()
+            return self.guild_version(guild_id_str)
+        return finish
+
+    def guild_version(self, guild_id_str):
+        """Sizes and modification times of the guild's snapshot and journal."""
+        parts = []
+        for path in (self._guild_file(guild_id_str), f'{self._guild_file(guild_id_str)}.journal'):
+            try:
+                stat = os.stat(path)
+                parts.append(f'{stat.st_size}:{stat.st_mtime_ns}')
+            except FileNotFoundError:
+                parts.append('-')
+        return 'json/' + '/'.join(parts)
+
+    def put_entry(self, guild_id_str, title_key, entry):
+        self._store(guild_id_str).set(['entries', title_key], entry)
+
+    def delete_entry(self, guild_id_str, title_key):
+        self._store(guild_id_str).delete(['entries', title_key])
+
+    def put_alias(self, guild_id_str, alias, target):
+        self._store(guild_id_str).set(['aliases', alias], target)
+
+    def delete_alias(self, guild_id_str, alias):
+        self._store(guild_id_str).delete(['aliases', alias])
+
+    def put_batch(self, guild_id_str, entries, aliases):
+        """Journal a batch; the journal writer thread writes it behind."""
+        store = self._store(guild_id_str)
+        for title_key, entry in entries.items():
+            store.set(['entries', title_key], entry)
+        for alias, target in aliases.items():
+            store.set(['aliases', alias], target)
+
+    def close(self):
+        for guild_id_str in list(self._stores):
+            self.unload_guild(guild_id_str)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    guild_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    author_id INTEGER,
+    created_at TEXT,
+    updated_at TEXT,
+    edit_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, key)
+);
+
+CREATE TABLE IF NOT EXISTS aliases (
+    guild_id TEXT NOT NULL,
+    alias TEXT NOT NULL,
+    target TEXT NOT NULL,
+    PRIMARY KEY (guild_id, alias)
+);
+
+CREATE INDEX IF NOT EXISTS aliases_by_target ON aliases (guild_id, target);
+
+CREATE TABLE IF NOT EXISTS guild_state (
+    guild_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+INSERT OR IGNORE INTO meta (key, value) VALUES ('instance', lower(hex(randomblob(8))));
+
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    title, content, guild_id,
+    content='entries', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS entries_fts_insert AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts (rowid, title, content, guild_id) VALUES (new.rowid, new.title, new.content, new.guild_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS entries_fts_delete AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts (entries_fts, rowid, title, content, guild_id)
+    VALUES ('delete', old.rowid, old.title, old.content, old.guild_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS entries_fts_update AFTER UPDATE ON entries BEGIN
+    INSERT INTO entries_fts (entries_fts, rowid, title, content, guild_id)
+    VALUES ('delete', old.rowid, old.title, old.content, old.guild_id);
+    INSERT INTO entries_fts (rowid, title, content, guild_id) VALUES (new.rowid, new.title, new.content, new.guild_id);
+END;
+"""
+
+# Databases made before the FTS table had a guild_id column drop it and
+# its triggers; the schema then recreates them and the index is rebuilt
+FTS_UPGRADE = """
+DROP TRIGGER IF EXISTS entries_fts_insert;
+DROP TRIGGER IF EXISTS entries_fts_delete;
+DROP TRIGGER IF EXISTS entries_fts_update;
+DROP TABLE IF EXISTS entries_fts;
+"""
+
+ENTRY_COLUMNS = ('title', 'content', 'author_id', 'created_at', 'updated_at', 'edit_count')
+
+ENTRY_UPSERT = (
+    f"INSERT INTO entries (guild_id, key, {', '.join(ENTRY_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+    f"ON CONFLICT (guild_id, key) DO UPDATE SET "
+    f"{', '.join(f'{column} = excluded.{column}' for column in ENTRY_COLUMNS)}"
+)
+
+ALIAS_UPSERT = (
+    'INSERT INTO aliases (guild_id, alias, target) VALUES (?, ?, ?) '
+    'ON CONFLICT (guild_id, alias) DO UPDATE SET target = excluded.target'
+)
+
+# How long a connection waits for another process's write to finish
+SQLITE_BUSY_TIMEOUT = 30
+
+# Bumped in the same transaction as every write to a guild
+VERSION_BUMP = (
+    'INSERT INTO guild_state (guild_id, version) VALUES (?, 1) '
+    'ON CONFLICT (guild_id) DO UPDATE SET version = version + 1'
+)
+
+
+class SqliteWikiStorage(WikiStorage):
+    """Stores the wiki in SQLite, one row per entry and alias.
+
+    Runs in WAL mode so each change is a small transaction and a crash never
+    leaves a half-written file behind. An FTS5 table mirrors the entries for
+    full-text search; it indexes each entry's guild ID too, so a search only
+    walks the postings of its own guild.
+    """
+
+    supports_search = True
+
+    def __init__(self, db_file='wiki.db'):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file, timeout=SQLITE_BUSY_TIMEOUT)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        fts_columns = [row[1] for row in self.conn.execute('PRAGMA table_info(entries_fts)')]
+        upgrade = bool(fts_columns) and 'guild_id' not in fts_columns
+        if upgrade:
+            self.conn.executescript(FTS_UPGRADE)
+        self.conn.executescript(SQLITE_SCHEMA)
+        if upgrade:
+            with self.conn:
+                self.conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')")
+            logger.info(f'Rebuilt the search index of {db_file} with guild IDs')
+
+    def list_guilds(self):
+        rows = self.conn.execute('SELECT guild_id FROM entries UNION SELECT guild_id FROM aliases')
+        return [guild_id_str for guild_id_str, in rows]
+
+    def load_guild(self, guild_id_str):
+        """Load a guild's wiki data from the database."""
+        data = empty_guild_data()
+        try:
+            rows = self.conn.execute(
+                f"SELECT key, {', '.join(ENTRY_COLUMNS)} FROM entries WHERE guild_id = ?", (guild_id_str,)
+            )
+            for title_key, *values in rows:
+                data['entries'][title_key] = dict(zip(ENTRY_COLUMNS, values))
+
+            rows = self.conn.execute('SELECT alias, target FROM aliases WHERE guild_id = ?', (guild_id_str,))
+            data['aliases'] = dict(rows)
+        except Exception as e:
+            logger.error(f'Error loading wiki for guild {guild_id_str}: {str(e)}')
+        return data
+
+    def _write(self, guild_id_str, sql, params):
+        try:
+            with self.conn:
+                self.conn.execute(sql, params)
+                self.conn.execute(VERSION_BUMP, (guild_id_str,))
+        except Exception as e:
+            logger.error(f'Error saving wiki: {str(e)}')
+
+    def guild_version(self, guild_id_str):
+        """The database's instance ID and the guild's write counter."""
+        instance, = self.conn.execute("SELECT value FROM meta WHERE key = 'instance'").fetchone()
+        row = self.conn.execute('SELECT version FROM guild_state WHERE guild_id = ?', (guild_id_str,)).fetchone()
+        return f'sqlite/{instance}/{row[0] if row else 0}'
+
+    def put_entry(self, guild_id_str, title_key, entry):
+        self._write(
+            guild_id_str, ENTRY_UPSERT, (guild_id_str, title_key, *(entry.get(column) for column in ENTRY_COLUMNS))
+        )
+
+    def delete_entry(self, guild_id_str, title_key):
+        self._write(guild_id_str, 'DELETE FROM entries WHERE guild_id = ? AND key = ?', (guild_id_str, title_key))
+
+    def put_alias(self, guild_id_str, alias, target):
+        self._write(guild_id_str, ALIAS_UPSERT, (guild_id_str, alias, target))
+
+    def put_batch(self, guild_id_str, entries, aliases):
+        """Write a batch in one transaction."""
+        try:
+            with self.conn:
+                self.conn.executemany(ENTRY_UPSERT, (
+                    (guild_id_str, title_key, *(entry.get(column) for column in ENTRY_COLUMNS))
+                    for title_key, entry in entries.items()
+                ))
+                self.conn.executemany(ALIAS_UPSERT, (
+                    (guild_id_str, alias, target) for alias, target in aliases.items()
+                ))
+                self.conn.execute(VERSION_BUMP, (guild_id_str,))
+        except Exception as e:
+            logger.error(f'Error saving wiki batch: {str(e)}')
+
+    def delete_alias(self, guild_id_str, alias):
+        self._write(guild_id_str, 'DELETE FROM aliases WHERE guild_id = ? AND alias = ?', (guild_id_str, alias))
+
+    def search(self, query, guild_id_str, limit=10):
+        """Search a guild's entries with FTS5, best matches first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        # Every word must match in the title or content, and the last one may
+        # still be being typed; the guild ID narrows the match to one guild
+        words = ' '.join(f'"{token}"' for token in tokens) + '*'
+        match = f'guild_id : "{guild_id_str}" AND {{title content}} : ({words})'
+        rows = self.conn.execute(
+            "SELECT e.title, snippet(entries_fts, 1, '**', '**', '...', 16), bm25(entries_fts, 3.0, 1.0, 0.0) AS rank "
+            "FROM entries_fts JOIN entries e ON e.rowid = entries_fts.rowid "
+            "WHERE entries_fts MATCH ? ORDER BY rank LIMIT ?",
+            (match, limit)
+        )
+
+        results = []
+        for title, snippet, rank in rows:
+            title_tokens = tokenize(title)
+            title_match = any(t.startswith(token) for token in tokens for t in title_tokens)
+            results.append({
+                'title': title,
+                'content': snippet,
+                'match_type': 'title' if title_match else 'content',
+                'score': -rank
+            })
+        return results
+
+    def close(self):
+        self.conn.close()
+
+
+def open_wiki_storage(backend: Optional[str] = None, path: Optional[str] = None) -> WikiStorage:
+    """Open the storage backend chosen by WIKI_STORAGE (json or sqlite)."""
+    backend = (backend or os.getenv('WIKI_STORAGE', 'json')).lower()
+    if backend == 'sqlite':
+        return SqliteWikiStorage(path or os.getenv('WIKI_DB', 'wiki.db'))
+    return JsonWikiStorage(path or os.getenv('WIKI_DIR', 'wiki'), legacy_file=os.getenv('WIKI_FILE', 'wiki.json'))
+
+
+def migrate_json_to_sqlite(wiki_dir='wiki', db_file='wiki.db'):
+    """Copy every entry and alias from the JSON wiki files into SQLite.
+
+    Runs as one transaction, so an interrupted migration leaves the database
+    unchanged and can simply be run again.
+    """
+    json_storage = JsonWikiStorage(wiki_dir, legacy_file=os.getenv('WIKI_FILE', 'wiki.json'))
+    data = json_storage.load()
+    json_storage.close()
+    storage = SqliteWikiStorage(db_file)
+    entry_count = 0
+    alias_count = 0
+    try:
+        with storage.conn:
+            for guild_id_str, entries in data.get('entries', {}).items():
+                for title_key, entry in entries.items():
+                    storage.conn.execute(
+                        f"INSERT OR REPLACE INTO entries (guild_id, key, {', '.join(ENTRY_COLUMNS)}) "
+                        f"VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (guild_id_str, title_key, *(entry.get(column) for column in ENTRY_COLUMNS))
+                    )
+                    entry_count += 1
+
+            for guild_id_str, aliases in data.get('aliases', {}).items():
+                for alias, target in aliases.items():
+                    storage.conn.execute(
+                        'INSERT OR REPLACE INTO aliases (guild_id, alias, target) VALUES (?, ?, ?)',
+                        (guild_id_str, alias, target)
+                    )
+                    alias_count += 1
+
+            for guild_id_str in set(data.get('entries', {})) | set(data.get('aliases', {})):
+                storage.conn.execute(VERSION_BUMP, (guild_id_str,))
+
+            # INSERT OR REPLACE bypasses the update trigger, so resync the index
+            storage.conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')")
+    finally:
+        storage.close()
+
+    logger.info(f'Migrated {entry_count} entries and {alias_count} aliases from {wiki_dir} to {db_file}')
+    return entry_count, alias_count
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print('Usage: python -m bot.wiki_storage migrate [wiki_dir] [wiki.db]')
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO)
+    migrate_json_to_sqlite(*sys.argv[2:4])
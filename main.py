@@ -7,126 +7,149 @@ from dotenv import load_dotenv
 from bot.image_generator import WelcomeImageGenerator
 from bot.config import BotConfig
 from bot.commands import setup_commands
+from bot.member_cache import MemberCacheTrimmer, member_cache_options
+from bot.logging_setup import setup_logging
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging; records are written by a background thread
+setup_logging()
 logger = logging.getLogger(__name__)
 
-# Bot configuration
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-intents.guilds = True
-
-bot = commands.Bot(command_prefix='!', intents=intents)
-config = BotConfig()
-image_generator = WelcomeImageGenerator()
-
-@bot.event
-async def on_ready():
-    """Called when the bot is ready and connected to Discord."""
-    logger.info(f'{bot.user} has connected to Discord!')
-    logger.info(f'Bot is in {len(bot.guilds)} guilds')
+def create_bot(shard_ids=None, shard_count=None):
+    """Create the bot and its config, sharded when shard_count is given."""
+    config = BotConfig()
     
-    # Set bot activity
-    activity = discord.Activity(type=discord.ActivityType.watching, name="for new members")
-    await bot.change_presence(activity=activity)
-
-@bot.event
-async def on_member_join(member):
-    """Called when a new member joins a guild."""
-    try:
-        logger.info(f'New member joined: {member.name} in guild {member.guild.name}')
-        
-        # Get welcome channel for this guild
-        welcome_channel_id = config.get_welcome_channel(member.guild.id)
-        if not welcome_channel_id:
-            logger.warning(f'No welcome channel set for guild {member.guild.name}')
-            return
-        
-        welcome_channel = bot.get_channel(welcome_channel_id)
-        if not welcome_channel:
-            logger.error(f'Welcome channel {welcome_channel_id} not found')
-            return
-        
-        # Generate welcome image
-        logger.info(f'Generating welcome image for {member.name}')
-        image_path = await image_generator.create_welcome_image(member)
-        
-        if not image_path:
-            logger.error(f'Failed to generate welcome image for {member.name}')
-            # Send text-only welcome message as fallback
-            embed = discord.Embed(
-                title="Selamat Datang!",
-                description=f"Selamat datang {member.mention} di {member.guild.name}. Jangan lupa mampir ke <#1396367392644530209> dan <#1396367050787786873>. Selamat berdiskusi 🎉",
-                color=0x00ff00
-            )
-            await welcome_channel.send(embed=embed)
-            return
-        
-        # Send welcome message with image
-        with open(image_path, 'rb') as f:
-            file = discord.File(f, filename='welcome.png')
-            embed = discord.Embed(
-                title="Selamat Datang!",
-                description=f"Selamat datang {member.mention} di {member.guild.name}. Jangan lupa mampir ke <#1396367392644530209> dan <#1396367050787786873>. Selamat berdiskusi 🎉",
-                color=0x00ff00
-            )
-            embed.set_image(url="attachment://welcome.png")
-            embed.set_footer(text=f"Member #{member.guild.member_count}")
-            
-            await welcome_channel.send(embed=embed, file=file)
+    # Bot configuration; the members intent is needed for join events, but
+    # which members stay cached is up to the member_cache settings
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    intents.guilds = True
+    options = member_cache_options(config.get_member_cache())
+    
+    if shard_count:
+        bot = commands.AutoShardedBot(command_prefix='!', intents=intents, shard_ids=shard_ids, shard_count=shard_count, **options)
+    else:
+        bot = commands.Bot(command_prefix='!', intents=intents, **options)
+    bot.member_cache = MemberCacheTrimmer(bot, config.get_member_cache)
+    image_generator = WelcomeImageGenerator()
+    
+    @bot.event
+    async def on_ready():
+        """Called when the bot is ready and connected to Discord."""
+        logger.info(f'{bot.user} has connected to Discord!')
+        logger.info(f'Bot is in {len(bot.guilds)} guilds')
+        if bot.shard_count:
+            logger.info(f'Running shards {sorted(bot.shards)} of {bot.shard_count}')
         
-        # Clean up temporary image file
+        # Set bot activity
+        activity = discord.Activity(type=discord.ActivityType.watching, name="for new members")
+        await bot.change_presence(activity=activity)
+    
+    @bot.event
+    async def on_member_join(member):
+        """Called when a new member joins a guild."""
         try:
-            os.remove(image_path)
-        except OSError:
-            pass
-        
-        logger.info(f'Welcome message sent for {member.name}')
-        
-    except Exception as e:
-        logger.error(f'Error processing member join for {member.name}: {str(e)}')
-
-@bot.event
-async def on_command_error(ctx, error):
-    """Global error handler for commands."""
-    if isinstance(error, commands.CommandNotFound):
-        return
-    elif isinstance(error, commands.MissingPermissions):
-        await ctx.send("❌ Kamu tidak punya permission untuk menggunakan command ini.")
-        logger.warning(f'Missing permissions error for user {ctx.author}: {str(error)}')
-    elif isinstance(error, commands.MissingRequiredArgument):
-        await ctx.send(f"❌ Parameter yang diperlukan hilang: {error.param}")
-        logger.warning(f'Missing argument error: {str(error)}')
-    elif isinstance(error, discord.Forbidden):
-        await ctx.send("❌ Bot tidak punya permission untuk melakukan ini. Cek role dan permission bot.")
-        logger.error(f'Bot missing permissions: {str(error)}')
-    else:
-        await ctx.send("❌ Terjadi kesalahan saat memproses command.")
-        logger.error(f'Command error: {str(error)}', exc_info=True)
+            logger.info(f'New member joined: {member.name} in guild {member.guild.name}')
+            
+            # Get welcome channel for this guild
+            welcome_channel_id = config.get_welcome_channel(member.guild.id)
+            if not welcome_channel_id:
+                logger.warning(f'No welcome channel set for guild {member.guild.name}')
+                return
+            
+            welcome_channel = bot.get_channel(welcome_channel_id)
+            if not welcome_channel:
+                logger.error(f'Welcome channel {welcome_channel_id} not found')
+                return
+            
+            # Generate welcome image
+            logger.info(f'Generating welcome image for {member.name}')
+            image_path = await image_generator.create_welcome_image(member)
+            
+            if not image_path:
+                logger.error(f'Failed to generate welcome image for {member.name}')
+                # Send text-only welcome message as fallback
+                embed = discord.Embed(
+                    title="Selamat Datang!",
+                    description=f"Selamat datang {member.mention} di {member.guild.name}. Jangan lupa mampir ke <#1396367392644530209> dan <#1396367050787786873>. Selamat berdiskusi 🎉",
+                    color=0x00ff00
+                )
+                await welcome_channel.send(embed=embed)
+                return
+            
+            # Send welcome message with image
+            with open(image_path, 'rb') as f:
+                file = discord.File(f, filename='welcome.png')
+                embed = discord.Embed(
+                    title="Selamat Datang!",
+                    description=f"Selamat datang {member.mention} di {member.guild.name}. Jangan lupa mampir ke <#1396367392644530209> dan <#1396367050787786873>. Selamat berdiskusi 🎉",
+                    color=0x00ff00
+                )
+                embed.set_image(url="attachment://welcome.png")
+                embed.set_footer(text=f"Member #{member.guild.member_count}")
+                
+                await welcome_channel.send(embed=embed, file=file)
+            
+            # Clean up temporary image file
+            try:
+                os.remove(image_path)
+            except OSError:
+                pass
+            
+            logger.info(f'Welcome message sent for {member.name}')
+            
+        except Exception as e:
+            logger.error(f'Error processing member join for {member.name}: {str(e)}')
+    
+    @bot.event
+    async def on_command_error(ctx, error):
+        """Global error handler for commands."""
+        if isinstance(error, commands.CommandNotFound):
+            return
+        elif isinstance(error, commands.MissingPermissions):
+            await ctx.send("❌ Kamu tidak punya permission untuk menggunakan command ini.")
+            logger.warning(f'Missing permissions error for user {ctx.author}: {str(error)}')
+        elif isinstance(error, commands.MissingRequiredArgument):
+            await ctx.send(f"❌ Parameter yang diperlukan hilang: {error.param}")
+            logger.warning(f'Missing argument error: {str(error)}')
+        elif isinstance(error, discord.Forbidden):
+            await ctx.send("❌ Bot tidak punya permission untuk melakukan ini. Cek role dan permission bot.")
+            logger.error(f'Bot missing permissions: {str(error)}')
+        else:
+            await ctx.send("❌ Terjadi kesalahan saat memproses command.")
+            logger.error(f'Command error: {str(error)}', exc_info=True)
+    
+    return bot, config
 
-async def main():
-    """Main function to start the bot."""
-    # Setup commands
-    await setup_commands(bot, config)
+async def main(shard_ids=None, shard_count=None, cluster=None):
+    """Main function to start the bot.
     
-    # Get bot token from environment
+    Runs every shard in this process unless the cluster launcher passed a
+    range of shards and its connection.
+    """
+    # Get bot token from environment before starting anything that would
+    # need cleaning up
     token = os.getenv('DISCORD_BOT_TOKEN')
     if not token:
         logger.error('DISCORD_BOT_TOKEN not found in environment variables')
         return
     
+    bot, config = create_bot(shard_ids, shard_count)
+    bot.cluster = cluster
+    if cluster is not None:
+        cluster.on_stop = bot.close
+        cluster.start()
+    
+    # Setup commands
+    shutdown_commands = await setup_commands(bot, config)
+    
+    # Pick up edits to config.json without restarting
+    config.watch()
+    bot.member_cache.start()
+    
     # Start the bot
     try:
         await bot.start(token)
@@ -134,6 +157,13 @@ async def main():
         logger.error('Invalid bot token')
     except Exception as e:
         logger.error(f'Error starting bot: {str(e)}')
+    finally:
+        # Flush pending writes before exiting
+        if not bot.is_closed():
+            await bot.close()
+        bot.member_cache.close()
+        await shutdown_commands()
+        config.close()
 
 if __name__ == '__main__':
     asyncio.run(main())
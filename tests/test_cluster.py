@@ -0,0 +1,129 @@
+import asyncio
+import multiprocessing
+
+import pytest
+
+import bot.cluster as cluster
+from bot.cluster import ClusterClient, ClusterLauncher, split_shards
+
+
+@pytest.mark.parametrize('shard_count, worker_count, sizes', [
+    (10, 3, [4, 3, 3]),
+    (8, 4, [2, 2, 2, 2]),
+    (2, 5, [1, 1]),
+    (3, 0, [3]),
+])
+def test_split_shards_covers_every_shard_once(shard_count, worker_count, sizes):
+    ranges = split_shards(shard_count, worker_count)
+    assert [len(shard_ids) for shard_ids in ranges] == sizes
+    assert [shard_id for shard_ids in ranges for shard_id in shard_ids] == list(range(shard_count))
+
+
+class FakeConn:
+    def __init__(self):
+        self.sent = []
+        self.broken = False
+
+    def send(self, message):
+        if self.broken:
+            raise OSError('broken pipe')
+        self.sent.append(message)
+
+    def close(self):
+        pass
+
+
+def make_launcher(worker_count):
+    launcher = ClusterLauncher(worker_count, worker_count)
+    for worker in launcher.workers:
+        worker.conn = FakeConn()
+    return launcher
+
+
+def test_requests_are_relayed_to_every_worker_and_answered_in_order():
+    launcher = make_launcher(3)
+    first, second, third = launcher.workers
+    third.conn.broken = True
+
+    launcher._on_message(second, ('request', 7, 'stats', None))
+    assert first.conn.sent == second.conn.sent == [('call', 1, 'stats', None)]
+
+    launcher._on_message(second, ('reply', 1, True, 'second'))
+    assert second.conn.sent[-1][0] == 'call'
+    launcher._on_message(first, ('reply', 1, True, 'first'))
+    assert second.conn.sent[-1] == ('result', 7, ['first', 'second'])
+    assert launcher._calls == {}
+
+
+def test_failed_or_late_workers_are_left_out():
+    launcher = make_launcher(2)
+    first, second = launcher.workers
+    launcher._on_message(first, ('request', 1, 'stats', None))
+    launcher._on_message(first, ('reply', 1, False, 'boom'))
+    launcher._finish_if_done(1, force=True)
+    assert first.conn.sent[-1] == ('result', 1, [])
+
+
+def test_dead_workers_restart_with_growing_delays(monkeypatch):
+    launcher = make_launcher(2)
+    first, second = launcher.workers
+    launcher._on_message(first, ('request', 1, 'stats', None))
+    launcher._on_message(first, ('reply', 1, True, 'first'))
+
+    now = [100.0]
+    monkeypatch.setattr(cluster.time, 'monotonic', lambda: now[0])
+    delays = []
+    for _ in range(3):
+        second.process = type('Process', (), {'exitcode': 1})()
+        second.conn = FakeConn()
+        second.started_at = now[0]
+        launcher._on_exit(second)
+        delays.append(second.restart_at - now[0])
+    assert delays == [cluster.RESTART_DELAY_MIN, cluster.RESTART_DELAY_MIN * 2, cluster.RESTART_DELAY_MIN * 4]
+    # The pending request no longer waits for the dead worker
+    assert first.conn.sent[-1] == ('result', 1, ['first'])
+
+    second.process = type('Process', (), {'exitcode': 1})()
+    second.conn = FakeConn()
+    second.started_at = now[0] - cluster.RESTART_RESET_AFTER
+    launcher._on_exit(second)
+    assert second.restart_at - now[0] == cluster.RESTART_DELAY_MIN
+
+
+def test_client_answers_calls_and_gets_results():
+    launcher_end, worker_end = multiprocessing.Pipe()
+    client = ClusterClient(worker_end, 0, [0, 1], 2)
+    client.register('echo', lambda payload: payload)
+
+    async def double(payload):
+        return payload * 2
+
+    client.register('double', double)
+
+    async def run():
+        client.start()
+        launcher_end.send(('call', 1, 'echo', 'hi'))
+        launcher_end.send(('call', 2, 'double', 21))
+        launcher_end.send(('call', 3, 'missing', None))
+        replies = [await asyncio.to_thread(launcher_end.recv) for _ in range(3)]
+
+        request = asyncio.ensure_future(client.request('stats'))
+        kind, request_id, command, payload = await asyncio.to_thread(launcher_end.recv)
+        launcher_end.send(('result', request_id, ['a', 'b']))
+        values = await request
+
+        stopped = asyncio.Event()
+
+        async def on_stop():
+            stopped.set()
+
+        client.on_stop = on_stop
+        launcher_end.close()
+        await asyncio.wait_for(stopped.wait(), 5)
+        return sorted(replies), (kind, command), values
+
+    replies, request, values = asyncio.run(run())
+    assert replies[:2] == [('reply', 1, True, 'hi'), ('reply', 2, True, 42)]
+    assert replies[2][:3] == ('reply', 3, False)
+    assert request == ('request', 'stats')
+    assert values == ['a', 'b']
@@ -0,0 +1,211 @@
+import asyncio
+
+import discord
+import pytest
+from discord.ext import commands
+
+import bot.commands as commands_module
+from bot.commands import APP_COMMANDS_HASH_FILE, app_commands_hash
+
+
+class FakeMessage:
+    def __init__(self, content=None, embed=None):
+        self.content = content
+        self.embed = embed
+        self.edits = []
+        self.deleted = False
+
+    async def edit(self, **kwargs):
+        self.edits.append(kwargs)
+
+    async def delete(self):
+        self.deleted = True
+
+
+class FakeContext:
+    def __init__(self, guild_id=1, author_id=7):
+        self.guild = type('Guild', (), {'id': guild_id})()
+        self.author = type('Author', (), {'id': author_id, 'display_name': 'Tester'})()
+        self.sent = []
+
+    async def send(self, content=None, embed=None, **kwargs):
+        message = FakeMessage(content, embed)
+        self.sent.append(message)
+        return message
+
+
+class FakeScraper:
+    """Scraper whose pages are all "cached" but fail to come back."""
+
+    def __init__(self):
+        self.title_index = None
+
+    def cached_character(self, name):
+        return {'title': name}
+
+    def cached_pathway(self, name):
+        return {'title': name}
+
+    async def search_character(self, name, priority=None):
+        return None
+
+    async def search_pathway(self, name, priority=None):
+        return None
+
+    async def search_many(self, search, names, priority=None):
+        return [await search(name, priority) for name in names]
+
+    async def close(self):
+        pass
+
+
+class FakeConfig:
+    def get_command_limits(self, command, guild_id):
+        return {}
+
+
+class FakeCluster:
+    def __init__(self, shard_ids):
+        self.worker_id = 1
+        self.shard_ids = shard_ids
+
+    def register(self, name, handler):
+        pass
+
+
+@pytest.fixture
+def bot_commands(tmp_path, monkeypatch, request):
+    """Set up the commands on a bot that never connects, in a scratch directory.
+
+    Parametrize indirectly with a FakeCluster to run as a cluster worker.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(commands_module, 'LordOfMysteriesWikiScraper', FakeScraper)
+    loop = asyncio.new_event_loop()
+    bot = commands.Bot(command_prefix='!', intents=discord.Intents.none(), help_command=None)
+    bot.cluster = getattr(request, 'param', None)
+    shutdown = loop.run_until_complete(commands_module.setup_commands(bot, FakeConfig()))
+
+    def invoke(name, ctx, *args, **kwargs):
+        return loop.run_until_complete(bot.get_command(name).callback(ctx, *args, **kwargs))
+
+    def sync_on_ready():
+        synced = []
+
+        async def sync():
+            synced.append(app_commands_hash(bot))
+            return bot.tree.get_commands()
+
+        bot.tree.sync = sync
+        for listener in bot.extra_events['on_ready']:
+            loop.run_until_complete(listener())
+        return synced
+
+    bot.invoke_callback = invoke
+    bot.sync_on_ready = sync_on_ready
+    yield bot
+    loop.run_until_complete(shutdown())
+    loop.close()
+
+
+def test_batch_of_cached_names_that_all_fail_reports_not_found(bot_commands):
+    ctx = FakeContext()
+    bot_commands.invoke_callback('lomchars', ctx, names='Klein Moretti, Audrey Hall')
+
+    assert [message.content for message in ctx.sent] == ["❌ Tidak ada karakter yang ditemukan di wiki."]
+
+
+def test_history_lists_revisions_and_rollback_restores_one(bot_commands):
+    ctx = FakeContext()
+    bot_commands.invoke_callback('wikiadd', ctx, 'Seer', content='first text')
+    bot_commands.invoke_callback('wikiedit', ctx, 'Seer', content='second text')
+    bot_commands.invoke_callback('wikiedit', ctx, 'Seer', content='third text')
+
+    bot_commands.invoke_callback('wikihistory', ctx, title='Seer')
+    lines = ctx.sent[-1].embed.description.splitlines()
+    assert [line.split('`')[1] for line in lines] == ['rev 2', 'rev 1', 'rev 0']
+
+    bot_commands.invoke_callback('wikirollback', ctx, 'Seer', 0)
+    assert ctx.sent[-1].embed.title == "✅ Wiki Entry Dikembalikan"
+    bot_commands.invoke_callback('wiki', ctx, title='Seer')
+    assert 'first text' in ctx.sent[-1].embed.description
+
+    bot_commands.invoke_callback('wikihistory', ctx, title='Seer')
+    assert ctx.sent[-1].embed.description.splitlines()[0].startswith('`rev 3`')
+
+
+def test_rollback_to_an_unknown_revision_is_refused(bot_commands):
+    ctx = FakeContext()
+    bot_commands.invoke_callback('wikiadd', ctx, 'Seer', content='first text')
+    bot_commands.invoke_callback('wikirollback', ctx, 'Seer', 5)
+    assert ctx.sent[-1].content == "❌ Revisi 5 untuk 'Seer' tidak ditemukan."
+
+    bot_commands.invoke_callback('wikihistory', ctx, title='Missing')
+    assert ctx.sent[-1].content == "❌ Wiki entry 'Missing' tidak ditemukan."
+
+
+def test_editing_one_entry_keeps_the_other_cached_embeds(bot_commands, monkeypatch):
+    built = []
+    build_wiki_embed = commands_module.build_wiki_embed
+
+    def counting_build(entry, aliases):
+        built.append(entry['title'])
+        return build_wiki_embed(entry, aliases)
+
+    monkeypatch.setattr(commands_module, 'build_wiki_embed', counting_build)
+    ctx = FakeContext()
+    bot_commands.invoke_callback('wikiadd', ctx, 'Seer', content='divination')
+    bot_commands.invoke_callback('wikiadd', ctx, 'Clown', content='juggling')
+    for title in ('Seer', 'Clown'):
+        bot_commands.invoke_callback('wiki', ctx, title=title)
+
+    bot_commands.invoke_callback('wikiedit', ctx, 'Clown', content='more juggling')
+    for title in ('Seer', 'Clown'):
+        bot_commands.invoke_callback('wiki', ctx, title=title)
+
+    assert built == ['Seer', 'Clown', 'Clown']
+    assert ctx.sent[-1].embed.description == 'more juggling'
+
+
+def test_clusterstats_needs_manage_guild(bot_commands):
+    command = bot_commands.get_command('clusterstats')
+    ctx = FakeContext()
+    ctx.permissions = discord.Permissions(manage_messages=True)
+    with pytest.raises(commands.MissingPermissions):
+        command.checks[0](ctx)
+
+    ctx.permissions = discord.Permissions(manage_guild=True)
+    assert command.checks[0](ctx)
+    bot_commands.invoke_callback('clusterstats', ctx)
+    assert ctx.sent[-1].embed.title == "📊 Statistik Cluster"
+
+
+def test_slash_commands_sync_once_and_only_when_changed(bot_commands):
+    tree_hash = app_commands_hash(bot_commands)
+    assert bot_commands.sync_on_ready() == [tree_hash]
+    with open(APP_COMMANDS_HASH_FILE, encoding='utf-8') as f:
+        assert f.read() == tree_hash
+    # A reconnect fires on_ready again without another sync
+    assert bot_commands.sync_on_ready() == []
+
+
+def test_unchanged_slash_commands_are_not_synced_again(bot_commands):
+    with open(APP_COMMANDS_HASH_FILE, 'w', encoding='utf-8') as f:
+        f.write(app_commands_hash(bot_commands))
+    assert bot_commands.sync_on_ready() == []
+
+
+def test_changed_slash_commands_are_synced(bot_commands):
+    with open(APP_COMMANDS_HASH_FILE, 'w', encoding='utf-8') as f:
+        f.write(app_commands_hash(bot_commands))
+
+    @bot_commands.tree.command(name='extra', description="Extra")
+    async def extra(interaction: discord.Interaction):
+        pass
+
+    assert bot_commands.sync_on_ready() == [app_commands_hash(bot_commands)]
+
+
+@pytest.mark.parametrize('bot_commands', [FakeCluster([2, 3])], indirect=True)
+def test_only_the_shard_zero_worker_syncs(bot_commands):
+    assert bot_commands.sync_on_ready() == []
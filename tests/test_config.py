@@ -0,0 +1,54 @@
+import json
+import logging
+
+from bot.config import DEFAULT_COMMAND_LIMITS, BotConfig, MemberCacheSettings, parse_command_limits
+
+
+def write_config(tmp_path, data):
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps(data), encoding='utf-8')
+    return str(path)
+
+
+def test_malformed_command_limits_are_logged_and_skipped(caplog):
+    with caplog.at_level(logging.WARNING, logger='bot.config'):
+        limits = parse_command_limits({
+            'lomchar': {'user': [2, 10], 'guild': [5], 'concurrency': 'one', 'guild_concurrency': 0},
+            'lompath': {'user': ['2', 10], 'guild': None, 'burst': 3},
+            'lomfact': [1, 30],
+            'lomsearch': {'user': [True, 30], 'guild': [0, 60]},
+        }, 'config.json')
+
+    assert limits == {
+        'lomchar': {'user': [2, 10], 'guild_concurrency': 0},
+        'lompath': {'guild': None},
+        'lomsearch': {},
+    }
+    assert len(caplog.records) == 7
+    assert parse_command_limits('fast', 'config.json') == {}
+
+
+def test_config_limits_layer_over_the_defaults(tmp_path):
+    config = BotConfig(write_config(tmp_path, {
+        'command_limits': {'lomchar': {'user': [5, 10], 'guild': 'lots'}, 'lompath': 'slow'},
+        'guilds': {
+            '10': {'command_limits': {'lomchar': {'concurrency': 2, 'guild_concurrency': -1}}},
+            '20': {'command_limits': ['lomchar']},
+        },
+    }))
+
+    assert config.get_command_limits('lomchar') == {**DEFAULT_COMMAND_LIMITS['lomchar'], 'user': [5, 10]}
+    assert config.get_command_limits('lomchar', 10)['concurrency'] == 2
+    assert config.get_command_limits('lomchar', 10)['guild_concurrency'] == DEFAULT_COMMAND_LIMITS['lomchar']['guild_concurrency']
+    assert config.get_command_limits('lomchar', 20) == config.get_command_limits('lomchar')
+    assert config.get_command_limits('lompath') == DEFAULT_COMMAND_LIMITS['lompath']
+    config.close()
+
+
+def test_invalid_member_cache_settings_keep_the_defaults(caplog):
+    with caplog.at_level(logging.WARNING, logger='bot.config'):
+        settings = MemberCacheSettings.from_dict({'voice': 'yes', 'joined': False, 'joined_ttl': -5})
+
+    assert (settings.voice, settings.joined, settings.joined_ttl) == (False, False, 3600)
+    assert len(caplog.records) == 2
+    assert MemberCacheSettings.from_dict(None).joined_ttl == 3600
@@ -0,0 +1,50 @@
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+from bot.http_scheduler import MAX_RETRY_AFTER, PRIORITY_BACKGROUND, RequestScheduler, parse_retry_after
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('120', 120.0),
+    ('1.5', 1.5),
+    ('-3', 0.0),
+    (None, None),
+    ('', None),
+    ('soon', None),
+    ('inf', None),
+    ('nan', None),
+    ('1e9', MAX_RETRY_AFTER),
+])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    value = formatdate(time.time() + 60, usegmt=True)
+    assert 55 <= parse_retry_after(value) <= 60
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+
+def test_interactive_requests_give_up_at_their_deadline():
+    async def run():
+        scheduler = RequestScheduler(interactive_deadline=0.05)
+        scheduler._get_host('example.invalid').blocked_until = time.monotonic() + 60
+        started = time.monotonic()
+        result = await scheduler.fetch_text('https://example.invalid/page')
+        elapsed = time.monotonic() - started
+
+        background = asyncio.ensure_future(
+            scheduler.fetch_text('https://example.invalid/other', priority=PRIORITY_BACKGROUND)
+        )
+        await asyncio.sleep(0.1)
+        assert not background.done()
+        await scheduler.close()
+        return result, elapsed, await background
+
+    result, elapsed, background = asyncio.run(run())
+    assert result is None
+    assert elapsed < 1
+    assert background is None
@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+import time
+
+import bot.journal as journal
+from bot.journal import JournaledJsonStore, apply_record
+
+
+def open_store(tmp_path, name='data.json'):
+    store = JournaledJsonStore(str(tmp_path / name), dict)
+    store.load()
+    return store
+
+
+def test_apply_record_sets_and_deletes_leaves():
+    data = {}
+    apply_record(data, {'op': 'set', 'path': ['a', 'b'], 'value': 1})
+    apply_record(data, {'op': 'set', 'path': ['a', 'c'], 'value': 2})
+    apply_record(data, {'op': 'delete', 'path': ['a', 'b']})
+    apply_record(data, {'op': 'delete', 'path': ['missing']})
+    assert data == {'a': {'c': 2}}
+
+
+def test_changes_are_replayed_from_the_journal(tmp_path):
+    store = open_store(tmp_path)
+    store.set(['entries', 'x'], {'title': 'X'})
+    store.set(['entries', 'y'], 1)
+    store.delete(['entries', 'y'])
+    store.close()
+
+    assert not os.path.exists(tmp_path / 'data.json')
+    reopened = open_store(tmp_path)
+    assert reopened.data == {'entries': {'x': {'title': 'X'}}}
+    reopened.close()
+
+
+def test_only_the_last_pending_change_per_path_is_written(tmp_path):
+    store = open_store(tmp_path)
+    for value in range(5):
+        store.set(['counter'], value)
+    store.flush()
+    with open(store.journal_path, 'rb') as f:
+        lines = f.read().splitlines()
+    store.close()
+
+    assert [json.loads(line)['value'] for line in lines] == [4]
+
+
+def test_torn_tail_is_truncated_on_load(tmp_path):
+    store = open_store(tmp_path)
+    store.set(['a'], 1)
+    store.close()
+    good_size = os.path.getsize(store.journal_path)
+    with open(store.journal_path, 'ab') as f:
+        f.write(b'{"op":"set","path":["b"],"va')
+
+    reopened = open_store(tmp_path)
+    assert reopened.data == {'a': 1}
+    assert os.path.getsize(store.journal_path) == good_size
+    reopened.set(['c'], 3)
+    reopened.close()
+
+    assert open_store(tmp_path).data == {'a': 1, 'c': 3}
+
+
+def test_open_cuts_a_torn_tail_without_reading_data(tmp_path):
+    store = open_store(tmp_path)
+    store.set(['a'], 1)
+    store.close()
+    with open(store.journal_path, 'ab') as f:
+        f.write(b'{"op":"set"')
+
+    appender = JournaledJsonStore(store.path, dict)
+    appender.open()
+    assert appender.data is None
+    appender.set(['b'], 2)
+    appender.close()
+
+    assert open_store(tmp_path).data == {'a': 1, 'b': 2}
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, 'MIN_COMPACT_BYTES', 0)
+    store = open_store(tmp_path)
+    for i in range(20):
+        store.set(['items', str(i)], i)
+    store.flush()
+    store.compact()
+    store.set(['after'], True)
+    store.close()
+
+    with open(store.path, encoding='utf-8') as f:
+        snapshot = json.load(f)
+    assert snapshot['items'] == {str(i): i for i in range(20)}
+    assert open_store(tmp_path).data == {'items': {str(i): i for i in range(20)}, 'after': True}
+
+
+def test_reread_includes_pending_changes(tmp_path):
+    store = open_store(tmp_path)
+    store.set(['a'], 1)
+    assert store.reread() == {'a': 1}
+    store.close()
+
+
+def test_one_writer_thread_writes_behind_for_every_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, 'FLUSH_DELAY', 0.01)
+    stores = [open_store(tmp_path, f'guild{i}.json') for i in range(5)]
+    for i, store in enumerate(stores):
+        store.set(['value'], i)
+
+    deadline = time.monotonic() + 5
+    while any(os.path.getsize(store.journal_path) == 0 for store in stores) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writers = [thread for thread in threading.enumerate() if thread.name == 'journal-writer']
+    for store in stores:
+        store.close()
+
+    assert len(writers) == 1
+    assert [open_store(tmp_path, f'guild{i}.json').data for i in range(5)] == [{'value': i} for i in range(5)]
+
+
+def test_failed_write_keeps_the_changes_for_a_retry(tmp_path, monkeypatch):
+    store = open_store(tmp_path)
+    store.set(['a'], 1)
+    store.set(['kept'], True)
+
+    def failing_fsync(fd):
+        raise OSError('disk full')
+
+    real_fsync = journal.os.fsync
+    monkeypatch.setattr(journal.os, 'fsync', failing_fsync)
+    assert store.flush() is False
+    assert os.path.getsize(store.journal_path) == 0
+    # A newer change to the same path wins over the requeued one
+    store.set(['a'], 2)
+    monkeypatch.setattr(journal.os, 'fsync', real_fsync)
+    assert store.flush() is True
+    store.close()
+
+    assert open_store(tmp_path).data == {'a': 2, 'kept': True}
+
+
+def test_writer_retries_a_failed_flush(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, 'FLUSH_DELAY', 0.01)
+    store = open_store(tmp_path)
+    attempts = []
+    real_fsync = journal.os.fsync
+
+    def flaky_fsync(fd):
+        attempts.append(fd)
+        if len(attempts) < 3:
+            raise OSError('I/O error')
+        real_fsync(fd)
+
+    monkeypatch.setattr(journal.os, 'fsync', flaky_fsync)
+    store.set(['a'], 1)
+    deadline = time.monotonic() + 5
+    while os.path.getsize(store.journal_path) == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    store.close()
+
+    assert len(attempts) == 3
+    assert store.failures == 0
+    assert open_store(tmp_path).data == {'a': 1}
+
+
+def test_corrupt_middle_line_is_skipped_not_truncated(tmp_path):
+    store = open_store(tmp_path)
+    store.set(['a'], 1)
+    store.flush()
+    with open(store.journal_path, 'ab') as f:
+        f.write(b'{"op":"set","path":["x"],\xff garbage\n')
+    store.set(['b'], 2)
+    store.close()
+    size = os.path.getsize(store.journal_path)
+
+    reopened = open_store(tmp_path)
+    assert reopened.data == {'a': 1, 'b': 2}
+    assert os.path.getsize(store.journal_path) == size
+    assert os.path.exists(f'{store.journal_path}.corrupt')
+    reopened.set(['c'], 3)
+    reopened.close()
+
+    assert open_store(tmp_path).data == {'a': 1, 'b': 2, 'c': 3}
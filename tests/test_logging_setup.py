@@ -0,0 +1,106 @@
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+
+import pytest
+
+from bot.logging_setup import DEFAULT_BACKUP_COUNT, DEFAULT_MAX_BYTES, parse_module_levels, setup_logging
+
+
+@pytest.fixture
+def start_logging(tmp_path, monkeypatch):
+    """Run setup_logging writing to a scratch file; restores the root logger after."""
+    root_logger = logging.getLogger()
+    saved_handlers, saved_level = root_logger.handlers[:], root_logger.level
+    path = tmp_path / 'bot.log'
+    monkeypatch.setenv('LOG_FILE', str(path))
+    for name in ('LOG_LEVEL', 'LOG_LEVELS', 'LOG_ROTATE', 'LOG_MAX_BYTES', 'LOG_BACKUPS', 'LOG_JSON', 'LOG_COMPRESS'):
+        monkeypatch.delenv(name, raising=False)
+    listeners = []
+
+    def start():
+        listener = setup_logging()
+        listeners.append(listener)
+        return listener
+
+    start.path = path
+    yield start
+    for listener in listeners:
+        atexit.unregister(listener.stop)
+        listener.stop()
+    root_logger.handlers[:] = saved_handlers
+    root_logger.setLevel(saved_level)
+    logging.getLogger('bot.quiet').setLevel(logging.NOTSET)
+
+
+def file_handler(listener):
+    return next(h for h in listener.handlers if isinstance(h, logging.handlers.BaseRotatingHandler))
+
+
+def test_records_reach_the_file_through_the_queue(start_logging):
+    listener = start_logging()
+    root_handlers = logging.getLogger().handlers
+    assert [type(h) for h in root_handlers] == [logging.handlers.QueueHandler]
+
+    logging.getLogger('bot.test').info('queued line')
+    listener.stop()
+    listener.start()
+    assert ' - bot.test - INFO - queued line' in start_logging.path.read_text(encoding='utf-8')
+
+
+def test_levels_come_from_the_environment(start_logging, monkeypatch):
+    monkeypatch.setenv('LOG_LEVEL', 'warning')
+    monkeypatch.setenv('LOG_LEVELS', 'bot.quiet=ERROR, bot.bad=LOUD')
+    start_logging()
+    assert logging.getLogger().level == logging.WARNING
+    assert logging.getLogger('bot.quiet').level == logging.ERROR
+
+
+def test_invalid_settings_fall_back_with_a_warning(start_logging, monkeypatch):
+    monkeypatch.setenv('LOG_LEVEL', 'chatty')
+    monkeypatch.setenv('LOG_MAX_BYTES', '10MB')
+    monkeypatch.setenv('LOG_BACKUPS', '-1')
+    listener = start_logging()
+    handler = file_handler(listener)
+    assert logging.getLogger().level == logging.INFO
+    assert (handler.maxBytes, handler.backupCount) == (DEFAULT_MAX_BYTES, DEFAULT_BACKUP_COUNT)
+
+    listener.stop()
+    listener.start()
+    text = start_logging.path.read_text(encoding='utf-8')
+    assert "Ignoring invalid LOG_LEVEL 'CHATTY'" in text
+    assert "Ignoring invalid LOG_MAX_BYTES '10MB'" in text
+    assert "Ignoring invalid LOG_BACKUPS '-1'" in text
+
+
+def test_rotated_files_are_gzipped(start_logging, monkeypatch):
+    monkeypatch.setenv('LOG_MAX_BYTES', '200')
+    monkeypatch.setenv('LOG_BACKUPS', '2')
+    listener = start_logging()
+    for i in range(10):
+        logging.getLogger('bot.test').warning(f'line {i} ' + 'x' * 50)
+    listener.stop()
+    listener.start()
+
+    rotated = start_logging.path.with_name('bot.log.1.gz')
+    assert gzip.decompress(rotated.read_bytes()).decode('utf-8').count('line') >= 1
+    assert not start_logging.path.with_name('bot.log.3.gz').exists()
+
+
+def test_json_lines(start_logging, monkeypatch):
+    monkeypatch.setenv('LOG_JSON', '1')
+    listener = start_logging()
+    logging.getLogger('bot.test').error('as json')
+    listener.stop()
+    listener.start()
+
+    entry = json.loads(start_logging.path.read_text(encoding='utf-8').splitlines()[-1])
+    assert (entry['level'], entry['logger'], entry['message']) == ('ERROR', 'bot.test', 'as json')
+
+
+def test_parse_module_levels_skips_incomplete_items():
+    assert parse_module_levels('discord=warning, bot.wiki = DEBUG,broken,=INFO,') == {
+        'discord': 'WARNING', 'bot.wiki': 'DEBUG'
+    }
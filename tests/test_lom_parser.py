@@ -0,0 +1,22 @@
+from benchmarks.parser_bench import load_corpus, run
+from bot.lom_parser import CHARACTER_CLASSIFIER, PATHWAY_CLASSIFIER, parse_pathway_text
+
+
+def test_only_heading_lines_start_sections():
+    assert PATHWAY_CLASSIFIER.classify('Sequences') == 'sequences'
+    assert PATHWAY_CLASSIFIER.classify('Sequence 9: Seer') is None
+    assert CHARACTER_CLASSIFIER.classify('Pathways and Authorities') == 'pathways'
+    assert CHARACTER_CLASSIFIER.classify('Beyonder path: Seer, reaching Sequence 0.') is None
+
+
+def test_pathway_lead_is_only_a_fallback_for_general_information():
+    lead = 'The Sun pathway is one of the 22 Beyonder pathways of the world.'
+    general = 'Its Beyonders sing hymns and purify the undead with light.'
+    assert parse_pathway_text(f'{lead}\nOverview\n{general}', 'Sun')['general_information'] == general
+    assert parse_pathway_text(lead, 'Sun')['general_information'] == lead
+
+
+def test_every_corpus_field_matches():
+    rows, mismatches = run(load_corpus(), 1, False)
+    assert rows
+    assert [(record['title'], field_id) for record, field_id in mismatches] == []
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+import time
+
+import bot.lom_titles as lom_titles
+from bot.lom_titles import LoMTitleIndex, normalize_title
+
+
+def make_index(tmp_path, search_results=None):
+    index = LoMTitleIndex('https://example.invalid/api.php', None, cache_file=str(tmp_path / 'titles.json'))
+    index.built_at = time.time()
+    searches = []
+
+    async def opensearch(query):
+        searches.append(query)
+        return (search_results or {}).get(query, [])
+
+    index._opensearch = opensearch
+    index.searches = searches
+    return index
+
+
+def test_normalize_title_folds_case_diacritics_and_underscores():
+    assert normalize_title('Azík_Eggers!') == normalize_title('azik eggers') == 'azik eggers'
+
+
+def test_lookup_resolves_titles_redirects_and_typos(tmp_path):
+    index = make_index(tmp_path)
+    index.add_titles(['Klein Moretti', 'Audrey Hall', 'Seer Pathway'])
+    index.add_redirect('The Fool', 'Klein Moretti')
+
+    assert index.lookup('klein_moretti') == 'Klein Moretti'
+    assert index.lookup('the fool') == 'Klein Moretti'
+    assert index.lookup('Klien Moretti') == 'Klein Moretti'
+    assert index.lookup('Klien Moretti', fuzzy=False) is None
+    assert index.lookup('Sequence Zero') is None
+
+    # Titles added after the fuzzy index was built are found too
+    index.add_titles(['Leonard Mitchell'])
+    assert index.lookup('Leonrd Mitchell') == 'Leonard Mitchell'
+
+
+def test_search_aliases_are_learned_only_when_similar_and_never_saved(tmp_path):
+    index = make_index(tmp_path, {'klein': ['Klein Moretti'], 'blue shadow': ['Tarot Club']})
+
+    assert asyncio.run(index.resolve(['klein'])) == 'Klein Moretti'
+    assert asyncio.run(index.resolve(['blue shadow'])) == 'Tarot Club'
+    assert index.lookup('klein', fuzzy=False) == 'Klein Moretti'
+    assert index.lookup('blue shadow', fuzzy=False) is None
+
+    index._save_cache()
+    with open(index.cache_file, encoding='utf-8') as f:
+        assert json.load(f)['redirects'] == {}
+
+
+def test_misses_are_remembered_within_a_bound(tmp_path, monkeypatch):
+    monkeypatch.setattr(lom_titles, 'MISS_CACHE_SIZE', 2)
+    index = make_index(tmp_path)
+    for query in ['one', 'two', 'one', 'three']:
+        asyncio.run(index.resolve([query]))
+
+    assert index.searches == ['one', 'two', 'three']
+    assert list(index._misses) == ['two', 'three']
+
+
+def test_failed_refresh_keeps_the_old_index(tmp_path):
+    index = make_index(tmp_path)
+    index.add_titles(['Klein Moretti'])
+    built_at = index.built_at
+    pages = [
+        {'query': {'allpages': [{'title': 'Audrey Hall'}]}, 'continue': {'apcontinue': 'B', 'continue': '-||'}},
+        None,
+    ]
+
+    async def fetch_json(url, params, priority):
+        return pages.pop(0)
+
+    index.scheduler = type('Scheduler', (), {'fetch_json': staticmethod(fetch_json)})()
+    asyncio.run(index.refresh())
+
+    assert pages == []
+    assert index.lookup('Klein Moretti', fuzzy=False) == 'Klein Moretti'
+    assert index.lookup('Audrey Hall', fuzzy=False) is None
+    assert index.built_at == built_at
+    assert not os.path.exists(index.cache_file)
+
+
+def test_refresh_replaces_the_index_and_saves_it(tmp_path):
+    index = make_index(tmp_path)
+    index.add_titles(['Old Page'])
+    responses = {
+        'allpages': {'query': {'allpages': [{'title': 'Audrey Hall'}]}},
+        'generator': {'query': {'redirects': [{'from': 'Justice', 'to': 'Audrey Hall'}]}},
+    }
+
+    async def fetch_json(url, params, priority):
+        return responses['generator' if 'generator' in params else 'allpages']
+
+    index.scheduler = type('Scheduler', (), {'fetch_json': staticmethod(fetch_json)})()
+    asyncio.run(index.refresh())
+
+    assert index.lookup('Old Page', fuzzy=False) is None
+    assert index.lookup('justice') == 'Audrey Hall'
+    with open(index.cache_file, encoding='utf-8') as f:
+        assert json.load(f)['redirects'] == {'justice': 'Audrey Hall'}
+
+
+def test_complete_lists_titles_by_prefix(tmp_path):
+    index = make_index(tmp_path)
+    index.add_titles(['Klein Moretti', 'Klein (disambiguation)', 'Audrey Hall'])
+
+    assert index.complete('klein') == ['Klein (disambiguation)', 'Klein Moretti']
+    assert index.complete('KLEIN_M') == ['Klein Moretti']
+    assert index.complete('klein', limit=1) == ['Klein (disambiguation)']
+    index.add_titles(['Kleinburg'])
+    assert index.complete('kleinb') == ['Kleinburg']
+    assert index.complete('zzz') == []
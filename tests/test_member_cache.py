@@ -0,0 +1,92 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+from bot.config import MemberCacheSettings
+from bot.member_cache import MemberCacheTrimmer, member_cache_options
+
+NOW = datetime.now(timezone.utc)
+
+
+class FakeMember:
+    def __init__(self, member_id, joined_ago=None, in_voice=False):
+        self.id = member_id
+        self.joined_at = None if joined_ago is None else NOW - timedelta(seconds=joined_ago)
+        self.voice = object() if in_voice else None
+
+
+class FakeGuild:
+    def __init__(self, members):
+        self._members = members
+
+    @property
+    def members(self):
+        # A fresh list, as discord.py's Guild.members is
+        return list(self._members)
+
+    def _remove_member(self, member):
+        self._members.remove(member)
+
+
+class FakeBot:
+    def __init__(self, guilds, own_id=1):
+        self.guilds = guilds
+        self.user = type('User', (), {'id': own_id})()
+
+
+def settings(**overrides):
+    return MemberCacheSettings.from_dict(overrides)
+
+
+def member_ids(guild):
+    return [member.id for member in guild.members]
+
+
+def test_sweep_drops_members_past_the_ttl():
+    guild = FakeGuild([
+        FakeMember(1, joined_ago=99999),
+        FakeMember(2, joined_ago=60),
+        FakeMember(3, joined_ago=7200),
+        FakeMember(4),
+    ])
+    trimmer = MemberCacheTrimmer(FakeBot([guild]), lambda: settings(joined_ttl=3600))
+
+    assert trimmer.sweep() == 2
+    assert member_ids(guild) == [1, 2]
+    assert trimmer.stats() == {'cached': 2, 'dropped': 2}
+
+
+def test_members_in_voice_are_kept_only_when_voice_is_cached():
+    guild = FakeGuild([FakeMember(2, joined_ago=7200, in_voice=True), FakeMember(3, joined_ago=7200, in_voice=True)])
+    voice = settings(voice=True, joined_ttl=3600)
+    trimmer = MemberCacheTrimmer(FakeBot([guild]), lambda: voice)
+    assert trimmer.sweep() == 0
+
+    voice = settings(voice=False, joined_ttl=3600)
+    assert trimmer.sweep() == 2
+    assert guild.members == []
+
+
+def test_zero_ttl_turns_trimming_off():
+    guild = FakeGuild([FakeMember(2, joined_ago=99999)])
+    trimmer = MemberCacheTrimmer(FakeBot([guild]), lambda: settings(joined_ttl=0))
+    assert trimmer.sweep() == 0
+    assert member_ids(guild) == [2]
+
+
+def test_trimming_is_off_without_private_eviction(monkeypatch, caplog):
+    monkeypatch.delattr(discord.Guild, '_remove_member')
+    guild = FakeGuild([FakeMember(2, joined_ago=99999)])
+    with caplog.at_level(logging.WARNING, logger='bot.member_cache'):
+        trimmer = MemberCacheTrimmer(FakeBot([guild]), lambda: settings())
+    assert trimmer.sweep() == 0
+    assert member_ids(guild) == [2]
+    assert len(caplog.records) == 1
+
+
+def test_settings_become_bot_options():
+    options = member_cache_options(settings(voice=True, chunk_guilds_at_startup=True))
+    assert options['member_cache_flags'].voice
+    assert options['member_cache_flags'].joined
+    assert options['chunk_guilds_at_startup'] is True
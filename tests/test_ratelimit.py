@@ -0,0 +1,115 @@
+import pytest
+
+import bot.ratelimit as ratelimit
+from bot.ratelimit import CommandLimiter, Cooldown, rejection_message
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, 'monotonic', clock)
+    return clock
+
+
+def test_cooldown_allows_a_burst_then_refills(clock):
+    cooldown = Cooldown(2, 10.0)
+    for _ in range(2):
+        assert cooldown.retry_after(clock.now) == 0
+        cooldown.take()
+    assert cooldown.retry_after(clock.now) == pytest.approx(5.0)
+
+    clock.now += 5.0
+    assert cooldown.retry_after(clock.now) == 0
+    assert not cooldown.is_idle(clock.now)
+    clock.now += 100.0
+    assert cooldown.is_idle(clock.now)
+    assert cooldown.tokens == 2
+
+
+def limiter_with(limits):
+    return CommandLimiter(lambda command, guild_id: limits)
+
+
+def test_user_cooldown_rejects_with_retry_after(clock):
+    limiter = limiter_with({'user': [1, 30]})
+    with limiter.use('lomchar', 1, 10) as rejection:
+        assert rejection is None
+    with limiter.use('lomchar', 1, 10) as rejection:
+        assert rejection.reason == 'cooldown'
+        assert rejection.scope == 'user'
+        assert rejection.retry_after == pytest.approx(30.0)
+
+    # Other users and other commands have their own buckets
+    with limiter.use('lomchar', 2, 10) as rejection:
+        assert rejection is None
+    with limiter.use('lompath', 1, 10) as rejection:
+        assert rejection is None
+
+    clock.now += 30.0
+    with limiter.use('lomchar', 1, 10) as rejection:
+        assert rejection is None
+
+
+def test_guild_cooldown_is_shared_and_takes_nothing_when_rejected(clock):
+    limiter = limiter_with({'user': [1, 60], 'guild': [2, 60]})
+    assert limiter.acquire('lomfact', 1, 10)[1] is None
+    assert limiter.acquire('lomfact', 2, 10)[1] is None
+    _, rejection = limiter.acquire('lomfact', 3, 10)
+    assert (rejection.reason, rejection.scope) == ('cooldown', 'guild')
+
+    # User 3 was refused by the guild bucket, so their own is still full
+    clock.now += 30.0
+    assert limiter.acquire('lomfact', 3, 10)[1] is None
+
+
+def test_concurrency_is_held_until_the_block_exits(clock):
+    limiter = limiter_with({'concurrency': 1, 'guild_concurrency': 2})
+    with limiter.use('lomsearch', 1, 10) as first:
+        assert first is None
+        with limiter.use('lomsearch', 1, 10) as second:
+            assert (second.reason, second.scope) == ('concurrency', 'user')
+        with limiter.use('lomsearch', 2, 10) as third:
+            assert third is None
+            with limiter.use('lomsearch', 3, 10) as fourth:
+                assert (fourth.reason, fourth.scope) == ('concurrency', 'guild')
+    assert limiter.stats()['running'] == 0
+    with limiter.use('lomsearch', 1, 10) as again:
+        assert again is None
+
+
+def test_direct_messages_skip_guild_limits(clock):
+    limiter = limiter_with({'guild': [1, 60], 'guild_concurrency': 1})
+    for _ in range(3):
+        assert limiter.acquire('lomchar', 1, None)[1] is None
+
+
+def test_changed_settings_apply_at_once(clock):
+    limits = {'user': [1, 60]}
+    limiter = CommandLimiter(lambda command, guild_id: limits)
+    limiter.acquire('lomchar', 1, 10)
+    assert limiter.acquire('lomchar', 1, 10)[1] is not None
+    limits['user'] = [5, 60]
+    assert limiter.acquire('lomchar', 1, 10)[1] is None
+
+
+def test_idle_buckets_are_pruned(clock, monkeypatch):
+    monkeypatch.setattr(ratelimit, 'MAX_IDLE_BUCKETS', 3)
+    limiter = limiter_with({'user': [1, 10]})
+    for user_id in range(3):
+        limiter.acquire('lomchar', user_id, None)
+    clock.now += 10.0
+    limiter.acquire('lomchar', 99, None)
+    assert limiter.stats()['buckets'] == 1
+
+
+def test_rejection_messages_mention_the_wait():
+    message = rejection_message(ratelimit.Rejection('cooldown', 'user', 12.4))
+    assert '12' in message
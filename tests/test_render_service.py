@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener
+
+import pytest
+
+import bot.render_service as render_service
+from bot.render_service import RenderClient, RenderService
+
+
+def fake_render(avatar_bytes, display_name, guild_name):
+    if display_name == 'broken':
+        raise ValueError('cannot draw')
+    if display_name == 'slow':
+        time.sleep(0.5)
+    time.sleep(0.05)
+    return avatar_bytes + f' {display_name}@{guild_name}'.encode()
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """A RenderService serving on a Unix socket, with renders run on threads."""
+    monkeypatch.delenv('RENDER_AUTHKEY', raising=False)
+    monkeypatch.setattr(render_service, '_render', fake_render)
+    service = RenderService(str(tmp_path / 'render.sock'))
+    service.pool = ThreadPoolExecutor(8)
+    service.listener = Listener(service.address)
+    service.accepted = 0
+
+    def accept():
+        while True:
+            try:
+                conn = service.listener.accept()
+            except OSError:
+                return
+            service.accepted += 1
+            threading.Thread(target=service._serve, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield service
+    service.listener.close()
+    service.pool.shutdown()
+
+
+def test_renders_reuse_one_connection(service):
+    client = RenderClient(service.address)
+
+    async def run():
+        return [await client.render(b'png', name, 'Tarot Club') for name in ('Klein', 'Audrey')]
+
+    assert asyncio.run(run()) == [b'png Klein@Tarot Club', b'png Audrey@Tarot Club']
+    assert service.accepted == 1
+    assert len(client._idle) == 1
+
+
+def test_idle_connections_are_bounded(service):
+    client = RenderClient(service.address)
+
+    async def run():
+        return await asyncio.gather(*(client.render(b'png', f'member {i}', 'guild') for i in range(8)))
+
+    assert len(asyncio.run(run())) == 8
+    assert service.accepted > render_service.MAX_IDLE_CONNECTIONS
+    assert len(client._idle) == render_service.MAX_IDLE_CONNECTIONS
+
+
+def test_failed_renders_return_none_and_keep_the_connection(service):
+    client = RenderClient(service.address)
+    assert asyncio.run(client.render(b'png', 'broken', 'guild')) is None
+    assert asyncio.run(client.render(b'png', 'Klein', 'guild')) == b'png Klein@guild'
+    assert service.accepted == 1
+
+
+class StaleConnection:
+    def __init__(self):
+        self.closed = False
+
+    def send(self, message):
+        raise EOFError
+
+    def close(self):
+        self.closed = True
+
+
+def test_stale_idle_connection_is_replaced(service):
+    client = RenderClient(service.address)
+    stale = StaleConnection()
+    client._idle.append(stale)
+
+    assert asyncio.run(client.render(b'png', 'Klein', 'guild')) == b'png Klein@guild'
+    assert stale.closed
+    assert stale not in client._idle
+
+
+def test_timeout_drops_the_connection(service, monkeypatch):
+    monkeypatch.setattr(render_service, 'RENDER_TIMEOUT', 0.1)
+    client = RenderClient(service.address)
+    assert asyncio.run(client.render(b'png', 'slow', 'guild')) is None
+    assert client._idle == []
+
+
+def test_unreachable_service_returns_none(tmp_path):
+    client = RenderClient(str(tmp_path / 'missing.sock'))
+    assert asyncio.run(client.render(b'png', 'Klein', 'guild')) is None
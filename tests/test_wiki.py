@@ -0,0 +1,194 @@
+import asyncio
+import os
+import threading
+
+import bot.wiki as wiki_module
+from bot.wiki import WikiSystem
+from bot.wiki_history import RevisionHistory
+from bot.wiki_storage import JsonWikiStorage
+
+GUILD = 1
+
+
+def make_wiki(tmp_path):
+    return WikiSystem(
+        storage=JsonWikiStorage(str(tmp_path / 'wiki')),
+        history=RevisionHistory(str(tmp_path / 'history')),
+        snapshot_dir=str(tmp_path / 'snapshots')
+    )
+
+
+def test_list_page_walks_every_entry_once(tmp_path):
+    wiki = make_wiki(tmp_path)
+    for i in range(7):
+        wiki.add_entry(f'Entry {i}', f'body {i}', 1, GUILD)
+
+    titles = []
+    cursor = None
+    while True:
+        entries, cursor, total = wiki.list_page(GUILD, 'title', cursor, limit=3)
+        titles.extend(entry['title'] for entry in entries)
+        if cursor is None:
+            break
+    wiki.close()
+
+    assert total == 7
+    assert titles == [f'Entry {i}' for i in range(7)]
+
+
+def test_list_page_cursor_survives_edits_before_it(tmp_path):
+    wiki = make_wiki(tmp_path)
+    for i in range(6):
+        wiki.add_entry(f'Entry {i}', f'body {i}', 1, GUILD)
+
+    entries, cursor, _ = wiki.list_page(GUILD, 'title', None, limit=3)
+    wiki.delete_entry('Entry 0', GUILD)
+    entries, cursor, _ = wiki.list_page(GUILD, 'title', cursor, limit=3)
+    wiki.close()
+
+    assert [entry['title'] for entry in entries] == ['Entry 3', 'Entry 4', 'Entry 5']
+    assert cursor is None
+
+
+def test_evicted_partitions_unload_in_the_background_and_reload(tmp_path, monkeypatch):
+    wiki = make_wiki(tmp_path)
+    for guild_id in range(3):
+        for i in range(10):
+            wiki.add_entry(f'Entry {i}', f'guild {guild_id} body {i}', 1, guild_id)
+
+    monkeypatch.setattr(wiki_module, 'PARTITION_MEMORY_BUDGET', 0)
+    wiki._evict()
+    assert wiki.partition_stats()['resident'] == 0
+
+    # Reusing a guild right away waits for its unload to finish
+    assert wiki.get_entry('Entry 3', 0)['content'] == 'guild 0 body 3'
+    wiki.close()
+    assert wiki.partition_stats()['unloading'] == 0
+    assert sorted(os.listdir(tmp_path / 'snapshots')) == ['0.snap', '1.snap', '2.snap']
+
+    wiki = make_wiki(tmp_path)
+    for guild_id in range(3):
+        assert wiki.get_entry('Entry 9', guild_id)['content'] == f'guild {guild_id} body 9'
+    wiki.close()
+
+
+def test_partition_size_counts_built_indexes(tmp_path):
+    wiki = make_wiki(tmp_path)
+    for i in range(10):
+        wiki.add_entry(f'Entry {i}', 'some words to index ' * 5, 1, GUILD)
+    partition = wiki._partition(GUILD)
+    records_only = partition.size
+
+    wiki.search_entries('words', GUILD)
+    with_search = partition.size
+    wiki.suggest_titles('Entyr', GUILD)
+    wiki.list_page(GUILD, 'title')
+    wiki.close()
+
+    assert records_only < with_search < partition.size
+
+
+def test_ready_waits_for_an_unload_without_blocking_the_loop(tmp_path, monkeypatch):
+    wiki = make_wiki(tmp_path)
+    wiki.add_entry('Entry', 'body', 1, GUILD)
+    release = threading.Event()
+    finish_unload = wiki._finish_unload
+
+    def slow_finish(*args):
+        release.wait(5)
+        finish_unload(*args)
+
+    monkeypatch.setattr(wiki, '_finish_unload', slow_finish)
+    wiki._unload(str(GUILD))
+
+    async def run():
+        ticks = 0
+        waiter = asyncio.ensure_future(wiki.ready(GUILD))
+        while not waiter.done():
+            ticks += 1
+            if ticks == 5:
+                release.set()
+            await asyncio.sleep(0.01)
+        return ticks
+
+    assert asyncio.run(run()) >= 5
+    assert wiki.partition_stats()['unloading'] == 0
+    assert wiki.get_entry('Entry', GUILD)['content'] == 'body'
+    wiki.close()
+
+
+def test_entry_version_changes_only_with_its_own_entry(tmp_path):
+    wiki = make_wiki(tmp_path)
+    wiki.add_entry('Seer', 'divination', 1, GUILD)
+    wiki.add_entry('Clown', 'juggling', 1, GUILD)
+    seer = wiki.entry_version('Seer', GUILD)
+    clown = wiki.entry_version('Clown', GUILD)
+
+    wiki.edit_entry('Clown', 'more juggling', 1, GUILD)
+    wiki.add_alias('joker', 'Clown', GUILD)
+    assert wiki.entry_version('Seer', GUILD) == seer
+    assert wiki.entry_version('Clown', GUILD) != clown
+
+    # The rendering lists aliases, so adding one changes the version
+    wiki.add_alias('sequence 9', 'Seer', GUILD)
+    assert wiki.entry_version('Seer', GUILD) != seer
+    assert wiki.entry_version('sequence 9', GUILD) == wiki.entry_version('Seer', GUILD)
+    seer = wiki.entry_version('Seer', GUILD)
+    wiki.edit_entry('Seer', 'divination and more', 1, GUILD)
+    assert wiki.entry_version('Seer', GUILD) != seer
+    assert wiki.entry_version('Missing', GUILD) is None
+    wiki.close()
+
+
+def test_reverse_alias_index_follows_alias_changes(tmp_path):
+    wiki = make_wiki(tmp_path)
+    wiki.add_entry('Seer', 'divination', 1, GUILD)
+    wiki.add_entry('Clown', 'juggling', 1, GUILD)
+    assert wiki.add_aliases(['Fool', 'Klein', 'clown'], 'Seer', GUILD) == 2
+    assert wiki.get_aliases('fool', GUILD) == ['fool', 'klein']
+
+    # Re-pointing an alias moves it between targets
+    wiki.add_alias('klein', 'Clown', GUILD)
+    assert wiki.get_aliases('Seer', GUILD) == ['fool']
+    assert wiki.get_aliases('Clown', GUILD) == ['klein']
+
+    wiki.rename_entry('Seer', 'Mr. Fool', GUILD)
+    assert wiki.get_aliases('Mr. Fool', GUILD) == ['fool']
+    assert wiki.get_aliases('Seer', GUILD) == []
+
+    wiki.delete_entry('Clown', GUILD)
+    partition = wiki._partition(GUILD)
+    assert 'clown' not in partition.alias_targets
+    assert wiki.get_entry('klein', GUILD) is None
+    wiki.remove_aliases(['fool'], GUILD)
+    assert partition.alias_targets == {}
+    wiki.close()
+
+
+def test_reverse_alias_index_is_rebuilt_on_load(tmp_path):
+    wiki = make_wiki(tmp_path)
+    wiki.add_entry('Seer', 'divination', 1, GUILD)
+    wiki.add_aliases(['fool', 'klein'], 'Seer', GUILD)
+    wiki.close()
+
+    wiki = make_wiki(tmp_path)
+    assert wiki.get_aliases('klein', GUILD) == ['fool', 'klein']
+    wiki.close()
+
+
+def test_complete_titles_by_prefix_then_typo(tmp_path, monkeypatch):
+    wiki = make_wiki(tmp_path)
+    for title in ('Seer', 'Sea God', 'Secrets Suppliant', 'Clown', 'Spectator'):
+        wiki.add_entry(title, 'body', 1, GUILD)
+
+    assert wiki.complete_titles('se', GUILD) == ['Sea God', 'Secrets Suppliant', 'Seer']
+    assert wiki.complete_titles('SE', GUILD, limit=2) == ['Sea God', 'Secrets Suppliant']
+    # Entries added after the index was built complete too
+    wiki.add_entry('Sealed Artifact', 'body', 1, GUILD)
+    assert wiki.complete_titles('seal', GUILD)[0] == 'Sealed Artifact'
+    assert wiki.complete_titles('Spectatr', GUILD)[0] == 'Spectator'
+
+    monkeypatch.setattr(wiki_module, 'AUTOCOMPLETE_FUZZY_MAX_TITLES', 3)
+    assert wiki.complete_titles('Spectatr', GUILD) == []
+    assert wiki.complete_titles('se', 99) == []
+    wiki.close()
@@ -0,0 +1,129 @@
+import os
+import threading
+
+import pytest
+
+import bot.wiki_history as wiki_history
+from bot.wiki_history import SNAPSHOT_INTERVAL, RevisionHistory, apply_delta, make_delta
+
+GUILD = '1'
+
+
+@pytest.mark.parametrize('old, new', [
+    ('', 'fresh text'),
+    ('the grey fog', ''),
+    ('Klein is a Seer.', 'Klein is the Fool, once a Seer.'),
+    ('line one\nline two\n', 'line zero\nline one\nline two\nline three\n'),
+    ('  spaced   out  ', 'spaced out'),
+])
+def test_delta_roundtrip(old, new):
+    assert apply_delta(old, make_delta(old, new)) == new
+
+
+def test_delta_copies_unchanged_ranges():
+    old = 'a b c d e f g h'
+    delta = make_delta(old, old + ' i')
+    assert delta[0] == [0, len(old.split(' ')) * 2 - 1]
+    assert delta[-1] == ' i'
+
+
+def record_edits(history, versions, key='page'):
+    for rev, (old, new) in enumerate(zip(versions, versions[1:])):
+        history.record_edit(GUILD, key, rev, old, new, author_id=rev)
+
+
+def test_every_revision_is_rebuilt(tmp_path):
+    history = RevisionHistory(str(tmp_path))
+    versions = [f'version {i}: ' + 'shared text ' * 20 + str(i) for i in range(SNAPSHOT_INTERVAL * 2 + 3)]
+    record_edits(history, versions)
+
+    revisions = history.revisions(GUILD, 'page')
+    assert [r.rev for r in revisions] == list(range(len(versions)))
+    assert {r.op for r in revisions} == {'full', 'delta'}
+    for rev, content in enumerate(versions):
+        assert history.get(GUILD, 'page', rev) == content
+
+    # Reading back from a fresh index gives the same result
+    history.flush()
+    reopened = RevisionHistory(str(tmp_path))
+    assert reopened.get(GUILD, 'page', len(versions) - 1) == versions[-1]
+
+
+def test_full_copies_bound_the_delta_chain(tmp_path):
+    history = RevisionHistory(str(tmp_path))
+    versions = ['text ' * 50 + str(i) for i in range(SNAPSHOT_INTERVAL * 3)]
+    record_edits(history, versions)
+
+    chain = 0
+    for revision in history.revisions(GUILD, 'page'):
+        chain = 0 if revision.op == 'full' else chain + 1
+        assert chain < SNAPSHOT_INTERVAL
+
+
+def test_rename_and_purge(tmp_path):
+    history = RevisionHistory(str(tmp_path))
+    record_edits(history, ['one', 'two'])
+    history.rename(GUILD, 'page', 'renamed')
+    assert history.revisions(GUILD, 'page') == []
+    assert history.get(GUILD, 'renamed', 0) == 'one'
+
+    history.purge(GUILD, 'renamed')
+    history.flush()
+    assert RevisionHistory(str(tmp_path)).revisions(GUILD, 'renamed') == []
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    history = RevisionHistory(str(tmp_path))
+    record_edits(history, ['one', 'two'])
+    history.flush()
+    path = os.path.join(str(tmp_path), f'{GUILD}.history')
+    good_size = os.path.getsize(path)
+    with open(path, 'ab') as f:
+        f.write(b'\x40\x00\x00\x00partial')
+
+    reopened = RevisionHistory(str(tmp_path))
+    assert reopened.get(GUILD, 'page', 1) == 'two'
+    assert os.path.getsize(path) == good_size
+
+
+def test_writes_are_fsynced_off_the_caller_thread(tmp_path, monkeypatch):
+    threads = []
+    real_fsync = wiki_history.os.fsync
+
+    def fsync(fd):
+        threads.append(threading.current_thread().name)
+        real_fsync(fd)
+
+    monkeypatch.setattr(wiki_history.os, 'fsync', fsync)
+    history = RevisionHistory(str(tmp_path))
+    record_edits(history, ['one', 'two'])
+    # Queued records read back before they reach the disk
+    assert history.get(GUILD, 'page', 1) == 'two'
+    history.close()
+
+    assert len(threads) == 2
+    assert all(name.startswith('wiki-history') for name in threads)
+
+
+def test_purged_chains_are_compacted_away(tmp_path, monkeypatch):
+    monkeypatch.setattr(wiki_history, 'HISTORY_COMPACT_BYTES', 0)
+    history = RevisionHistory(str(tmp_path))
+    record_edits(history, [f'gone {i} ' * 50 for i in range(5)], key='gone')
+    record_edits(history, ['kept one', 'kept two'], key='old name')
+    history.rename(GUILD, 'old name', 'kept')
+    history.purge(GUILD, 'gone')
+    path = os.path.join(str(tmp_path), f'{GUILD}.history')
+    history.flush()
+    size = os.path.getsize(path)
+
+    history.drop_guild(GUILD)
+    history.flush()
+    assert os.path.getsize(path) < size
+    assert history.revisions(GUILD, 'gone') == []
+    assert history.get(GUILD, 'kept', 0) == 'kept one'
+    history.close()
+
+    reopened = RevisionHistory(str(tmp_path))
+    assert reopened.get(GUILD, 'kept', 1) == 'kept two'
+    assert reopened.revisions(GUILD, 'old name') == []
+    reopened.close()
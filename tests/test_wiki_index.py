@@ -0,0 +1,99 @@
+import bot.wiki_index as wiki_index
+from bot.wiki_index import SearchIndex, SortedIndex, highlight_snippet, tokenize
+
+
+def build_index(entries):
+    index = SearchIndex()
+    for key, (title, content) in entries.items():
+        index.add(key, title, content)
+    return index
+
+
+def keys(results):
+    return [key for key, _, _ in results]
+
+
+def test_tokenize_folds_case_and_drops_punctuation():
+    assert tokenize('The Fool, Klein-Moretti!') == ['the', 'fool', 'klein', 'moretti']
+
+
+def test_title_matches_outrank_content_matches():
+    index = build_index({
+        'seer': ('Seer', 'The first sequence of the Fool pathway.'),
+        'klein': ('Klein Moretti', 'Klein became a Seer in Tingen.'),
+    })
+    results = index.search('seer')
+    assert keys(results) == ['seer', 'klein']
+    assert results[0][2] is True
+
+
+def test_rare_terms_weigh_more_than_common_ones():
+    index = build_index({
+        'a': ('A', 'beyonder beyonder beyonder'),
+        'b': ('B', 'beyonder potion'),
+        'c': ('C', 'beyonder'),
+        'd': ('D', 'beyonder'),
+    })
+    # Every entry mentions "beyonder", so only "potion" tells them apart
+    assert keys(index.search('beyonder potion')) == ['b']
+    assert keys(index.search('potion beyonder')) == ['b']
+
+
+def test_every_word_must_match_and_the_last_one_may_be_a_prefix():
+    index = build_index({
+        'tarot': ('Tarot Club', 'A secret gathering above the grey fog.'),
+        'fog': ('Grey Fog', 'The space above the grey fog.'),
+    })
+    assert set(keys(index.search('grey fo'))) == {'tarot', 'fog'}
+    assert keys(index.search('secret gath')) == ['tarot']
+    assert index.search('gath secret') == []
+
+
+def test_removed_and_replaced_entries_leave_no_postings():
+    index = build_index({'x': ('X', 'apple banana'), 'y': ('Y', 'banana')})
+    index.add('x', 'X', 'cherry')
+    index.remove('y')
+    assert index.search('banana') == []
+    assert keys(index.search('cherry')) == ['x']
+    assert 'apple' not in index.postings
+    assert index.posting_count == 2
+    assert index.sorted_terms == sorted(index.postings)
+
+
+def test_common_terms_search_through_champion_lists(monkeypatch):
+    monkeypatch.setattr(wiki_index, 'CHAMPION_THRESHOLD', 10)
+    monkeypatch.setattr(wiki_index, 'CHAMPION_SIZE', 4)
+    index = build_index({f'e{i}': (f'E{i}', 'word ' * (1 if i else 20)) for i in range(30)})
+    results = index.search('word', limit=3)
+    assert len(results) == 3
+    assert results[0][0] == 'e0'
+
+
+def test_highlight_snippet_bolds_matches_around_the_first_one():
+    text = 'x ' * 100 + 'the Fool pathway'
+    snippet = highlight_snippet(text, 'fool', length=40)
+    assert snippet.startswith('...')
+    assert '**Fool**' in snippet
+
+
+def test_sorted_index_pages_follow_the_cursor():
+    index = SortedIndex()
+    for key in ['d', 'b', 'e', 'a', 'c']:
+        index.add((key,))
+
+    first = index.page(None, 2)
+    second = index.page(first[-1], 2)
+    third = index.page(second[-1], 2)
+    assert (first, second, third) == ([('a',), ('b',)], [('c',), ('d',)], [('e',)])
+
+    # An item removed before the cursor does not shift the next page
+    index.remove(('a',))
+    assert index.page(first[-1], 2) == [('c',), ('d',)]
+
+
+def test_sorted_index_prefixed_stops_at_the_first_mismatch():
+    index = SortedIndex()
+    for key in ['klein', 'klein moretti', 'kleine', 'leonard']:
+        index.add((key,))
+    assert index.prefixed('klein', 10) == [('klein',), ('klein moretti',), ('kleine',)]
+    assert index.prefixed('x', 10) == []
@@ -0,0 +1,107 @@
+import asyncio
+import csv
+import gzip
+import json
+
+import pytest
+
+from bot.wiki import WikiSystem
+from bot.wiki_history import RevisionHistory
+from bot.wiki_io import CSV_FIELD_SIZE_LIMIT, export_guild, import_file, import_file_async
+from bot.wiki_storage import JsonWikiStorage
+
+GUILD = 1
+
+
+def make_wiki(tmp_path, name='wiki'):
+    return WikiSystem(
+        storage=JsonWikiStorage(str(tmp_path / name)),
+        history=RevisionHistory(str(tmp_path / f'{name}-history')),
+        snapshot_dir=str(tmp_path / f'{name}-snapshots')
+    )
+
+
+def fill(wiki):
+    wiki.add_entry('Seer', 'Sequence 9, "divination", and a comma.', 7, GUILD)
+    wiki.add_entry('Clown', 'Line one\nline two', 8, GUILD)
+    wiki.add_aliases(['sequence 9', 'the seer'], 'Seer', GUILD)
+
+
+@pytest.mark.parametrize('name', ['wiki.jsonl', 'wiki.csv', 'wiki.csv.gz', 'wiki.jsonl.gz'])
+def test_export_then_import_gives_the_same_wiki(tmp_path, name):
+    source = make_wiki(tmp_path, 'source')
+    fill(source)
+    path = str(tmp_path / name)
+    assert export_guild(source, GUILD, path) == 2
+
+    target = make_wiki(tmp_path, 'target')
+    assert import_file(target, path, GUILD) == (2, 0)
+    for title in ('Seer', 'Clown'):
+        exported = source.get_entry(title, GUILD)
+        imported = target.get_entry(title, GUILD)
+        assert {k: imported[k] for k in ('title', 'content', 'author_id', 'created_at', 'edit_count')} == \
+            {k: exported[k] for k in ('title', 'content', 'author_id', 'created_at', 'edit_count')}
+    assert target.get_entry('the seer', GUILD)['title'] == 'Seer'
+    source.close()
+    target.close()
+
+
+def test_malformed_lines_and_rows_are_skipped(tmp_path):
+    jsonl = tmp_path / 'wiki.jsonl'
+    jsonl.write_text('\n'.join([
+        json.dumps({'title': 'Seer', 'content': 'ok'}),
+        '{"title": "Broken",',
+        json.dumps(['not', 'an', 'object']),
+        json.dumps({'title': '', 'content': 'no title'}),
+        json.dumps({'title': 'No content'}),
+        json.dumps({'title': 'Bad author', 'content': 'x', 'author_id': 'someone'}),
+        json.dumps({'title': 'seer', 'content': 'duplicate in the same file'}),
+        '',
+    ]), encoding='utf-8')
+    rows = tmp_path / 'wiki.csv'
+    with open(rows, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['title', 'content', 'edit_count', 'aliases'])
+        writer.writerow(['Clown', 'ok', '1', 'joker|'])
+        writer.writerow(['Sailor', 'bad count', 'many', ''])
+        writer.writerow(['Short row'])
+
+    wiki = make_wiki(tmp_path)
+    assert import_file(wiki, str(jsonl), GUILD) == (1, 6)
+    assert import_file(wiki, str(rows), GUILD) == (1, 2)
+    assert wiki.get_entry('joker', GUILD)['title'] == 'Clown'
+    # Existing titles are only replaced when asked to
+    assert import_file(wiki, str(jsonl), GUILD, overwrite=True) == (1, 6)
+    wiki.close()
+
+
+def test_long_csv_fields_fit_under_the_limit(tmp_path):
+    path = tmp_path / 'wiki.csv.gz'
+    content = 'x' * (200 * 1024)
+    with gzip.open(path, 'wt', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerows([['title', 'content'], ['Long', content]])
+
+    wiki = make_wiki(tmp_path)
+    assert import_file(wiki, str(path), GUILD) == (1, 0)
+    assert wiki.get_entry('Long', GUILD)['content'] == content
+    assert csv.field_size_limit() == CSV_FIELD_SIZE_LIMIT
+    wiki.close()
+
+
+def test_async_import_rebuilds_the_indexes_once_at_the_end(tmp_path):
+    path = tmp_path / 'wiki.jsonl'
+    path.write_text('\n'.join(
+        json.dumps({'title': f'Entry {i}', 'content': f'body number {i}', 'aliases': [f'alias {i}']})
+        for i in range(25)
+    ), encoding='utf-8')
+    wiki = make_wiki(tmp_path)
+
+    assert asyncio.run(import_file_async(wiki, str(path), GUILD, batch_size=10)) == (25, 0)
+    assert wiki.partition_stats()['indexed'] == 1
+    assert wiki.search_entries('number 7', GUILD)[0]['title'] == 'Entry 7'
+    assert wiki.get_entry('alias 12', GUILD)['title'] == 'Entry 12'
+    wiki.close()
+
+    reopened = make_wiki(tmp_path)
+    assert reopened.get_entry('Entry 24', GUILD)['content'] == 'body number 24'
+    reopened.close()
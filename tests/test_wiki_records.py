@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+import bot.wiki_records as wiki_records
+from bot.wiki import WikiSystem
+from bot.wiki_history import RevisionHistory
+from bot.wiki_records import ContentStore, make_preview, to_isoformat, to_timestamp
+from bot.wiki_storage import JsonWikiStorage
+
+GUILD = '1'
+
+
+def test_timestamps_roundtrip_and_bad_values_become_zero():
+    assert to_isoformat(to_timestamp('2024-05-01T12:30:00')) == '2024-05-01T12:30:00'
+    assert to_timestamp(1714566600.7) == 1714566600
+    assert to_timestamp(None) == 0
+    assert to_timestamp('not a date') == 0
+
+
+def test_preview_is_cut_to_length():
+    assert make_preview('short') == 'short'
+    assert make_preview('x' * 80) == 'x' * wiki_records.PREVIEW_LENGTH + '...'
+
+
+def test_bodies_roundtrip_through_the_blob_file(tmp_path):
+    contents = ContentStore(str(tmp_path), cache_size=0)
+    bodies = {f'entry {i}': f'body {i} ' * (i + 1) for i in range(5)}
+    records = {}
+    for key, body in bodies.items():
+        offset, length = contents.put(GUILD, key, body)
+        records[key] = wiki_records.EntryRecord(key, None, 0, 0, 0, offset, length, make_preview(body))
+
+    assert os.path.exists(tmp_path / f'{GUILD}.blob')
+    for key, body in bodies.items():
+        assert contents.get(GUILD, key, records[key]) == body
+    assert contents.cached_count() == 0
+
+    contents.drop_guild(GUILD)
+    assert not os.path.exists(tmp_path / f'{GUILD}.blob')
+    contents.close()
+
+
+def test_body_cache_is_bounded_and_skipped_for_scans(tmp_path):
+    contents = ContentStore(str(tmp_path), cache_size=2)
+    records = {}
+    for key in ('a', 'b', 'c'):
+        offset, length = contents.put(GUILD, key, f'body {key}')
+        records[key] = wiki_records.EntryRecord(key, None, 0, 0, 0, offset, length, '')
+    assert contents.cached_count() == 2
+
+    contents.get(GUILD, 'a', records['a'], cache=False)
+    assert contents.cached_count() == 2
+    assert ('1', 'a') not in contents._cache
+    contents.close()
+
+
+def test_temporary_directory_is_removed_on_close():
+    contents = ContentStore()
+    contents.put(GUILD, 'a', 'body')
+    directory = contents.directory
+    contents.close()
+    assert not os.path.exists(directory)
+
+
+def make_wiki(tmp_path):
+    return WikiSystem(
+        storage=JsonWikiStorage(str(tmp_path / 'wiki')),
+        history=RevisionHistory(str(tmp_path / 'history')),
+        snapshot_dir=str(tmp_path / 'snapshots')
+    )
+
+
+def test_listing_reads_only_records(tmp_path, monkeypatch):
+    wiki = make_wiki(tmp_path)
+    wiki.add_entry('Seer', 'divination ' * 20, 1, GUILD)
+    wiki.add_entry('Clown', 'juggling', 1, GUILD)
+
+    def no_content(*args, **kwargs):
+        pytest.fail('listing read an entry body')
+
+    monkeypatch.setattr(wiki.contents, 'get', no_content)
+    entries = wiki.list_entries(GUILD, order='title')
+    monkeypatch.undo()
+
+    assert [entry['title'] for entry in entries] == ['Clown', 'Seer']
+    assert entries[1]['content'] == make_preview('divination ' * 20)
+    assert wiki.get_entry('seer', GUILD)['content'] == 'divination ' * 20
+    wiki.close()
+
+
+def test_entries_keep_their_metadata_across_reloads(tmp_path):
+    wiki = make_wiki(tmp_path)
+    wiki.add_entry('Seer', 'divination', 42, GUILD)
+    wiki.edit_entry('Seer', 'more divination', 43, GUILD)
+    before = wiki.get_entry('Seer', GUILD)
+    wiki.close()
+
+    wiki = make_wiki(tmp_path)
+    after = wiki.get_entry('Seer', GUILD)
+    wiki.close()
+
+    assert after == before
+    assert after['author_id'] == 42
+    assert after['edit_count'] == 1
@@ -0,0 +1,105 @@
+import os
+import struct
+import zlib
+
+from bot.wiki import WikiSystem
+from bot.wiki_history import RevisionHistory
+from bot.wiki_records import ContentStore, EntryRecord
+from bot.wiki_snapshot import HEADER, load_snapshot, write_snapshot
+from bot.wiki_storage import JsonWikiStorage
+
+GUILD = '1'
+STATE = 'json/1:2/-'
+
+
+def write_sample(tmp_path):
+    chunks = [zlib.compress(b'first body'), zlib.compress(b'second body')]
+    meta = {'entries': [('a', 0, len(chunks[0])), ('b', len(chunks[0]), len(chunks[1]))], 'aliases': {}}
+    write_snapshot(str(tmp_path), GUILD, STATE, meta, chunks)
+    return os.path.join(str(tmp_path), f'{GUILD}.snap'), meta, chunks
+
+
+def test_roundtrip_reads_meta_and_locates_content(tmp_path):
+    path, meta, chunks = write_sample(tmp_path)
+    snapshot = load_snapshot(str(tmp_path), GUILD, STATE)
+
+    assert snapshot.meta == {'entries': [tuple(e) for e in meta['entries']], 'aliases': {}}
+    assert snapshot.content_length == sum(len(chunk) for chunk in chunks)
+    with open(path, 'rb') as f:
+        f.seek(snapshot.content_offset)
+        assert f.read() == b''.join(chunks)
+
+
+def test_missing_snapshot_or_other_state_is_ignored(tmp_path):
+    assert load_snapshot(str(tmp_path), GUILD, STATE) is None
+    write_sample(tmp_path)
+    assert load_snapshot(str(tmp_path), GUILD, 'json/9:9/-') is None
+
+
+def test_unsupported_version_is_rejected(tmp_path):
+    path, _, _ = write_sample(tmp_path)
+    with open(path, 'r+b') as f:
+        f.seek(8)
+        f.write(struct.pack('<I', 999))
+    assert load_snapshot(str(tmp_path), GUILD, STATE) is None
+
+
+def test_corrupt_meta_fails_the_checksum(tmp_path):
+    path, _, _ = write_sample(tmp_path)
+    with open(path, 'r+b') as f:
+        state_length = HEADER.unpack(f.read(HEADER.size))[2]
+        f.seek(HEADER.size + state_length + 2)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    assert load_snapshot(str(tmp_path), GUILD, STATE) is None
+
+
+def test_truncated_content_is_rejected(tmp_path):
+    path, _, _ = write_sample(tmp_path)
+    os.truncate(path, os.path.getsize(path) - 1)
+    assert load_snapshot(str(tmp_path), GUILD, STATE) is None
+
+
+def test_adopted_content_is_read_in_place_and_extended(tmp_path):
+    path, meta, chunks = write_sample(tmp_path)
+    snapshot = load_snapshot(str(tmp_path), GUILD, STATE)
+    contents = ContentStore(str(tmp_path / 'blobs'))
+    contents.adopt(GUILD, path, snapshot.content_offset, snapshot.content_length)
+
+    second = EntryRecord('b', None, 0, 0, 0, len(chunks[0]), len(chunks[1]), '')
+    assert contents.get(GUILD, 'b', second, cache=False) == 'second body'
+    offset, length = contents.put(GUILD, 'c', 'third body', cache=False)
+    assert offset == snapshot.content_length
+    third = EntryRecord('c', None, 0, 0, 0, offset, length, '')
+    assert contents.get(GUILD, 'c', third, cache=False) == 'third body'
+    contents.close()
+
+
+def make_wiki(tmp_path):
+    return WikiSystem(
+        storage=JsonWikiStorage(str(tmp_path / 'wiki')),
+        history=RevisionHistory(str(tmp_path / 'history')),
+        snapshot_dir=str(tmp_path / 'snapshots')
+    )
+
+
+def test_wiki_restores_from_its_snapshot(tmp_path):
+    wiki = make_wiki(tmp_path)
+    for i in range(20):
+        wiki.add_entry(f'Entry {i}', f'body of entry {i}', 1, GUILD)
+    wiki.add_alias('first', 'Entry 0', GUILD)
+    wiki.search_entries('body', GUILD)
+    wiki.close()
+
+    wiki = make_wiki(tmp_path)
+    assert wiki.get_entry('first', GUILD)['content'] == 'body of entry 0'
+    assert wiki.partition_stats()['snapshot_loads'] == 1
+    assert wiki.search_entries('entry 7', GUILD)[0]['title'] == 'Entry 7'
+    wiki.edit_entry('Entry 3', 'changed', 1, GUILD)
+    wiki.close()
+
+    wiki = make_wiki(tmp_path)
+    assert wiki.get_entry('Entry 3', GUILD)['content'] == 'changed'
+    assert wiki.get_entry('Entry 4', GUILD)['content'] == 'body of entry 4'
+    wiki.close()
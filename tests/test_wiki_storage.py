@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+from bot.wiki_storage import JsonWikiStorage, SqliteWikiStorage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def entry(title, content, edit_count=0):
+    return {
+        'title': title, 'content': content, 'author_id': 7,
+        'created_at': '2024-01-01T00:00:00', 'updated_at': '2024-01-02T00:00:00', 'edit_count': edit_count
+    }
+
+
+def test_sqlite_roundtrip_of_entries_and_aliases(tmp_path):
+    storage = SqliteWikiStorage(str(tmp_path / 'wiki.db'))
+    storage.put_entry('1', 'seer', entry('Seer', 'The first sequence.'))
+    storage.put_entry('1', 'seer', entry('Seer', 'Sequence 9 of the Fool pathway.', 1))
+    storage.put_entry('1', 'clown', entry('Clown', 'Sequence 8.'))
+    storage.put_alias('1', 'sequence 9', 'seer')
+    storage.put_alias('1', 'joker', 'clown')
+    storage.delete_entry('1', 'clown')
+    storage.delete_alias('1', 'joker')
+    version = storage.guild_version('1')
+    storage.put_batch('2', {'fool': entry('Fool', 'Sequence 0.')}, {'the fool': 'fool'})
+    storage.close()
+
+    reopened = SqliteWikiStorage(str(tmp_path / 'wiki.db'))
+    assert reopened.load_guild('1') == {
+        'entries': {'seer': entry('Seer', 'Sequence 9 of the Fool pathway.', 1)},
+        'aliases': {'sequence 9': 'seer'}
+    }
+    assert reopened.load_guild('2')['aliases'] == {'the fool': 'fool'}
+    assert sorted(reopened.list_guilds()) == ['1', '2']
+    assert reopened.guild_version('1') == version
+    reopened.close()
+
+
+def test_sqlite_search_stays_within_the_guild(tmp_path):
+    storage = SqliteWikiStorage(str(tmp_path / 'wiki.db'))
+    storage.put_entry('1', 'seer', entry('Seer', 'A pathway of divination.'))
+    storage.put_entry('2', 'seer', entry('Seer', 'Another guild also knows divination.'))
+    storage.put_entry('2', 'sailor', entry('Sailor', 'Sequence 9.'))
+
+    results = storage.search('divin', '1')
+    assert [r['title'] for r in results] == ['Seer']
+    assert '**divination**' in results[0]['content']
+    assert results[0]['match_type'] == 'content'
+    assert [r['title'] for r in storage.search('sail', '2')] == ['Sailor']
+    assert storage.search('sail', '1') == []
+    # Guild IDs are not searchable words
+    assert storage.search('2', '2') == []
+    storage.close()
+
+
+def test_old_search_index_is_rebuilt_with_guild_ids(tmp_path):
+    path = str(tmp_path / 'wiki.db')
+    storage = SqliteWikiStorage(path)
+    storage.put_entry('1', 'seer', entry('Seer', 'Divination.'))
+    storage.close()
+
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        DROP TABLE entries_fts;
+        CREATE VIRTUAL TABLE entries_fts USING fts5(title, content, content='entries', content_rowid='rowid');
+        INSERT INTO entries_fts (entries_fts) VALUES ('rebuild');
+    """)
+    conn.close()
+
+    upgraded = SqliteWikiStorage(path)
+    assert [r['title'] for r in upgraded.search('divination', '1')] == ['Seer']
+    upgraded.put_entry('2', 'seer', entry('Seer', 'Divination again.'))
+    assert len(upgraded.search('divination', '2')) == 1
+    upgraded.close()
+
+
+def test_migrate_command_copies_the_json_wiki(tmp_path):
+    json_storage = JsonWikiStorage(str(tmp_path / 'wiki'))
+    json_storage.put_entry('1', 'seer', entry('Seer', 'Divination.'))
+    json_storage.put_alias('1', 'sequence 9', 'seer')
+    json_storage.put_entry('2', 'fool', entry('Fool', 'Above the grey fog.'))
+    json_storage.close()
+
+    for _ in range(2):
+        # Running it again replaces rather than duplicates
+        subprocess.run(
+            [sys.executable, '-m', 'bot.wiki_storage', 'migrate', 'wiki', 'wiki.db'],
+            cwd=tmp_path, env={**os.environ, 'PYTHONPATH': ROOT}, check=True, capture_output=True
+        )
+
+    storage = SqliteWikiStorage(str(tmp_path / 'wiki.db'))
+    assert storage.load_guild('1') == {'entries': {'seer': entry('Seer', 'Divination.')}, 'aliases': {'sequence 9': 'seer'}}
+    assert [r['title'] for r in storage.search('grey fog', '2')] == ['Fool']
+    assert storage.search('grey fog', '1') == []
+    storage.close()